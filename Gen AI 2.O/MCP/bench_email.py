@@ -0,0 +1,487 @@
+"""
+Benchmarks for email_mcp.py against a local fake Gmail endpoint.
+
+No Google account or token.json is needed: a threaded HTTP server on 127.0.0.1
+answers the Gmail REST and batch endpoints and sleeps `--rtt` ms per request to
+simulate the network round-trip to gmail.googleapis.com.
+
+Usage:
+    python bench_email.py read [--rtt 40]
+    python bench_email.py metadata [--rtt 40]
+    python bench_email.py modify [--rtt 40]
+    python bench_email.py sync [--rtt 40]
+    python bench_email.py search [--rtt 40] [--iterations 50]
+    python bench_email.py extract [--iterations 50]
+    python bench_email.py send [--rtt 40] [--send-quota 50]
+    python bench_email.py service [--iterations 50]
+"""
+
+import argparse
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from google.oauth2.credentials import Credentials
+
+import email_mcp
+import fake_google
+
+MESSAGE_COUNT = 500
+
+
+def _fake_message(index):
+    body = (f"Hello #{index}, this is a synthetic message body. " * 60).encode()
+    return {
+        "id": f"m{index:06d}",
+        "threadId": f"t{index:06d}",
+        "snippet": f"Hello #{index}, this is a synthetic message body.",
+        "labelIds": ["INBOX", "UNREAD"],
+        "internalDate": str(1_790_000_000_000 + index * 60_000),
+        "payload": {
+            "mimeType": "multipart/alternative",
+            "headers": [
+                {"name": "Subject", "value": f"Synthetic message {index}"},
+                {"name": "From", "value": f"sender{index % 17}@example.com"},
+                {"name": "Date", "value": "Mon, 12 Oct 2026 09:00:00 +0000"},
+            ],
+            "parts": [
+                {
+                    "mimeType": "text/plain",
+                    "body": {"data": base64.urlsafe_b64encode(body).decode()},
+                },
+            ],
+        },
+    }
+
+
+def start_fake_gmail(rtt_ms, message_count=MESSAGE_COUNT, send_quota=None):
+    """
+    Start the fake Gmail server in a daemon thread. Returns (server, stats).
+    server.deliver(n) simulates n new emails arriving (recorded in the mailbox history, as are
+    label changes made through batchModify).
+    With send_quota, messages.send answers 429 rateLimitExceeded beyond that many sends/second.
+    """
+    messages = {m["id"]: m for m in (_fake_message(i) for i in range(message_count))}
+    order = sorted(messages, reverse=True)
+    history = []
+    stats = {"requests": 0, "bytes_out": 0, "sent": 0, "rate_limited": 0}
+    stats_lock = threading.Lock()
+    recent_sends = deque()
+
+    def _deliver(count):
+        for _ in range(count):
+            msg = _fake_message(len(messages))
+            messages[msg["id"]] = msg
+            order.insert(0, msg["id"])
+            history.append({"id": str(1000 + len(history) + 1),
+                            "messagesAdded": [{"message": {"id": msg["id"], "labelIds": msg["labelIds"]}}]})
+
+    def _route(method, path, query, body=b""):
+        """Answer one Gmail REST call. Returns (status, json-serializable body)."""
+        parts = path.strip("/").split("/")
+        if parts[:4] != ["gmail", "v1", "users", "me"]:
+            return 404, {"error": {"code": 404, "message": "Not found"}}
+        rest = parts[4:]
+        if method == "GET" and rest == ["profile"]:
+            return 200, {"emailAddress": "me@example.com", "historyId": str(1000 + len(history))}
+        if method == "GET" and rest == ["history"]:
+            since = int(query["startHistoryId"][0])
+            records = [r for r in history if int(r["id"]) > since]
+            return 200, {"history": records, "historyId": str(1000 + len(history))}
+        if method == "GET" and rest == ["messages"]:
+            limit = int(query.get("maxResults", ["100"])[0])
+            start = int(query.get("pageToken", ["0"])[0])
+            matching = order
+            if "is:unread" in query.get("q", [""])[0]:
+                matching = [i for i in order if "UNREAD" in messages[i]["labelIds"]]
+            page = matching[start:start + limit]
+            result = {"messages": [{"id": i, "threadId": messages[i]["threadId"]} for i in page]}
+            if start + limit < len(matching):
+                result["nextPageToken"] = str(start + limit)
+            return 200, result
+        if method == "POST" and rest == ["messages", "send"]:
+            with stats_lock:
+                now = time.monotonic()
+                while recent_sends and now - recent_sends[0] > 1:
+                    recent_sends.popleft()
+                if send_quota is not None and len(recent_sends) >= send_quota:
+                    stats["rate_limited"] += 1
+                    return 429, {"error": {"code": 429, "message": "User-rate limit exceeded.",
+                                           "errors": [{"reason": "rateLimitExceeded"}]}}
+                recent_sends.append(now)
+                stats["sent"] += 1
+                return 200, {"id": f"sent{stats['sent']:06d}", "labelIds": ["SENT"]}
+        if method == "POST" and rest == ["messages", "batchModify"]:
+            request = json.loads(body)
+            for message_id in request["ids"]:
+                changed = _modify_labels(messages[message_id], request)
+                history.append({"id": str(1000 + len(history) + 1),
+                                "labelsRemoved": [{"message": changed,
+                                                   "labelIds": request.get("removeLabelIds", [])}]})
+            return 204, None
+        if method == "POST" and len(rest) == 3 and rest[0] == "messages" and rest[2] == "modify":
+            return 200, _modify_labels(messages[rest[1]], json.loads(body))
+        if method == "GET" and len(rest) == 2 and rest[0] == "messages":
+            if rest[1] not in messages:
+                return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+            msg = messages[rest[1]]
+            if query.get("format", ["full"])[0] == "metadata":
+                wanted = set(query.get("metadataHeaders", []))
+                headers = [h for h in msg["payload"]["headers"] if not wanted or h["name"] in wanted]
+                return 200, {"id": msg["id"], "threadId": msg["threadId"],
+                             "snippet": msg["snippet"], "payload": {"headers": headers}}
+            return 200, msg
+        return 404, {"error": {"code": 404, "message": "Not found"}}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, content, content_type="application/json"):
+            with stats_lock:
+                stats["requests"] += 1
+                stats["bytes_out"] += len(content)
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def _handle(self, method):
+            time.sleep(rtt_ms / 1000)
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = self.rfile.read(length) if length else b""
+            url = urlparse(self.path)
+            if url.path == "/batch":
+                boundary, content = fake_google.answer_batch(
+                    self.headers["Content-Type"], payload,
+                    lambda method, path, query, headers, body: _route(method, path, query, body),
+                    "batch_fake_gmail",
+                )
+                self._send(200, content, f'multipart/mixed; boundary="{boundary}"')
+                return
+            status, body = _route(method, url.path, parse_qs(url.query), payload)
+            self._send(status, b"" if body is None else json.dumps(body).encode())
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.deliver = _deliver
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def _modify_labels(message, request):
+    labels = [l for l in message["labelIds"] if l not in request.get("removeLabelIds", [])]
+    message["labelIds"] = labels + [l for l in request.get("addLabelIds", []) if l not in labels]
+    return {"id": message["id"], "labelIds": message["labelIds"]}
+
+
+def fake_service(server):
+    """Build a Gmail client bound to the fake server, bypassing OAuth."""
+    return fake_google.fake_service("gmail", "v1", server.server_address[1])
+
+
+def _serial_read(service, limit):
+    """The pre-batching read path: one messages.get round-trip per message."""
+    results = service.users().messages().list(userId="me", maxResults=limit).execute()
+    for message in results.get("messages", []):
+        msg = service.users().messages().get(userId="me", id=message["id"], format="full").execute()
+        email_mcp._format_message(msg)
+
+
+def bench_read(args):
+    server, stats = start_fake_gmail(args.rtt)
+    service = fake_service(server)
+    email_mcp.get_gmail_service = lambda: service
+
+    print(f"read_recent_emails vs. serial gets (rtt={args.rtt} ms)")
+    print(f"{'limit':>6} {'serial ms':>10} {'reqs':>5} {'batched ms':>11} {'reqs':>5}")
+    for limit in (1, 5, 10, 25, 50, 100):
+        before = stats["requests"]
+        start = time.perf_counter()
+        _serial_read(service, limit)
+        serial_ms = (time.perf_counter() - start) * 1000
+        serial_reqs = stats["requests"] - before
+
+        before = stats["requests"]
+        start = time.perf_counter()
+        email_mcp.read_recent_emails(limit=limit, include_body=True)
+        batched_ms = (time.perf_counter() - start) * 1000
+        batched_reqs = stats["requests"] - before
+        print(f"{limit:>6} {serial_ms:>10.1f} {serial_reqs:>5} {batched_ms:>11.1f} {batched_reqs:>5}")
+    server.shutdown()
+
+
+def bench_metadata(args):
+    """Bytes transferred and wall time for full-body vs. metadata-only listing."""
+    server, stats = start_fake_gmail(args.rtt)
+    service = fake_service(server)
+    email_mcp.get_gmail_service = lambda: service
+
+    print(f"read_recent_emails full vs. metadata (rtt={args.rtt} ms)")
+    print(f"{'limit':>6} {'full ms':>8} {'full KB':>8} {'meta ms':>8} {'meta KB':>8}")
+    for limit in (10, 50, 100, 250):
+        row = []
+        for include_body in (True, False):
+            before = stats["bytes_out"]
+            start = time.perf_counter()
+            email_mcp.read_recent_emails(limit=limit, include_body=include_body)
+            row += [(time.perf_counter() - start) * 1000, (stats["bytes_out"] - before) / 1024]
+        print(f"{limit:>6} {row[0]:>8.1f} {row[1]:>8.1f} {row[2]:>8.1f} {row[3]:>8.1f}")
+    server.shutdown()
+
+
+def _per_message_mark_seen(service):
+    """The pre-batchModify path: first page of matches only, one messages.modify per message."""
+    results = service.users().messages().list(userId="me", q="is:unread").execute()
+    for message in results.get("messages", []):
+        service.users().messages().modify(
+            userId="me", id=message["id"], body={"removeLabelIds": ["UNREAD"]}
+        ).execute()
+    return len(results.get("messages", []))
+
+
+def bench_modify(args):
+    """Throughput of mark_email_seen: per-message modify vs. paginated batchModify."""
+    print(f"mark_email_seen throughput (rtt={args.rtt} ms)")
+    print(f"{'unread':>7} {'old marked':>11} {'old msg/s':>10} {'new marked':>11} {'new msg/s':>10} {'new reqs':>9}")
+    for unread in (200, 1000, 2000, 5000):
+        server, _ = start_fake_gmail(args.rtt, message_count=unread)
+        service = fake_service(server)
+        start = time.perf_counter()
+        old_marked = _per_message_mark_seen(service)
+        old_rate = old_marked / (time.perf_counter() - start)
+        server.shutdown()
+
+        server, stats = start_fake_gmail(args.rtt, message_count=unread)
+        service = fake_service(server)
+        email_mcp.get_gmail_service = lambda: service
+        start = time.perf_counter()
+        result = email_mcp.mark_email_seen("is:unread")
+        new_rate = unread / (time.perf_counter() - start)
+        new_marked = int(result.split()[2]) if result.startswith("Successfully") else 0
+        print(f"{unread:>7} {old_marked:>11} {old_rate:>10.0f} {new_marked:>11} {new_rate:>10.0f} {stats['requests']:>9}")
+        server.shutdown()
+
+
+def bench_sync(args):
+    """Cold full sync, incremental delta sync, and read latency from the store vs. the API."""
+    server, stats = start_fake_gmail(args.rtt, message_count=2000)
+    service = fake_service(server)
+    email_mcp.get_gmail_service = lambda: service
+    email_mcp._creds = Credentials(token="fake-access-token")  # for the sync's per-thread connection
+
+    def _timed(fn, *fn_args, **fn_kwargs):
+        before = stats["requests"]
+        start = time.perf_counter()
+        result = fn(*fn_args, **fn_kwargs)
+        return result, (time.perf_counter() - start) * 1000, stats["requests"] - before
+
+    with tempfile.TemporaryDirectory() as tmp:
+        email_mcp.STORE_PATH = os.path.join(tmp, "mail_store.db")
+        print(f"Local mail store sync (2000 messages, rtt={args.rtt} ms)")
+
+        summary, ms, reqs = _timed(email_mcp.sync_mailbox)
+        print(f"  cold full sync:         {ms:9.1f} ms {reqs:4} reqs  {summary}")
+        server.deliver(25)
+        summary, ms, reqs = _timed(email_mcp.sync_mailbox)
+        print(f"  incremental (+25 new):  {ms:9.1f} ms {reqs:4} reqs  {summary}")
+
+        for limit in (5, 50):
+            _, ms, reqs = _timed(email_mcp.read_recent_emails, limit=limit)
+            print(f"  read limit={limit:<3} store: {ms:9.2f} ms {reqs:4} reqs")
+            # Negation cannot be evaluated locally, so this is the API path for the same messages.
+            _, ms, reqs = _timed(email_mcp.read_recent_emails, limit=limit, query="-in:chats")
+            print(f"  read limit={limit:<3} API:   {ms:9.2f} ms {reqs:4} reqs")
+    server.shutdown()
+
+
+SEARCH_QUERIES = [
+    "from:sender3@example.com",
+    "subject:\"Synthetic message 1999\"",
+    "is:unread after:2026/01/01",
+    "hello synthetic",
+    "from:sender5 newer_than:10y",
+]
+
+
+def bench_search(args):
+    """search_emails latency: local FTS5 store vs. Gmail server-side search."""
+    server, stats = start_fake_gmail(args.rtt, message_count=2000)
+    service = fake_service(server)
+    email_mcp.get_gmail_service = lambda: service
+    email_mcp._creds = Credentials(token="fake-access-token")  # for the sync's per-thread connection
+
+    with tempfile.TemporaryDirectory() as tmp:
+        email_mcp.STORE_PATH = os.path.join(tmp, "mail_store.db")
+        email_mcp.GMAIL_SYNC_MAX_MESSAGES = 5000
+        email_mcp.sync_mailbox()
+
+        print(f"search_emails over 2000 synced messages (rtt={args.rtt} ms, limit=5)")
+        print(f"{'query':<42} {'local ms':>9} {'API ms':>8}")
+        for query in SEARCH_QUERIES:
+            email_mcp.STORE_PATH = os.path.join(tmp, "mail_store.db")
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                email_mcp.search_emails(query)
+            local_ms = (time.perf_counter() - start) * 1000 / args.iterations
+
+            # An unsynced store makes search_emails fall through to the API.
+            email_mcp.STORE_PATH = os.path.join(tmp, "empty.db")
+            start = time.perf_counter()
+            email_mcp.search_emails(query)
+            api_ms = (time.perf_counter() - start) * 1000
+            print(f"{query:<42} {local_ms:>9.3f} {api_ms:>8.1f}")
+    server.shutdown()
+
+
+def _concat_extract_body_text(parts):
+    """The pre-streaming extractor: full decode of every text/plain part, string +=."""
+    text_content = ""
+    for part in parts or []:
+        if part.get("mimeType") == "text/plain":
+            data = part.get("body", {}).get("data")
+            if data:
+                text_content += base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore")
+        elif "parts" in part:
+            text_content += _concat_extract_body_text(part["parts"])
+    return text_content
+
+
+def _large_payload(attachment_mb):
+    """A short text/plain body plus an inline text attachment (e.g. a log file) of attachment_mb."""
+    def encode(raw):
+        return base64.urlsafe_b64encode(raw).decode()
+    return {
+        "mimeType": "multipart/mixed",
+        "parts": [
+            {"mimeType": "multipart/alternative", "parts": [
+                {"mimeType": "text/plain", "body": {"data": encode(b"Quarterly numbers attached. " * 40)}},
+                {"mimeType": "text/html", "body": {"data": encode(b"<p>Quarterly numbers attached.</p>" * 40)}},
+            ]},
+            {"mimeType": "text/plain", "filename": "server.log",
+             "body": {"data": encode(b"2026-10-12 09:00:00 INFO request served\n" * (attachment_mb * 26_000))}},
+        ],
+    }
+
+
+def bench_extract(args):
+    """Preview extraction cost for messages carrying large inline text attachments."""
+    print(f"Body preview extraction ({args.iterations} iterations)")
+    print(f"{'attachment':>10} {'concat ms':>10} {'streaming ms':>13}")
+    for attachment_mb in (1, 5, 20):
+        payload = _large_payload(attachment_mb)
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            _concat_extract_body_text(payload["parts"])[:email_mcp.PREVIEW_CHARS + 1]
+        concat_ms = (time.perf_counter() - start) * 1000 / args.iterations
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            email_mcp._extract_body_text(payload, max_chars=email_mcp.PREVIEW_CHARS + 1)
+        streaming_ms = (time.perf_counter() - start) * 1000 / args.iterations
+        print(f"{attachment_mb:>8} MB {concat_ms:>10.2f} {streaming_ms:>13.3f}")
+
+
+def bench_send(args):
+    """Sustained send throughput: serial send_email calls vs. send_emails_bulk."""
+    count = 200
+    recipients = json.dumps([{"to": f"user{i}@example.com", "name": f"User {i}"} for i in range(count)])
+    print(f"Sending {count} emails (rtt={args.rtt} ms, fake quota {args.send_quota} sends/s)")
+
+    server, stats = start_fake_gmail(args.rtt, message_count=0, send_quota=args.send_quota)
+    service = fake_service(server)
+    email_mcp.get_gmail_service = lambda: service
+    email_mcp._creds = Credentials(token="fake-access-token")
+    start = time.perf_counter()
+    for i in range(count):
+        email_mcp.send_email(f"user{i}@example.com", f"Hi User {i}", "Hello!")
+    elapsed = time.perf_counter() - start
+    print(f"  serial send_email:              {count / elapsed:6.1f} msg/s  ({stats['sent']} sent)")
+    server.shutdown()
+
+    for rate, concurrency in ((args.send_quota * 0.9, 8), (args.send_quota * 1.5, 8)):
+        server, stats = start_fake_gmail(args.rtt, message_count=0, send_quota=args.send_quota)
+        service = fake_service(server)
+        email_mcp.GMAIL_SEND_RATE = rate
+        email_mcp.GMAIL_SEND_BURST = 2
+        start = time.perf_counter()
+        result = email_mcp.send_emails_bulk(recipients, "Hi {name}", "Hello {name}!", max_concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+        print(f"  bulk, {concurrency} workers, {rate:5.1f} tokens/s: "
+              f"{stats['sent'] / elapsed:6.1f} msg/s  ({stats['sent']} sent, "
+              f"{stats['rate_limited']} x 429)  {result.splitlines()[0]}")
+        server.shutdown()
+
+
+def bench_service(args):
+    """Per-call cost of get_gmail_service() with and without the process-lifetime cache."""
+    expiry = (datetime.now(timezone.utc) + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    with tempfile.TemporaryDirectory() as tmp:
+        email_mcp.TOKEN_PATH = os.path.join(tmp, "token.json")
+        with open(email_mcp.TOKEN_PATH, "w") as f:
+            json.dump({
+                "token": "fake-access-token",
+                "refresh_token": "fake-refresh-token",
+                "client_id": "fake.apps.googleusercontent.com",
+                "client_secret": "fake-secret",
+                "scopes": email_mcp.SCOPES,
+                "expiry": expiry,
+            }, f)
+
+        def _per_call_ms(reset_cache):
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                if reset_cache:
+                    email_mcp._service = None
+                    email_mcp._creds = None
+                email_mcp.get_gmail_service()
+            return (time.perf_counter() - start) * 1000 / args.iterations
+
+        cold_ms = _per_call_ms(reset_cache=True)
+        warm_ms = _per_call_ms(reset_cache=False)
+
+    print(f"get_gmail_service() over {args.iterations} calls")
+    print(f"  cold (read token.json + discovery build): {cold_ms:8.3f} ms/call")
+    print(f"  warm (cached service):                    {warm_ms:8.3f} ms/call")
+    print(f"  overhead removed per tool call:           {cold_ms - warm_ms:8.3f} ms")
+
+
+BENCHMARKS = {
+    "read": bench_read,
+    "metadata": bench_metadata,
+    "modify": bench_modify,
+    "sync": bench_sync,
+    "search": bench_search,
+    "extract": bench_extract,
+    "send": bench_send,
+    "service": bench_service,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--rtt", type=float, default=40.0, help="simulated round-trip time in ms")
+    parser.add_argument("--send-quota", type=float, default=50.0, help="fake server sends/second before 429")
+    parser.add_argument("--iterations", type=int, default=50, help="repetitions for microbenchmarks")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep every benchmark off a real mail_store.db next to email_mcp.py: an empty
+        # path sends reads to the API, and sync/search point at their own store.
+        email_mcp.STORE_PATH = os.path.join(tmp, "mail_store.db")
+        BENCHMARKS[args.benchmark](args)
@@ -0,0 +1,378 @@
+"""
+Benchmarks for calendar_mcp.py against a local fake Google Calendar endpoint.
+
+No Google account or token.json is needed: a threaded HTTP server on 127.0.0.1
+answers the Calendar REST endpoints and sleeps `--rtt` ms per request to
+simulate the network round-trip to www.googleapis.com.
+
+Usage:
+    python bench_calendar.py list [--rtt 40] [--calendars 4] [--events 10000]
+    python bench_calendar.py merge [--calendars 4] [--events 10000] [--iterations 50]
+    python bench_calendar.py bulk [--rtt 40] [--fail-rate 0.05]
+"""
+
+import argparse
+import bisect
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from google.oauth2.credentials import Credentials
+
+import calendar_mcp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fake_google  # noqa: E402  (shared with bench_email.py, one directory up)
+
+EVENT_COUNT = 10_000
+CALENDAR_COUNT = 4
+DEFAULT_PAGE_SIZE = 250  # events().list default maxResults
+
+
+def _fake_event(calendar_id, index, start):
+    return {
+        "id": f"{calendar_id.split('@')[0]}{index:06d}",
+        "status": "confirmed",
+        "etag": f'"{index}"',
+        "summary": f"Synthetic event {index} ({calendar_id})",
+        "location": f"Room {index % 40}",
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": (start + timedelta(minutes=30)).isoformat()},
+    }
+
+
+def synthetic_calendars(calendar_count=CALENDAR_COUNT, event_count=EVENT_COUNT, days=30):
+    """
+    {calendar_id: [events sorted by start]} with event_count events per calendar spread
+    over the next `days` days. Calendars are offset so their events interleave.
+    """
+    base = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(minutes=5)
+    step = timedelta(days=days) / event_count
+    calendars = {}
+    for c in range(calendar_count):
+        calendar_id = "primary" if c == 0 else f"team{c}@example.com"
+        offset = step * c / calendar_count
+        calendars[calendar_id] = [
+            _fake_event(calendar_id, i, base + offset + step * i) for i in range(event_count)
+        ]
+    return calendars
+
+
+def _parse_ts(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def _start_ts(event):
+    return _parse_ts(event["start"]["dateTime"])
+
+
+def start_fake_calendar(rtt_ms, calendars, fail_rate=0.0):
+    """
+    Start the fake Calendar server in a daemon thread. Returns (server, stats).
+    events().list honours timeMin/timeMax, q, maxResults/pageToken and If-None-Match;
+    events().insert/delete and the /batch/calendar/v3 endpoint are supported too.
+    With fail_rate, that fraction of insert/delete calls answers 503 or 429; half of the
+    503s are returned after the write is applied, as a backend error after the write would be.
+    Inserts keep a client-supplied id and answer 409 when it already exists; deleting an
+    event that was already deleted answers 410.
+    """
+    stats = {"requests": 0, "bytes_out": 0, "not_modified": 0, "calls": 0, "injected_errors": 0}
+    stats_lock = threading.Lock()
+    start_index = {cid: [_start_ts(e) for e in events] for cid, events in calendars.items()}
+    data_lock = threading.Lock()
+    removed = set()
+    chaos = random.Random(42)
+
+    def _route(method, path, query, headers, body=b""):
+        """Answer one Calendar REST call. Returns (status, json-serializable body)."""
+        parts = [unquote(p) for p in path.strip("/").split("/")]
+        if parts[:3] != ["calendar", "v3", "calendars"] or len(parts) < 5:
+            return 404, {"error": {"code": 404, "message": "Not found"}}
+        calendar_id, rest = parts[3], parts[4:]
+        if calendar_id not in calendars:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        events = calendars[calendar_id]
+        if method == "GET" and rest == ["events"]:
+            # Synthetic events are 30 minutes long and sorted, so the range is a bisect away.
+            starts = start_index[calendar_id]
+            lo, hi = 0, len(events)
+            if "timeMin" in query:
+                lo = bisect.bisect_right(starts, _parse_ts(query["timeMin"][0]) - 1800)
+            if "timeMax" in query:
+                hi = bisect.bisect_left(starts, _parse_ts(query["timeMax"][0]))
+            matching = events[lo:hi]
+            if "q" in query:
+                needle = query["q"][0].lower()
+                matching = [e for e in matching if needle in e["summary"].lower()]
+            etag = '"' + hashlib.md5(json.dumps([e["etag"] for e in matching]).encode()).hexdigest() + '"'
+            if headers.get("If-None-Match") == etag and "pageToken" not in query:
+                return 304, None
+            limit = int(query.get("maxResults", [str(DEFAULT_PAGE_SIZE)])[0])
+            start = int(query.get("pageToken", ["0"])[0])
+            result = {"etag": etag, "items": matching[start:start + limit]}
+            if start + limit < len(matching):
+                result["nextPageToken"] = str(start + limit)
+            return 200, result
+        failure = None
+        if method in ("POST", "DELETE"):
+            with stats_lock:
+                stats["calls"] += 1
+                if chaos.random() < fail_rate:
+                    stats["injected_errors"] += 1
+                    failure = "503" if chaos.random() < 0.5 else "429"
+                    if failure == "503" and chaos.random() < 0.5:
+                        failure = "503 after write"
+            if failure == "429":
+                return 429, {"error": {"code": 429, "message": "Rate Limit Exceeded",
+                                       "errors": [{"reason": "rateLimitExceeded"}]}}
+            if failure == "503":
+                return 503, {"error": {"code": 503, "message": "Backend Error"}}
+        if method == "POST" and rest == ["events"]:
+            event = json.loads(body)
+            with data_lock:
+                if any(e["id"] == event.get("id") for e in events):
+                    return 409, {"error": {"code": 409, "message": "The requested identifier already exists.",
+                                           "errors": [{"reason": "duplicate"}]}}
+                event.setdefault("id", f"new{stats['calls']:06d}")
+                event.update(status="confirmed", etag=f'"n{stats["calls"]}"')
+                position = bisect.bisect_right(starts := start_index[calendar_id], _start_ts(event))
+                starts.insert(position, _start_ts(event))
+                events.insert(position, event)
+            if failure:
+                return 503, {"error": {"code": 503, "message": "Backend Error"}}
+            return 200, dict(event, htmlLink=f"https://calendar.example.com/{event['id']}")
+        if method == "DELETE" and len(rest) == 2 and rest[0] == "events":
+            with data_lock:
+                position = next((i for i, e in enumerate(events) if e["id"] == rest[1]), None)
+                if position is None:
+                    if (calendar_id, rest[1]) in removed:
+                        return 410, {"error": {"code": 410, "message": "Resource has been deleted",
+                                               "errors": [{"reason": "deleted"}]}}
+                    return 404, {"error": {"code": 404, "message": "Not Found"}}
+                del events[position]
+                del start_index[calendar_id][position]
+                removed.add((calendar_id, rest[1]))
+            if failure:
+                return 503, {"error": {"code": 503, "message": "Backend Error"}}
+            return 204, None
+        return 404, {"error": {"code": 404, "message": "Not found"}}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, content, content_type="application/json"):
+            with stats_lock:
+                stats["requests"] += 1
+                stats["bytes_out"] += len(content)
+                stats["not_modified"] += status == 304
+            self.send_response(status)
+            if status != 304:
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            if status != 304:
+                self.wfile.write(content)
+
+        def _handle(self, method):
+            time.sleep(rtt_ms / 1000)
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = self.rfile.read(length) if length else b""
+            url = urlparse(self.path)
+            if url.path == "/batch/calendar/v3":
+                boundary, content = fake_google.answer_batch(
+                    self.headers["Content-Type"], payload, _route, "batch_fake_calendar"
+                )
+                self._send(200, content, f'multipart/mixed; boundary="{boundary}"')
+                return
+            status, body = _route(method, url.path, parse_qs(url.query), self.headers, payload)
+            self._send(status, b"" if body is None else json.dumps(body).encode())
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_DELETE(self):
+            self._handle("DELETE")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def fake_service(server):
+    """Build a Calendar client bound to the fake server, bypassing OAuth."""
+    return fake_google.fake_service("calendar", "v3", server.server_address[1])
+
+
+def _install(server):
+    service = fake_service(server)
+    calendar_mcp.get_calendar_service = lambda: service
+    # Worker threads build their own AuthorizedHttp from the cached credentials.
+    calendar_mcp._creds = Credentials(token="fake-access-token")
+    return service
+
+
+def _sequential_list(service, calendar_ids, limit, days_ahead):
+    """The pre-pagination shape: one calendar at a time, one connection, sort everything at the end."""
+    now = datetime.now(timezone.utc)
+    events = []
+    for calendar_id in calendar_ids:
+        events.extend(calendar_mcp._list_events_conditional(
+            service, calendar_id, now.isoformat(), (now + timedelta(days=days_ahead)).isoformat(),
+            max_results=limit,
+        ))
+    events.sort(key=_start_ts)
+    return events[:limit]
+
+
+def bench_list(args):
+    calendars = synthetic_calendars(args.calendars, args.events)
+    server, stats = start_fake_calendar(args.rtt, calendars)
+    service = _install(server)
+    calendar_ids = list(calendars)
+
+    print(f"list_events over {len(calendar_ids)} calendar(s) x {args.events} events (rtt={args.rtt} ms)")
+    print(f"{'calendars':>9} {'limit':>6} {'sequential ms':>14} {'concurrent ms':>14} {'reqs':>5} {'jsonl KB':>9}")
+    for count in sorted({1, 2, len(calendar_ids)}):
+        ids = calendar_ids[:count]
+        for limit in (100, 2500, args.events):
+            calendar_mcp._event_cache.clear()
+            start = time.perf_counter()
+            _sequential_list(service, ids, limit, days_ahead=31)
+            sequential_ms = (time.perf_counter() - start) * 1000
+
+            calendar_mcp._event_cache.clear()
+            before = stats["requests"]
+            start = time.perf_counter()
+            output = calendar_mcp.list_events(
+                limit=limit, days_ahead=31, calendar_ids=",".join(ids), output_format="jsonl"
+            )
+            concurrent_ms = (time.perf_counter() - start) * 1000
+            reqs = stats["requests"] - before
+            assert output.count("\n") + 1 == min(limit, count * args.events), output[:200]
+            print(f"{count:>9} {limit:>6} {sequential_ms:>14.1f} {concurrent_ms:>14.1f} {reqs:>5} "
+                  f"{len(output) / 1024:>9.0f}")
+
+    before = stats["requests"]
+    start = time.perf_counter()
+    calendar_mcp.list_events(limit=args.events, days_ahead=31, calendar_ids=",".join(calendar_ids))
+    warm_ms = (time.perf_counter() - start) * 1000
+    print(f"repeat of the largest query (ETag revalidation): {warm_ms:.1f} ms, "
+          f"{stats['requests'] - before} request(s), {stats['not_modified']} total 304s")
+    server.shutdown()
+
+
+def bench_merge(args):
+    """k-way heap merge of start-ordered calendars vs. concatenate-and-sort, first N events."""
+    per_calendar = [
+        [(calendar_id, event) for event in events]
+        for calendar_id, events in synthetic_calendars(args.calendars, args.events).items()
+    ]
+
+    def _key(item):
+        return calendar_mcp._event_start(item[1])
+
+    print(f"merge {args.calendars} calendar(s) x {args.events} events")
+    print(f"{'limit':>6} {'sort ms':>9} {'heap ms':>9}")
+    for limit in (10, 100, 1000, args.events):
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            sorted(itertools.chain(*per_calendar), key=_key)[:limit]
+        sort_ms = (time.perf_counter() - start) * 1000 / args.iterations
+
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            list(itertools.islice(heapq.merge(*per_calendar, key=_key), limit))
+        heap_ms = (time.perf_counter() - start) * 1000 / args.iterations
+        print(f"{limit:>6} {sort_ms:>9.2f} {heap_ms:>9.2f}")
+
+
+def _conference_schedule(count):
+    """A multi-day conference: `count` 45-minute sessions in 4 parallel tracks, naive local times."""
+    day = (datetime.now() + timedelta(days=14)).replace(hour=9, minute=0, second=0, microsecond=0)
+    sessions = []
+    for i in range(count):
+        slot = i // 4
+        start = day + timedelta(days=slot // 10, hours=slot % 10)
+        sessions.append({
+            "summary": f"Session {i + 1}",
+            "start": start.isoformat(timespec="seconds"),
+            "end": (start + timedelta(minutes=45)).isoformat(timespec="seconds"),
+            "location": f"Track {i % 4 + 1}",
+        })
+    return sessions
+
+
+def bench_bulk(args):
+    """Importing a conference schedule: per-event create_event/delete_event vs. the bulk tools."""
+    count = 300
+    sessions = _conference_schedule(count)
+    print(f"{count} events (rtt={args.rtt} ms, batch size {calendar_mcp.CALENDAR_BATCH_SIZE})")
+
+    server, stats = start_fake_calendar(args.rtt, {"primary": []})
+    _install(server)
+    start = time.perf_counter()
+    for session in sessions:
+        calendar_mcp.create_event(session["summary"], session["start"], session["end"],
+                                  location=session["location"])
+    create_s = time.perf_counter() - start
+    ids = [e["id"] for e in json.loads(calendar_mcp.list_events(
+        limit=count, days_ahead=60, output_format="jsonl").replace("\n", ",").join("[]"))]
+    start = time.perf_counter()
+    for event_id in ids:
+        calendar_mcp.delete_event(event_id)
+    delete_s = time.perf_counter() - start
+    print(f"  per event:         create {create_s:6.2f} s, delete {delete_s:6.2f} s  ({stats['requests']} requests)")
+    server.shutdown()
+
+    for fail_rate in (0.0, args.fail_rate):
+        calendars = {"primary": []}
+        server, stats = start_fake_calendar(args.rtt, calendars, fail_rate=fail_rate)
+        _install(server)
+        start = time.perf_counter()
+        created = calendar_mcp.create_events_bulk(json.dumps(sessions))
+        create_s = time.perf_counter() - start
+        stored = len(calendars["primary"])
+        ids = [line.rsplit("ID: ", 1)[1].rstrip(")") for line in created.splitlines()[1:] if "created" in line]
+        start = time.perf_counter()
+        deleted = calendar_mcp.delete_events_bulk(",".join(ids))
+        delete_s = time.perf_counter() - start
+        print(f"  bulk, {fail_rate:4.0%} errors: create {create_s:6.2f} s, delete {delete_s:6.2f} s  "
+              f"({stats['requests']} requests, {stats['injected_errors']} injected 429/503)")
+        print(f"      {created.splitlines()[0]} Stored: {stored} event(s).")
+        print(f"      {deleted.splitlines()[0]} Left: {len(calendars['primary'])} event(s).")
+        server.shutdown()
+
+
+BENCHMARKS = {
+    "list": bench_list,
+    "merge": bench_merge,
+    "bulk": bench_bulk,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--rtt", type=float, default=40.0, help="simulated round-trip time in ms")
+    parser.add_argument("--calendars", type=int, default=CALENDAR_COUNT, help="synthetic calendars")
+    parser.add_argument("--events", type=int, default=EVENT_COUNT, help="events per synthetic calendar")
+    parser.add_argument("--fail-rate", type=float, default=0.05, help="share of bulk calls answering 429/503")
+    parser.add_argument("--iterations", type=int, default=50, help="repetitions for microbenchmarks")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
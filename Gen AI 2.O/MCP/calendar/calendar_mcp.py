@@ -1,10 +1,25 @@
+import bisect
+import heapq
+import itertools
+import json
 import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from datetime import time as dtime
+from zoneinfo import ZoneInfo
 from mcp.server.fastmcp import FastMCP
 
+import httplib2
+from google.auth.exceptions import TransportError
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
 mcp = FastMCP("Google Calendar MCP Server")
 
@@ -13,29 +28,529 @@ DIR_PATH = os.path.dirname(os.path.abspath(__file__))
 TOKEN_PATH = os.path.join(DIR_PATH, "token.json")
 
 
-def get_calendar_service():
-    """Get the Google Calendar API service instance using OAuth 2.0 credentials."""
-    creds = None
+_service = None
+_creds = None
+_service_lock = threading.Lock()
 
-    if os.path.exists(TOKEN_PATH):
-        creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+def get_calendar_service():
+    """
+    Get the Google Calendar API service instance using OAuth 2.0 credentials.
+    The service is built once per process and reused; credentials are only refreshed
+    (and token.json rewritten) once they expire, under a lock shared by all tool calls.
+    """
+    global _service, _creds
+
+    if _service is not None and _creds.valid:
+        return _service
+
+    with _service_lock:
+        # Another tool call may have refreshed the credentials while we waited for the lock.
+        if _service is not None and _creds.valid:
+            return _service
+
+        creds = _creds
+        if creds is None and os.path.exists(TOKEN_PATH):
+            creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                try:
+                    creds.refresh(Request())
+                    with open(TOKEN_PATH, "w") as token:
+                        token.write(creds.to_json())
+                except Exception as e:
+                    raise ValueError(f"Failed to refresh token: {e}. Please run authenticate.py again.")
+            else:
+                raise ValueError("Authentication token missing or invalid. Please run 'python authenticate.py' first.")
+
+        if _service is None:
             try:
-                creds.refresh(Request())
-                with open(TOKEN_PATH, "w") as token:
-                    token.write(creds.to_json())
+                _service = build("calendar", "v3", credentials=creds)
             except Exception as e:
-                raise ValueError(f"Failed to refresh token: {e}. Please run authenticate.py again.")
+                raise ValueError(f"Failed to build Calendar service: {e}")
+        _creds = creds
+        return _service
+
+
+# Conditional listing: (calendarId, timeMin, timeMax, q, maxResults) -> (etag, items).
+# A repeated query is sent with If-None-Match and an unchanged result costs a 304.
+EVENT_CACHE_SIZE = 256
+EVENTS_PAGE_MAX = 2500  # largest maxResults events().list accepts
+_event_cache = {}
+_event_cache_lock = threading.Lock()
+
+
+def _list_events_conditional(
+    service, calendar_id="primary", time_min=None, time_max=None, q=None, max_results=None, http=None
+):
+    """
+    Run events().list, following nextPageToken until max_results events (or all of them)
+    are collected. A previously seen identical query is revalidated with the first page's
+    ETag, and a 304 returns the cached events without downloading any page.
+    """
+    key = (calendar_id, time_min, time_max, q, max_results)
+    with _event_cache_lock:
+        cached = _event_cache.get(key)
+
+    items = []
+    etag = None
+    page_token = None
+    while True:
+        page_size = None if max_results is None else min(max_results - len(items), EVENTS_PAGE_MAX)
+        request = service.events().list(
+            calendarId=calendar_id,
+            timeMin=time_min,
+            timeMax=time_max,
+            q=q,
+            maxResults=page_size,
+            pageToken=page_token,
+            singleEvents=True,
+            orderBy="startTime",
+        )
+        if cached and page_token is None:
+            request.headers["If-None-Match"] = cached[0]
+        try:
+            results = request.execute(http=http)
+        except HttpError as e:
+            if cached and page_token is None and e.resp.status == 304:
+                return cached[1]
+            raise
+        etag = etag or results.get("etag")
+        items.extend(results.get("items", []))
+        page_token = results.get("nextPageToken")
+        if not page_token or (max_results is not None and len(items) >= max_results):
+            break
+
+    if etag:
+        with _event_cache_lock:
+            _event_cache.pop(key, None)
+            _event_cache[key] = (etag, items)
+            while len(_event_cache) > EVENT_CACHE_SIZE:
+                _event_cache.pop(next(iter(_event_cache)))
+    return items
+
+
+def _minute(dt: datetime) -> str:
+    """ISO timestamp truncated to the minute, so "from now" queries repeat and hit the cache."""
+    return dt.replace(second=0, microsecond=0).isoformat()
+
+
+# --- Local event store & incremental sync -------------------------------------------------
+#
+# sync_calendar does one full paginated events().list per calendar and keeps the events in
+# memory with a start-time index; later syncs send the stored nextSyncToken and only apply
+# changed events. Once a calendar is synced, range and text queries are answered from the
+# index, and a query on a store older than CALENDAR_SYNC_MAX_AGE seconds first pulls the
+# (usually empty) delta. A 410 Gone means the sync token expired and triggers a full resync.
+
+CALENDAR_SYNC_MAX_AGE = int(os.environ.get("CALENDAR_SYNC_MAX_AGE", "30"))
+
+# calendar_id -> {"sync_token", "events": {id: event}, "index": sorted [(start, end, id)],
+#                 "max_duration", "synced_at"}
+_event_stores = {}
+_store_lock = threading.RLock()
+_sync_lock = threading.Lock()
+
+CALENDAR_FETCH_CONCURRENCY = 8
+_thread_state = threading.local()
+
+
+def _event_bounds(event: dict):
+    """(start, end) of an event as epoch seconds; all-day dates are local midnights."""
+    bounds = []
+    for key in ("start", "end"):
+        value = event.get(key, {})
+        if "dateTime" in value:
+            bounds.append(datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00")).timestamp())
         else:
-            raise ValueError("Authentication token missing or invalid. Please run 'python authenticate.py' first.")
+            bounds.append(datetime.fromisoformat(value["date"]).astimezone().timestamp())
+    return bounds[0], bounds[1]
+
+
+def _store_remove(store: dict, event_id: str):
+    old = store["events"].pop(event_id, None)
+    if old is not None:
+        key = (*_event_bounds(old), event_id)
+        position = bisect.bisect_left(store["index"], key)
+        if position < len(store["index"]) and store["index"][position] == key:
+            del store["index"][position]
+
+
+def _store_apply(store: dict, events: list):
+    """Apply changed events to a store: cancelled events are removed, others (re)indexed."""
+    for event in events:
+        _store_remove(store, event["id"])
+        if event.get("status") == "cancelled" or "start" not in event:
+            continue
+        start, end = _event_bounds(event)
+        store["events"][event["id"]] = event
+        bisect.insort(store["index"], (start, end, event["id"]))
+        store["max_duration"] = max(store["max_duration"], end - start)
+
+
+def _fetch_event_changes(service, calendar_id: str, sync_token=None, http=None):
+    """Page through events().list (full, or since sync_token). Returns (events, nextSyncToken)."""
+    events = []
+    page_token = None
+    while True:
+        results = (
+            service.events()
+            .list(
+                calendarId=calendar_id,
+                singleEvents=True,
+                maxResults=EVENTS_PAGE_MAX,
+                syncToken=sync_token,
+                pageToken=page_token,
+            )
+            .execute(http=http)
+        )
+        events.extend(results.get("items", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            return events, results.get("nextSyncToken")
+
+
+def _sync_calendar(service, calendar_id: str = "primary", full: bool = False, http=None) -> str:
+    """Bring one calendar's store up to date, resyncing fully when the token is gone."""
+    with _sync_lock:
+        store = _event_stores.get(calendar_id)
+        if store is not None and not full:
+            try:
+                changes, sync_token = _fetch_event_changes(service, calendar_id, store["sync_token"], http)
+                with _store_lock:
+                    _store_apply(store, changes)
+                    store["sync_token"] = sync_token
+                    store["synced_at"] = time.time()
+                return f"Incremental sync of '{calendar_id}': {len(changes)} changed event(s)."
+            except HttpError as e:
+                if e.resp.status != 410:
+                    raise
+
+        events, sync_token = _fetch_event_changes(service, calendar_id, http=http)
+        store = {"sync_token": sync_token, "events": {}, "index": [], "max_duration": 0.0}
+        _store_apply(store, events)
+        store["synced_at"] = time.time()
+        with _store_lock:
+            _event_stores[calendar_id] = store
+        return f"Full sync of '{calendar_id}': {len(store['events'])} event(s) stored."
+
+
+def _store_query(store: dict, time_min: float, time_max=None, q=None, max_results=None) -> list:
+    """Events overlapping [time_min, time_max) in start order, optionally text-filtered."""
+    index = store["index"]
+    # An event starting before time_min - max_duration cannot still be running at time_min.
+    lo = bisect.bisect_left(index, (time_min - store["max_duration"],))
+    hi = len(index) if time_max is None else bisect.bisect_left(index, (time_max,))
+    needle = q.lower() if q else None
+    events = []
+    for start, end, event_id in index[lo:hi]:
+        if end <= time_min:
+            continue
+        event = store["events"][event_id]
+        if needle and not any(
+            needle in event.get(field, "").lower() for field in ("summary", "description", "location")
+        ):
+            continue
+        events.append(event)
+        if max_results is not None and len(events) >= max_results:
+            break
+    return events
+
+
+def _query_events(
+    service, time_min: datetime, time_max=None, q=None, max_results=None, calendar_id="primary", http=None
+):
+    """Answer a range/text query from the local store when the calendar is synced, else the API."""
+    if calendar_id in _event_stores:
+        if time.time() - _event_stores[calendar_id]["synced_at"] > CALENDAR_SYNC_MAX_AGE:
+            _sync_calendar(service, calendar_id, http=http)
+        with _store_lock:
+            return _store_query(
+                _event_stores[calendar_id],
+                time_min.timestamp(),
+                None if time_max is None else time_max.timestamp(),
+                q,
+                max_results,
+            )
+    return _list_events_conditional(
+        service,
+        calendar_id=calendar_id,
+        time_min=_minute(time_min),
+        time_max=None if time_max is None else _minute(time_max),
+        q=q,
+        max_results=max_results,
+        http=http,
+    )
+
+
+def _thread_http():
+    """
+    One authorized HTTP connection per worker thread: httplib2 connections are not
+    thread-safe, so concurrent fetches must not share the cached service's connection.
+    """
+    if getattr(_thread_state, "http", None) is None:
+        _thread_state.http = AuthorizedHttp(_creds, http=httplib2.Http())
+    return _thread_state.http
+
+
+def _event_start(event: dict) -> float:
+    return _event_bounds(event)[0]
 
-    try:
-        service = build("calendar", "v3", credentials=creds)
-        return service
-    except Exception as e:
-        raise ValueError(f"Failed to build Calendar service: {e}")
+
+def _query_calendars(service, calendar_ids: list, time_min: datetime, time_max=None, q=None, max_results=None):
+    """
+    Query several calendars concurrently and k-way merge their start-ordered results with a
+    heap. Yields (calendar_id, event) lazily, so only the first max_results are materialized.
+    """
+    def _fetch(calendar_id):
+        events = _query_events(service, time_min, time_max, q, max_results, calendar_id, http=_thread_http())
+        return [(calendar_id, event) for event in events]
+
+    if len(calendar_ids) == 1:
+        per_calendar = [_fetch(calendar_ids[0])]
+    else:
+        workers = min(len(calendar_ids), CALENDAR_FETCH_CONCURRENCY)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            per_calendar = list(pool.map(_fetch, calendar_ids))
+    merged = heapq.merge(*per_calendar, key=lambda item: _event_start(item[1]))
+    return itertools.islice(merged, max_results)
+
+
+def _event_json(calendar_id: str, event: dict) -> str:
+    """One compact JSON line per event for output_format='jsonl'."""
+    start = event.get("start", {})
+    end = event.get("end", {})
+    return json.dumps({
+        "calendar": calendar_id,
+        "id": event.get("id"),
+        "summary": event.get("summary", "(No title)"),
+        "start": start.get("dateTime", start.get("date")),
+        "end": end.get("dateTime", end.get("date")),
+        "location": event.get("location", ""),
+    }, ensure_ascii=False)
+
+
+def _mark_stale(calendar_id: str = "primary"):
+    """After a write, make the next query pull the delta so it sees the change."""
+    with _store_lock:
+        if calendar_id in _event_stores:
+            _event_stores[calendar_id]["synced_at"] = 0.0
+
+
+# --- Free/busy slot finding -----------------------------------------------------------------
+
+# freebusy.query accepts up to 50 calendars per request; long ranges are split into windows.
+FREEBUSY_MAX_CALENDARS = 50
+FREEBUSY_WINDOW_DAYS = 60
+
+
+def _query_busy(service, calendar_ids: list, time_min: datetime, time_max: datetime):
+    """Busy (start, end) datetimes across calendars, plus {calendar_id: error} for failures."""
+    busy = []
+    errors = {}
+    window_start = time_min
+    while window_start < time_max:
+        window_end = min(time_max, window_start + timedelta(days=FREEBUSY_WINDOW_DAYS))
+        for offset in range(0, len(calendar_ids), FREEBUSY_MAX_CALENDARS):
+            body = {
+                "timeMin": window_start.isoformat(),
+                "timeMax": window_end.isoformat(),
+                "items": [{"id": cid} for cid in calendar_ids[offset:offset + FREEBUSY_MAX_CALENDARS]],
+            }
+            result = service.freebusy().query(body=body).execute()
+            for calendar_id, info in result.get("calendars", {}).items():
+                if info.get("errors"):
+                    errors[calendar_id] = info["errors"][0].get("reason", "unknown error")
+                for period in info.get("busy", []):
+                    busy.append((
+                        datetime.fromisoformat(period["start"].replace("Z", "+00:00")),
+                        datetime.fromisoformat(period["end"].replace("Z", "+00:00")),
+                    ))
+        window_start = window_end
+    return busy, errors
+
+
+def _merge_intervals(intervals: list) -> list:
+    """Sort intervals by start and merge overlapping or touching ones in one pass."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _free_slots(busy: list, windows: list, min_duration: timedelta) -> list:
+    """
+    Subtract merged busy intervals from sorted, non-overlapping availability windows and
+    keep the gaps of at least min_duration. Both lists are walked once (two pointers).
+    """
+    slots = []
+    i = 0
+    for window_start, window_end in windows:
+        while i < len(busy) and busy[i][1] <= window_start:
+            i += 1
+        cursor = window_start
+        j = i
+        while j < len(busy) and busy[j][0] < window_end:
+            if busy[j][0] - cursor >= min_duration:
+                slots.append((cursor, busy[j][0]))
+            cursor = max(cursor, busy[j][1])
+            j += 1
+        if window_end - cursor >= min_duration:
+            slots.append((cursor, window_end))
+    return slots
+
+
+_default_zone = None
+
+
+def _calendar_timezone(service):
+    """
+    The zone for working hours when none is given: the primary calendar's timeZone setting,
+    else the machine's IANA zone. A real zone, not a fixed UTC offset, so windows after a DST
+    change keep their wall-clock times. Looked up once per process.
+    """
+    global _default_zone
+    if _default_zone is None:
+        try:
+            name = service.calendars().get(calendarId="primary", fields="timeZone").execute().get("timeZone")
+            _default_zone = ZoneInfo(name)
+        except Exception:
+            _default_zone = _local_zone()
+    return _default_zone
+
+
+def _local_zone():
+    """The machine's IANA zone from $TZ or /etc/localtime, or its current fixed offset if unknown."""
+    candidates = [os.environ.get("TZ", "").lstrip(":")]
+    localtime = os.path.realpath("/etc/localtime")
+    if "zoneinfo/" in localtime:
+        candidates.append(localtime.split("zoneinfo/", 1)[1])
+    for name in candidates:
+        if name:
+            try:
+                return ZoneInfo(name)
+            except (ValueError, OSError):
+                continue
+    return datetime.now().astimezone().tzinfo
+
+
+def _working_windows(start: datetime, days: int, tz, day_start: dtime, day_end: dtime, include_weekends: bool) -> list:
+    """Working-hours windows in `tz` for each day from `start`, clipped so none begins before it."""
+    windows = []
+    first_day = start.astimezone(tz).date()
+    for offset in range(days + 1):
+        day = first_day + timedelta(days=offset)
+        if not include_weekends and day.weekday() >= 5:
+            continue
+        window_start = max(datetime.combine(day, day_start, tzinfo=tz), start)
+        window_end = datetime.combine(day, day_end, tzinfo=tz)
+        if window_start < window_end:
+            windows.append((window_start, window_end))
+    return windows
+
+
+CALENDAR_BATCH_SIZE = min(int(os.environ.get("CALENDAR_BATCH_SIZE", "50")), 1000)
+CALENDAR_BATCH_MAX_RETRIES = 4
+CALENDAR_BATCH_MAX_BACKOFF = 32.0
+
+
+def _local_offset() -> str:
+    """The machine's current UTC offset as '+HH:MM'."""
+    local_offset = datetime.now(timezone.utc).astimezone().strftime("%z")
+    return local_offset[:3] + ":" + local_offset[3:]
+
+
+def _ensure_tz(dt_str: str, offset=None) -> str:
+    """Append the local UTC offset (or `offset`) to an ISO datetime that has none."""
+    if "Z" not in dt_str and "+" not in dt_str and "-" not in dt_str[10:]:
+        return dt_str + (offset or _local_offset())
+    return dt_str
+
+
+def _is_retryable(error) -> bool:
+    """429, transient 5xx, and 403 rateLimitExceeded / userRateLimitExceeded are worth retrying."""
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    if status == 429 or status >= 500:
+        return True
+    if status == 403:
+        details = error.error_details if isinstance(error.error_details, list) else []
+        reasons = {d.get("reason") for d in details if isinstance(d, dict)}
+        return bool(reasons & {"rateLimitExceeded", "userRateLimitExceeded"}) or "rate limit" in str(error).lower()
+    return False
+
+
+def _error_text(error) -> str:
+    if isinstance(error, HttpError):
+        return f"{error.resp.status} {error.reason}"
+    return str(error)
+
+
+def _execute_batched(service, make_request, keys: list, batch_size: int = CALENDAR_BATCH_SIZE):
+    """
+    Send make_request(key) for every key through batch requests of `batch_size` calls each.
+    Calls failing with a retryable error are collected and resent in a later round after an
+    exponential backoff with jitter, up to CALENDAR_BATCH_MAX_RETRIES times. A network error
+    fails the calls of its chunk that got no answer, without retrying them.
+    Returns ({key: response}, {key: exception}, {key: attempts}, batch round-trips).
+    """
+    results = {}
+    errors = {}
+    attempts = dict.fromkeys(keys, 0)
+    pending = list(keys)
+    round_trips = 0
+
+    for round_number in range(CALENDAR_BATCH_MAX_RETRIES + 1):
+        if not pending:
+            break
+        if round_number:
+            time.sleep(min(CALENDAR_BATCH_MAX_BACKOFF, 2 ** (round_number - 1)) + random.uniform(0, 1))
+        retry = []
+        last_round = round_number == CALENDAR_BATCH_MAX_RETRIES
+
+        def _fail(key, exception):
+            if _is_retryable(exception) and not last_round:
+                retry.append(key)
+            else:
+                errors[key] = exception
+
+        def _collect(request_id, response, exception):
+            key = by_request_id[request_id]
+            if exception is not None:
+                _fail(key, exception)
+            else:
+                errors.pop(key, None)
+                results[key] = response
+
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            by_request_id = {str(i): key for i, key in enumerate(chunk)}
+            batch = service.new_batch_http_request(callback=_collect)
+            for request_id, key in by_request_id.items():
+                attempts[key] += 1
+                batch.add(make_request(key), request_id=request_id)
+            round_trips += 1
+            try:
+                batch.execute()
+            except HttpError as e:
+                # The batch envelope itself failed: none of its calls were applied.
+                for key in chunk:
+                    _fail(key, e)
+            except (httplib2.HttpLib2Error, OSError, TransportError) as e:
+                # The connection dropped mid-batch: record the chunk's calls that got no answer
+                # as failed and carry on, so the report still covers every chunk.
+                for key in chunk:
+                    if key not in results:
+                        errors[key] = e
+        pending = retry
+
+    return results, errors, attempts, round_trips
 
 
 def _format_event(event: dict) -> str:
@@ -66,33 +581,36 @@ def _format_event(event: dict) -> str:
 
 
 @mcp.tool()
-def list_events(limit: int = 10, days_ahead: int = 7) -> str:
-    """List upcoming calendar events in the next N days."""
+def list_events(limit: int = 10, days_ahead: int = 7, calendar_ids: str = "primary", output_format: str = "text") -> str:
+    """
+    List upcoming calendar events in the next N days.
+    `calendar_ids` is a comma-separated list (e.g. 'primary,team@example.com'); calendars are
+    fetched concurrently, all result pages are followed, and events are merged by start time.
+    output_format='jsonl' returns one compact JSON object per event instead of formatted text.
+    """
     try:
         service = get_calendar_service()
 
         now = datetime.now(timezone.utc)
         time_max = now + timedelta(days=days_ahead)
+        ids = [cid.strip() for cid in calendar_ids.split(",") if cid.strip()]
 
-        results = (
-            service.events()
-            .list(
-                calendarId="primary",
-                timeMin=now.isoformat(),
-                timeMax=time_max.isoformat(),
-                maxResults=limit,
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
-        )
-        events = results.get("items", [])
+        merged = _query_calendars(service, ids, now, time_max, max_results=limit)
+        if output_format == "jsonl":
+            lines = [_event_json(cid, event) for cid, event in merged]
+            if not lines:
+                return f"No upcoming events in the next {days_ahead} day(s)."
+            return "\n".join(lines)
 
-        if not events:
+        formatted = []
+        for cid, event in merged:
+            text = _format_event(event)
+            formatted.append(text + f"\n   Calendar: {cid}" if len(ids) > 1 else text)
+
+        if not formatted:
             return f"No upcoming events in the next {days_ahead} day(s)."
 
-        formatted = [_format_event(e) for e in events]
-        header = f"Found {len(events)} event(s) in the next {days_ahead} day(s):\n"
+        header = f"Found {len(formatted)} event(s) in the next {days_ahead} day(s):\n"
         return header + "\n---\n".join(formatted)
     except Exception as e:
         return f"Failed to list events: {str(e)}"
@@ -114,13 +632,6 @@ def create_event(
     try:
         service = get_calendar_service()
 
-        def _ensure_tz(dt_str: str) -> str:
-            if "Z" not in dt_str and "+" not in dt_str and "-" not in dt_str[10:]:
-                local_offset = datetime.now(timezone.utc).astimezone().strftime("%z")
-                offset_formatted = local_offset[:3] + ":" + local_offset[3:]
-                return dt_str + offset_formatted
-            return dt_str
-
         event_body: dict = {
             "summary": summary,
             "start": {"dateTime": _ensure_tz(start_datetime)},
@@ -132,6 +643,7 @@ def create_event(
             event_body["location"] = location
 
         created = service.events().insert(calendarId="primary", body=event_body).execute()
+        _mark_stale()
         return (
             f"Event created successfully!\n"
             f"  Title: {created.get('summary')}\n"
@@ -153,19 +665,7 @@ def search_events(query: str, limit: int = 10) -> str:
 
         now = datetime.now(timezone.utc)
 
-        results = (
-            service.events()
-            .list(
-                calendarId="primary",
-                q=query,
-                timeMin=now.isoformat(),
-                maxResults=limit,
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
-        )
-        events = results.get("items", [])
+        events = _query_events(service, now, q=query, max_results=limit)
 
         if not events:
             return f"No events found matching '{query}'."
@@ -183,6 +683,7 @@ def delete_event(event_id: str) -> str:
     try:
         service = get_calendar_service()
         service.events().delete(calendarId="primary", eventId=event_id).execute()
+        _mark_stale()
         return f"Event '{event_id}' deleted successfully."
     except Exception as e:
         return f"Failed to delete event: {str(e)}"
@@ -198,18 +699,7 @@ def get_todays_schedule() -> str:
         start_of_day = local_now.replace(hour=0, minute=0, second=0, microsecond=0)
         end_of_day = start_of_day + timedelta(days=1)
 
-        results = (
-            service.events()
-            .list(
-                calendarId="primary",
-                timeMin=start_of_day.isoformat(),
-                timeMax=end_of_day.isoformat(),
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
-        )
-        events = results.get("items", [])
+        events = _query_events(service, start_of_day, end_of_day)
 
         today_str = local_now.strftime("%A, %B %d, %Y")
         if not events:
@@ -222,5 +712,191 @@ def get_todays_schedule() -> str:
         return f"Failed to get today's schedule: {str(e)}"
 
 
+@mcp.tool()
+def find_free_slots(
+    duration_minutes: int = 30,
+    days_ahead: int = 7,
+    calendar_ids: str = "primary",
+    working_hours: str = "09:00-17:00",
+    timezone_name: str = "",
+    include_weekends: bool = False,
+    limit: int = 10,
+) -> str:
+    """
+    Find free time slots of at least `duration_minutes` in the next N days.
+    Busy times come from the free/busy API across all `calendar_ids` (comma-separated,
+    e.g. 'primary,team@example.com'), limited to `working_hours` ('HH:MM-HH:MM') in
+    `timezone_name` (IANA name such as 'Europe/Berlin'; defaults to the primary calendar's
+    timezone, else the machine's).
+    """
+    try:
+        service = get_calendar_service()
+
+        tz = ZoneInfo(timezone_name) if timezone_name else _calendar_timezone(service)
+        try:
+            day_start, day_end = (dtime.fromisoformat(t.strip()) for t in working_hours.split("-"))
+        except ValueError:
+            return "Error: working_hours must look like '09:00-17:00'."
+        ids = [cid.strip() for cid in calendar_ids.split(",") if cid.strip()]
+
+        # Start at the next quarter hour so slots begin on sensible boundaries.
+        now = datetime.now(tz).replace(second=0, microsecond=0)
+        now += timedelta(minutes=-now.minute % 15)
+        horizon = now + timedelta(days=days_ahead)
+
+        busy, errors = _query_busy(service, ids, now, horizon)
+        windows = [
+            (start, min(end, horizon))
+            for start, end in _working_windows(now, days_ahead, tz, day_start, day_end, include_weekends)
+            if start < horizon
+        ]
+        slots = _free_slots(_merge_intervals(busy), windows, timedelta(minutes=duration_minutes))
+
+        lines = []
+        for start, end in slots[:limit]:
+            start, end = start.astimezone(tz), end.astimezone(tz)
+            minutes = int((end - start).total_seconds() // 60)
+            lines.append(f"  {start:%a %Y-%m-%d %H:%M} – {end:%H:%M} ({minutes} min free)")
+        for calendar_id, reason in errors.items():
+            lines.append(f"  ⚠️ Could not read '{calendar_id}': {reason}")
+
+        if not slots:
+            return f"No free slots of {duration_minutes} min in the next {days_ahead} day(s).\n" + "\n".join(lines)
+        header = (
+            f"Found {len(slots)} free slot(s) of at least {duration_minutes} min "
+            f"({working_hours}, {tz}) — showing {min(limit, len(slots))}:\n"
+        )
+        return header + "\n".join(lines)
+    except Exception as e:
+        return f"Failed to find free slots: {str(e)}"
+
+
+@mcp.tool()
+def sync_calendar(calendar_id: str = "primary", full: bool = False) -> str:
+    """
+    Sync a calendar into the local event store.
+    The first run (or full=True) downloads all events; later runs fetch only changes via
+    the sync token. Once synced, list_events, search_events and get_todays_schedule are
+    answered from the store.
+    """
+    try:
+        service = get_calendar_service()
+        return _sync_calendar(service, calendar_id, full)
+    except Exception as e:
+        return f"Failed to sync calendar: {str(e)}"
+
+
+@mcp.tool()
+def create_events_bulk(events: str, calendar_id: str = "primary") -> str:
+    """
+    Create many calendar events at once.
+    `events` is a JSON array of objects with 'summary', 'start' and 'end' (ISO 8601, as in
+    create_event) and optional 'description' and 'location'. Events are sent in Google API
+    batch requests of CALENDAR_BATCH_SIZE; rate-limited or 5xx items are retried with backoff.
+    Each event gets a client-generated ID, so a retry of an insert the server already applied
+    is rejected as a duplicate instead of creating a second event.
+    Returns one result line per event.
+    """
+    try:
+        items = json.loads(events)
+        if not isinstance(items, list):
+            return "Failed to create events: 'events' must be a JSON array of event objects."
+
+        # Normalize the whole batch up front: one offset lookup, and invalid items never hit the API.
+        offset = _local_offset()
+        bodies = {}
+        invalid = {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                invalid[index] = "not a JSON object"
+                continue
+            start = item.get("start") or item.get("start_datetime")
+            end = item.get("end") or item.get("end_datetime")
+            if not start or not end:
+                invalid[index] = "missing start or end"
+                continue
+            body = {
+                # Calendar event IDs are base32hex; lowercase hex is a valid subset.
+                "id": uuid.uuid4().hex,
+                "summary": item.get("summary", "(No title)"),
+                "start": {"dateTime": _ensure_tz(start, offset)},
+                "end": {"dateTime": _ensure_tz(end, offset)},
+            }
+            if item.get("description"):
+                body["description"] = item["description"]
+            if item.get("location"):
+                body["location"] = item["location"]
+            bodies[index] = body
+
+        service = get_calendar_service()
+        created, errors, attempts, round_trips = _execute_batched(
+            service,
+            lambda index: service.events().insert(calendarId=calendar_id, body=bodies[index]),
+            list(bodies),
+        )
+        for index, error in list(errors.items()):
+            # 409 on a retried insert: the earlier attempt did create the event.
+            if attempts[index] > 1 and isinstance(error, HttpError) and error.resp.status == 409:
+                created[index] = bodies[index]
+                del errors[index]
+        if created:
+            _mark_stale(calendar_id)
+
+        lines = []
+        for index, item in enumerate(items):
+            title = item.get("summary", "(No title)") if isinstance(item, dict) else "?"
+            if index in created:
+                lines.append(f"[{index + 1}] created: {title} (ID: {created[index].get('id')})")
+            elif index in invalid:
+                lines.append(f"[{index + 1}] skipped: {title} - {invalid[index]}")
+            else:
+                lines.append(f"[{index + 1}] FAILED: {title} - {_error_text(errors[index])}")
+        retried = sum(1 for n in attempts.values() if n > 1)
+        header = (
+            f"Created {len(created)}/{len(items)} event(s) in {round_trips} batch request(s); "
+            f"{len(errors)} failed, {len(invalid)} skipped, {retried} retried.\n"
+        )
+        return header + "\n".join(lines)
+    except Exception as e:
+        return f"Failed to create events: {str(e)}"
+
+
+@mcp.tool()
+def delete_events_bulk(event_ids: str, calendar_id: str = "primary") -> str:
+    """
+    Delete many calendar events at once by ID (comma-separated).
+    Deletions are sent in Google API batch requests with retries on rate limits and 5xx errors.
+    Returns one result line per event ID.
+    """
+    try:
+        ids = list(dict.fromkeys(eid.strip() for eid in event_ids.split(",") if eid.strip()))
+        service = get_calendar_service()
+        deleted, errors, attempts, round_trips = _execute_batched(
+            service,
+            lambda event_id: service.events().delete(calendarId=calendar_id, eventId=event_id),
+            ids,
+        )
+        for event_id, error in list(errors.items()):
+            # 404/410 on a retried delete: the earlier attempt did remove the event.
+            if attempts[event_id] > 1 and isinstance(error, HttpError) and error.resp.status in (404, 410):
+                deleted[event_id] = None
+                del errors[event_id]
+        if deleted:
+            _mark_stale(calendar_id)
+
+        lines = [
+            f"{event_id}: deleted" if event_id in deleted else f"{event_id}: FAILED - {_error_text(errors[event_id])}"
+            for event_id in ids
+        ]
+        retried = sum(1 for n in attempts.values() if n > 1)
+        header = (
+            f"Deleted {len(deleted)}/{len(ids)} event(s) in {round_trips} batch request(s); "
+            f"{len(errors)} failed, {retried} retried.\n"
+        )
+        return header + "\n".join(lines)
+    except Exception as e:
+        return f"Failed to delete events: {str(e)}"
+
+
 if __name__ == "__main__":
     mcp.run(transport="stdio")
@@ -1,11 +1,25 @@
 import os
+import re
 import base64
+import codecs
+import html
+import json
+import random
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from email.message import EmailMessage
 from mcp.server.fastmcp import FastMCP
 
+import httplib2
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
 mcp = FastMCP("Email Automation Server (Gmail API)")
 
@@ -13,43 +27,721 @@ SCOPES = ["https://mail.google.com/"]
 DIR_PATH = os.path.dirname(os.path.abspath(__file__))
 TOKEN_PATH = os.path.join(DIR_PATH, "token.json")
 
+# Gmail accepts up to 100 calls per batch, but recommends 50 to avoid per-call rate limiting.
+GMAIL_BATCH_SIZE = max(1, min(int(os.environ.get("GMAIL_BATCH_SIZE", "50")), 100))
+
+# Listing mode: only the headers we display plus Gmail's snippet, no MIME bodies.
+LISTING_HEADERS = ["Subject", "From", "Date"]
+LISTING_FIELDS = "id,threadId,snippet,payload/headers"
+
+# users.messages.batchModify accepts at most 1,000 ids per call.
+GMAIL_MODIFY_CHUNK = 1000
+
+# Local message store (see sync_mailbox). GMAIL_SYNC_INTERVAL > 0 keeps it fresh from a
+# background thread; otherwise a read older than GMAIL_STORE_MAX_AGE seconds syncs first.
+STORE_PATH = os.environ.get("GMAIL_STORE_PATH", os.path.join(DIR_PATH, "mail_store.db"))
+GMAIL_SYNC_MAX_MESSAGES = int(os.environ.get("GMAIL_SYNC_MAX_MESSAGES", "2000"))
+GMAIL_SYNC_INTERVAL = int(os.environ.get("GMAIL_SYNC_INTERVAL", "0"))
+GMAIL_STORE_MAX_AGE = int(os.environ.get("GMAIL_STORE_MAX_AGE", "60"))
+STORE_BODY_CHARS = 20000
+# Batch sub-requests answered with 429/5xx are re-fetched this many times during a sync,
+# waiting 1, 2, 4... seconds (capped at GMAIL_SYNC_MAX_BACKOFF) plus jitter in between.
+GMAIL_SYNC_RETRIES = 3
+GMAIL_SYNC_MAX_BACKOFF = 8.0
+
+# Body extraction: characters shown in previews, base64 characters decoded per step
+# (a multiple of 4), and how much raw HTML to decode per visible character when there
+# is no text/plain part.
+PREVIEW_CHARS = 300
+DECODE_CHUNK = 64 * 1024
+HTML_RAW_FACTOR = 10
+
+# Bulk sending. Gmail allows 250 quota units per user per second and messages.send costs
+# 100, so 2.5 sends/second is the sustained ceiling; GMAIL_SEND_BURST sends may go at once.
+GMAIL_SEND_RATE = float(os.environ.get("GMAIL_SEND_RATE", "2.5"))
+GMAIL_SEND_BURST = int(os.environ.get("GMAIL_SEND_BURST", "5"))
+GMAIL_SEND_MAX_CONCURRENCY = 8
+GMAIL_SEND_MAX_RETRIES = 5
+GMAIL_SEND_MAX_BACKOFF = 32.0
+
+_service = None
+_creds = None
+_service_lock = threading.Lock()
+
 def get_gmail_service():
-    """Get the Gmail API service instance using OAuth 2.0 credentials."""
-    creds = None
+    """
+    Get the Gmail API service instance using OAuth 2.0 credentials.
+    The service is built once per process and reused; credentials are only refreshed
+    (and token.json rewritten) once they expire, under a lock shared by all tool calls.
+    """
+    global _service, _creds
     
-    if os.path.exists(TOKEN_PATH):
-        creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+    if _service is not None and _creds.valid:
+        return _service
     
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+    with _service_lock:
+        # Another tool call may have refreshed the credentials while we waited for the lock.
+        if _service is not None and _creds.valid:
+            return _service
+        
+        creds = _creds
+        if creds is None and os.path.exists(TOKEN_PATH):
+            creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+        
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                try:
+                    creds.refresh(Request())
+                    with open(TOKEN_PATH, "w") as token:
+                        token.write(creds.to_json())
+                except Exception as e:
+                    raise ValueError(f"Failed to refresh token: {e}. Please run authenticate.py again.")
+            else:
+                raise ValueError(f"Authentication token missing or invalid. Please run 'python authenticate.py' first.")
+        
+        if _service is None:
             try:
-                creds.refresh(Request())
-                with open(TOKEN_PATH, "w") as token:
-                    token.write(creds.to_json())
+                _service = build("gmail", "v1", credentials=creds)
             except Exception as e:
-                raise ValueError(f"Failed to refresh token: {e}. Please run authenticate.py again.")
+                raise ValueError(f"Failed to build Gmail service: {e}")
+        _creds = creds
+        return _service
+
+def _part_charset(part):
+    """Charset declared in a MIME part's Content-Type header, defaulting to UTF-8."""
+    for header in part.get('headers', []):
+        if header['name'].lower() == 'content-type':
+            match = re.search(r'charset="?([^";\s]+)', header['value'], re.IGNORECASE)
+            if match:
+                try:
+                    return codecs.lookup(match.group(1)).name
+                except LookupError:
+                    pass
+    return 'utf-8'
+
+def _decode_part_text(part, max_chars=None):
+    """
+    Decode a part's base64url body in DECODE_CHUNK steps with an incremental decoder for its
+    charset, stopping as soon as max_chars characters have been produced.
+    """
+    data = part.get('body', {}).get('data')
+    if not data:
+        return ""
+    decoder = codecs.getincrementaldecoder(_part_charset(part))(errors='ignore')
+    chunks = []
+    decoded = 0
+    for start in range(0, len(data), DECODE_CHUNK):
+        piece = data[start:start + DECODE_CHUNK]
+        piece += "=" * (-len(piece) % 4)
+        text = decoder.decode(base64.urlsafe_b64decode(piece), final=start + DECODE_CHUNK >= len(data))
+        chunks.append(text)
+        decoded += len(text)
+        if max_chars is not None and decoded >= max_chars:
+            break
+    return "".join(chunks)
+
+def _html_to_text(markup):
+    """Crude HTML-to-text for bodies without a text/plain alternative."""
+    text = re.sub(r"<(script|style|head)\b.*?</\1\s*>", " ", markup, flags=re.IGNORECASE | re.DOTALL)
+    text = re.sub(r"<(br|/p|/div|/tr|/li|/h\d)\b[^>]*>", "\n", text, flags=re.IGNORECASE)
+    text = html.unescape(re.sub(r"<[^>]*>", "", text))
+    text = re.sub(r"[ \t\r\f\v]+", " ", text)
+    return re.sub(r"\s*\n\s*", "\n", text).strip()
+
+def _extract_body_text(payload, max_chars=None):
+    """
+    Extract readable body text from a full-format payload (or any MIME part).
+    text/plain parts are preferred; text/html is stripped of markup as a fallback. Parts with a
+    filename are attachments and never decoded, and decoding stops once max_chars characters
+    have been collected, so multi-MB messages cost no more than the text actually shown.
+    """
+    plain_parts = []
+    html_parts = []
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        if 'parts' in part:
+            stack.extend(reversed(part['parts']))
+        elif part.get('filename'):
+            continue
+        elif part.get('mimeType') == 'text/plain':
+            plain_parts.append(part)
+        elif part.get('mimeType') == 'text/html':
+            html_parts.append(part)
+    
+    chunks = []
+    remaining = max_chars
+    for part in plain_parts:
+        text = _decode_part_text(part, remaining)
+        chunks.append(text)
+        if remaining is not None:
+            remaining -= len(text)
+            if remaining <= 0:
+                break
+    
+    if not "".join(chunks).strip():
+        chunks = []
+        remaining = max_chars
+        for part in html_parts:
+            # Markup inflates the raw text, so decode a multiple of the visible budget.
+            raw_budget = None if remaining is None else remaining * HTML_RAW_FACTOR
+            text = _html_to_text(_decode_part_text(part, raw_budget))
+            chunks.append(text)
+            if remaining is not None:
+                remaining -= len(text)
+                if remaining <= 0:
+                    break
+    
+    body = "".join(chunks)
+    return body if max_chars is None else body[:max_chars]
+
+def _batch_get_messages(service, message_ids, batch_size=GMAIL_BATCH_SIZE, http=None, **get_kwargs):
+    """
+    Fetch messages with Gmail batch requests, one HTTP round-trip per `batch_size` ids,
+    over `http` if given (else the service's own connection).
+    Returns (messages in the order of message_ids, {message_id: exception} for failed ids).
+    """
+    fetched = {}
+    errors = {}
+
+    def _collect(request_id, response, exception):
+        if exception is not None:
+            errors[request_id] = exception
         else:
-            raise ValueError(f"Authentication token missing or invalid. Please run 'python authenticate.py' first.")
-            
+            fetched[request_id] = response
+
+    for start in range(0, len(message_ids), batch_size):
+        batch = service.new_batch_http_request(callback=_collect)
+        for message_id in message_ids[start:start + batch_size]:
+            batch.add(
+                service.users().messages().get(userId='me', id=message_id, **get_kwargs),
+                request_id=message_id,
+            )
+        batch.execute(http=http)
+
+    return [fetched[i] for i in message_ids if i in fetched], errors
+
+def _list_message_ids(service, query, max_results=None, http=None):
+    """
+    Page through messages.list with nextPageToken and return every matching message id
+    (newest first), stopping early once max_results ids have been collected.
+    """
+    message_ids = []
+    page_token = None
+    while True:
+        results = service.users().messages().list(
+            userId='me', q=query, maxResults=500, pageToken=page_token,
+            fields='messages/id,nextPageToken',
+        ).execute(http=http)
+        message_ids.extend(m['id'] for m in results.get('messages', []))
+        page_token = results.get('nextPageToken')
+        if not page_token or (max_results is not None and len(message_ids) >= max_results):
+            return message_ids[:max_results]
+
+def _format_email(sender, date, subject, preview):
+    """Render one email as the From/Date/Subject/preview block shared by all listing paths."""
+    preview = preview[:PREVIEW_CHARS] + "..." if len(preview) > PREVIEW_CHARS else preview
+    return f"From: {sender}\nDate: {date}\nSubject: {subject}\nBody preview:\n{preview}\n"
+
+def _format_message(msg, include_body=True):
+    """
+    Format a Gmail message resource into the From/Date/Subject/preview block.
+    With include_body=False the preview is Gmail's snippet, so metadata-only messages work.
+    """
+    payload = msg['payload']
+    headers = payload.get('headers', [])
+    
+    subject = next((h['value'] for h in headers if h['name'] == 'Subject'), "No Subject")
+    sender = next((h['value'] for h in headers if h['name'] == 'From'), "Unknown Sender")
+    date = next((h['value'] for h in headers if h['name'] == 'Date'), "Unknown Date")
+    
+    if not include_body:
+        snippet = html.unescape(msg.get('snippet', '')) or "No preview available."
+        return _format_email(sender, date, subject, snippet)
+    
+    # One character past the preview is enough to know whether to print "...".
+    body = _extract_body_text(payload, max_chars=PREVIEW_CHARS + 1)
+    return _format_email(sender, date, subject, body or "No text body found.")
+
+# --- Local message store & incremental sync -------------------------------------------------
+#
+# The store keeps headers, snippet and extracted body text of the newest messages in SQLite.
+# A full sync lists the mailbox page by page and records the mailbox historyId; every later
+# sync only replays users.history.list deltas since that id. Once synced, read_recent_emails
+# and search_emails answer from the store (and its FTS5 index) without any Gmail round-trip.
+
+_store_initialized = None  # STORE_PATH whose schema has been created
+_fts_available = False
+_sync_lock = threading.Lock()
+
+def _store_connect():
+    """Open the local message store, creating the schema on first use."""
+    global _store_initialized, _fts_available
+    conn = sqlite3.connect(STORE_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if _store_initialized != STORE_PATH:
+        conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS messages (
+                id TEXT PRIMARY KEY,
+                thread_id TEXT,
+                internal_date INTEGER,
+                subject TEXT,
+                sender TEXT,
+                date TEXT,
+                snippet TEXT,
+                body TEXT,
+                label_ids TEXT
+            );
+            CREATE INDEX IF NOT EXISTS messages_by_date ON messages (internal_date DESC);
+            CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        try:
+            conn.execute(
+                # Rows share their rowid with the messages table, so matches join without lookups.
+                "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(subject, sender, body)"
+            )
+            _fts_available = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: text searches keep going to the Gmail API.
+            _fts_available = False
+        _store_initialized = STORE_PATH
+    return conn
+
+def _store_get_state(conn, key, default=None):
+    row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else default
+
+def _store_set_state(conn, key, value):
+    conn.execute(
+        "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, str(value)),
+    )
+
+def _store_delete_messages(conn, message_ids):
+    params = [(i,) for i in message_ids]
+    if _fts_available:
+        conn.executemany(
+            "DELETE FROM messages_fts WHERE rowid IN (SELECT rowid FROM messages WHERE id = ?)", params
+        )
+    conn.executemany("DELETE FROM messages WHERE id = ?", params)
+
+def _store_upsert_messages(conn, messages):
+    """Insert or replace full-format Gmail messages in the store."""
+    rows = []
+    for msg in messages:
+        headers = msg['payload'].get('headers', [])
+        rows.append((
+            msg['id'],
+            msg.get('threadId'),
+            int(msg.get('internalDate', 0)),
+            next((h['value'] for h in headers if h['name'] == 'Subject'), "No Subject"),
+            next((h['value'] for h in headers if h['name'] == 'From'), "Unknown Sender"),
+            next((h['value'] for h in headers if h['name'] == 'Date'), "Unknown Date"),
+            html.unescape(msg.get('snippet', '')),
+            _extract_body_text(msg['payload'], max_chars=STORE_BODY_CHARS),
+            # Space-padded so a single label can be matched with LIKE '% UNREAD %'.
+            " " + " ".join(msg.get('labelIds', [])) + " ",
+        ))
+    _store_delete_messages(conn, [row[0] for row in rows])
+    conn.executemany(
+        "INSERT INTO messages "
+        "(id, thread_id, internal_date, subject, sender, date, snippet, body, label_ids) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    if _fts_available:
+        conn.executemany(
+            "INSERT INTO messages_fts (rowid, subject, sender, body) "
+            "SELECT rowid, subject, sender, body FROM messages WHERE id = ?",
+            [(row[0],) for row in rows],
+        )
+
+def _fetch_into_store(service, conn, message_ids, http):
+    """
+    Batch-fetch full messages and upsert them. Gmail batches often answer some sub-requests
+    with 429, so ids that hit a rate limit or 5xx are re-fetched with backoff; a 404 means the
+    message was deleted meanwhile. Returns the number of ids that still failed.
+    """
+    pending = list(message_ids)
+    failed = 0
+    for attempt in range(GMAIL_SYNC_RETRIES + 1):
+        if attempt:
+            time.sleep(min(GMAIL_SYNC_MAX_BACKOFF, 2 ** (attempt - 1)) + random.uniform(0, 1))
+        fetched, errors = _batch_get_messages(service, pending, http=http, format='full')
+        _store_upsert_messages(conn, fetched)
+        pending = []
+        for message_id, error in errors.items():
+            if not isinstance(error, HttpError):
+                failed += 1
+            elif _is_retryable(error):
+                pending.append(message_id)
+            elif error.resp.status != 404:
+                failed += 1
+        if not pending:
+            break
+    return failed + len(pending)
+
+def _full_sync(service, conn, http):
+    """Cold start: record the current historyId, then store the newest GMAIL_SYNC_MAX_MESSAGES."""
+    # Read the historyId first so changes made while we list are replayed by the next delta sync.
+    history_id = service.users().getProfile(userId='me').execute(http=http)['historyId']
+    message_ids = _list_message_ids(service, "", max_results=GMAIL_SYNC_MAX_MESSAGES, http=http)
+    
+    conn.execute("DELETE FROM messages")
+    if _fts_available:
+        conn.execute("DELETE FROM messages_fts")
+    failed = _fetch_into_store(service, conn, message_ids, http)
+    _store_set_state(conn, "failed", failed)
+    if failed:
+        # Without a historyId the store is not used for reads and the next sync starts over.
+        conn.execute("DELETE FROM sync_state WHERE key IN ('history_id', 'complete')")
+        return f"Full sync stored {len(message_ids) - failed} email(s); {failed} failed, the next sync retries."
+    _store_set_state(conn, "history_id", history_id)
+    # When the cap was not reached the store mirrors the whole mailbox (minus spam/trash).
+    _store_set_state(conn, "complete", int(len(message_ids) < GMAIL_SYNC_MAX_MESSAGES))
+    return f"Full sync stored {len(message_ids)} email(s) (0 failed)."
+
+def _incremental_sync(service, conn, start_history_id, http):
+    """Replay users.history.list deltas since start_history_id into the store."""
+    added = {}
+    deleted = set()
+    label_updates = {}
+    page_token = None
+    latest_history_id = start_history_id
+    while True:
+        results = service.users().history().list(
+            userId='me', startHistoryId=start_history_id, pageToken=page_token,
+            historyTypes=['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved'],
+        ).execute(http=http)
+        for record in results.get('history', []):
+            for item in record.get('messagesAdded', []):
+                added[item['message']['id']] = True
+                deleted.discard(item['message']['id'])
+            for item in record.get('messagesDeleted', []):
+                added.pop(item['message']['id'], None)
+                deleted.add(item['message']['id'])
+            for item in record.get('labelsAdded', []) + record.get('labelsRemoved', []):
+                label_updates[item['message']['id']] = item['message'].get('labelIds', [])
+        latest_history_id = results.get('historyId', latest_history_id)
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+    
+    failed = _fetch_into_store(service, conn, list(added), http)
+    _store_delete_messages(conn, deleted)
+    conn.executemany(
+        "UPDATE messages SET label_ids = ? WHERE id = ?",
+        [(" " + " ".join(labels) + " ", i) for i, labels in label_updates.items()
+         if i not in added and i not in deleted],
+    )
+    _store_set_state(conn, "failed", failed)
+    # Keep the old historyId while messages are missing, so the next sync replays the same
+    # deltas (every step is idempotent) and fetches them again.
+    if not failed:
+        _store_set_state(conn, "history_id", latest_history_id)
+    return (
+        f"Incremental sync: {len(added) - failed} added, {len(deleted)} deleted, "
+        f"{len(label_updates)} relabelled ({failed} failed)."
+    )
+
+def _sync_store(full=False):
+    """
+    Bring the local store up to date. Falls back to a full sync when history has expired.
+    Requests go over the calling thread's own connection, so the background sync thread never
+    shares the cached service's connection with tool calls.
+    """
+    with _sync_lock:
+        service = get_gmail_service()
+        http = _thread_http()
+        conn = _store_connect()
+        try:
+            with conn:
+                history_id = _store_get_state(conn, "history_id")
+                if full or not history_id:
+                    summary = _full_sync(service, conn, http)
+                else:
+                    try:
+                        summary = _incremental_sync(service, conn, history_id, http)
+                    except HttpError as e:
+                        # Gmail only keeps about a week of history; an expired id returns 404.
+                        if e.resp.status != 404:
+                            raise
+                        summary = _full_sync(service, conn, http)
+                # After failures the store stays stale, so the next read syncs again.
+                if _store_get_state(conn, "failed", "0") == "0":
+                    _store_set_state(conn, "last_sync", time.time())
+            return summary
+        finally:
+            conn.close()
+
+def _mark_store_stale(read_ids=()):
+    """
+    After a write, make the next read pull the history delta so it sees the change. Emails
+    just marked read (read_ids) also lose UNREAD in the store right away.
+    """
+    if not os.path.exists(STORE_PATH):
+        return
+    # Under the sync lock, so a sync that started before the write cannot stamp over this.
+    with _sync_lock:
+        conn = _store_connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "UPDATE messages SET label_ids = REPLACE(label_ids, ' UNREAD ', ' ') WHERE id = ?",
+                    [(i,) for i in read_ids],
+                )
+                _store_set_state(conn, "last_sync", 0)
+        except sqlite3.Error as e:
+            print(f"Could not mark the mail store stale: {e}", file=sys.stderr)
+        finally:
+            conn.close()
+
+# Gmail search operators that map onto system labels in the store.
+_QUERY_LABELS = {
+    ("is", "unread"): "UNREAD", ("is", "starred"): "STARRED", ("is", "important"): "IMPORTANT",
+    ("in", "inbox"): "INBOX", ("in", "sent"): "SENT", ("in", "drafts"): "DRAFT",
+    ("in", "spam"): "SPAM", ("in", "trash"): "TRASH",
+}
+_SYSTEM_LABELS = {"INBOX", "UNREAD", "STARRED", "IMPORTANT", "SENT", "DRAFT", "SPAM", "TRASH"}
+_QUERY_TOKEN = re.compile(r'([A-Za-z_]+):("[^"]*"|\S+)|"([^"]*)"|(\S+)')
+
+def _fts_phrase(text):
+    """Quote text as an FTS5 phrase so user input never reaches the MATCH syntax."""
+    return '"' + text.replace('"', '""') + '"'
+
+def _query_timestamp_ms(operator, value):
+    """Convert an after:/before:/newer_than:/older_than: value to epoch milliseconds."""
+    if operator in ("newer_than", "older_than"):
+        match = re.fullmatch(r"(\d+)([dmy])", value.lower())
+        if not match:
+            return None
+        days = int(match.group(1)) * {"d": 1, "m": 30, "y": 365}[match.group(2)]
+        return int((time.time() - days * 86400) * 1000)
+    if value.isdigit():
+        return int(value) * 1000
     try:
-        service = build("gmail", "v1", credentials=creds)
-        return service
-    except Exception as e:
-        raise ValueError(f"Failed to build Gmail service: {e}")
-
-def _extract_body_text(parts):
-    """Helper to extract text/plain from nested payload parts."""
-    text_content = ""
-    if not parts:
-        return text_content
-    for part in parts:
-        if part.get('mimeType') == 'text/plain':
-            data = part.get('body', {}).get('data')
-            if data:
-                text_content += base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-        elif 'parts' in part:
-            text_content += _extract_body_text(part['parts'])
-    return text_content
+        day = datetime.strptime(value.replace("-", "/"), "%Y/%m/%d")
+    except ValueError:
+        return None
+    return int(day.timestamp() * 1000)
+
+def _local_query_sql(query):
+    """
+    Translate a Gmail search query into a WHERE clause over the local store.
+    Supports from:, subject:, after:/before:, newer_than:/older_than:, is:/in:/label: on
+    system labels, and free-text words or "phrases". from: is a substring match on the From
+    header, looser than Gmail's address matching. Returns (where_sql, params), or None when
+    the query uses anything else (OR, negation, grouping, to:, has:, from:me, ...) and must
+    be sent to the Gmail API instead.
+    """
+    clauses = []
+    params = []
+    fts_terms = []
+    hidden = {"SPAM", "TRASH"}
+    
+    for match in _QUERY_TOKEN.finditer(query):
+        operator, value, phrase, word = match.groups()
+        if operator:
+            operator = operator.lower()
+            value = value.strip('"')
+            if operator == "from":
+                if value.lower() == "me":
+                    return None  # the account's own address, which the store does not know
+                clauses.append("sender LIKE ?")
+                params.append(f"%{value}%")
+            elif operator == "subject":
+                fts_terms.append(f"subject : {_fts_phrase(value)}")
+            elif operator in ("after", "before", "newer_than", "older_than"):
+                timestamp = _query_timestamp_ms(operator, value)
+                if timestamp is None:
+                    return None
+                clauses.append("internal_date >= ?" if operator in ("after", "newer_than") else "internal_date < ?")
+                params.append(timestamp)
+            elif (operator, value.lower()) == ("is", "read"):
+                clauses.append("label_ids NOT LIKE '% UNREAD %'")
+            elif (operator, value.lower()) == ("in", "anywhere"):
+                hidden = set()
+            elif (operator, value.lower()) in _QUERY_LABELS or (operator == "label" and value.upper() in _SYSTEM_LABELS):
+                label = _QUERY_LABELS.get((operator, value.lower()), value.upper())
+                hidden.discard(label)
+                clauses.append("label_ids LIKE ?")
+                params.append(f"% {label} %")
+            else:
+                return None
+        elif phrase is not None:
+            fts_terms.append(_fts_phrase(phrase))
+        elif word == "AND":
+            continue
+        elif word == "OR" or word[0] in "-({" or any(c in word for c in '(){}"'):
+            return None
+        else:
+            fts_terms.append(_fts_phrase(word))
+    
+    if fts_terms:
+        if not _fts_available:
+            return None
+        clauses.append("rowid IN (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?)")
+        params.append(" ".join(fts_terms))
+    for label in sorted(hidden):
+        clauses.append("label_ids NOT LIKE ?")
+        params.append(f"% {label} %")
+    return " AND ".join(clauses), params
+
+def _read_from_store(limit, include_body, query=""):
+    """
+    Serve the newest emails matching query from the local store, syncing first if it is
+    older than GMAIL_STORE_MAX_AGE. Returns None when the store cannot answer: never synced,
+    a query it cannot evaluate, messages the last sync failed to fetch, or fewer hits than
+    `limit` in a store capped before the end of the mailbox (older matches may exist only
+    on the server).
+    """
+    if not os.path.exists(STORE_PATH):
+        return None  # sync_mailbox has never run; do not create an empty store
+    conn = _store_connect()
+    try:
+        if not _store_get_state(conn, "history_id"):
+            return None
+        where = _local_query_sql(query)
+        if where is None:
+            return None
+        if time.time() - float(_store_get_state(conn, "last_sync", 0)) > GMAIL_STORE_MAX_AGE:
+            conn.close()
+            _sync_store()
+            conn = _store_connect()
+        if _store_get_state(conn, "failed", "0") != "0":
+            return None
+        where_sql, params = where
+        rows = conn.execute(
+            "SELECT sender, date, subject, snippet, body FROM messages "
+            f"WHERE {where_sql} ORDER BY internal_date DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        if len(rows) < limit and _store_get_state(conn, "complete") != "1":
+            return None
+    finally:
+        conn.close()
+    
+    if not rows:
+        return "No emails found."
+    return "\n---\n".join(
+        _format_email(
+            row["sender"], row["date"], row["subject"],
+            (row["body"] or "No text body found.") if include_body else (row["snippet"] or "No preview available."),
+        )
+        for row in rows
+    )
+
+def _background_sync_loop(interval):
+    while True:
+        try:
+            _sync_store()
+        except Exception as e:
+            print(f"Background mail sync failed: {e}", file=sys.stderr)
+        time.sleep(interval)
+
+# --- Bulk sending ------------------------------------------------------------------------------
+
+_thread_state = threading.local()
+
+def _build_raw_message(to_email, subject, body):
+    """Encode a plain-text email as the {'raw': ...} body of messages.send."""
+    message = EmailMessage()
+    message.set_content(body)
+    message['To'] = to_email
+    message['Subject'] = subject
+    return {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()}
+
+def _thread_http():
+    """
+    One authorized HTTP connection per thread: httplib2 connections are not thread-safe,
+    so concurrent sends and the background sync must not share the cached service's connection.
+    """
+    if getattr(_thread_state, "http", None) is None:
+        _thread_state.http = AuthorizedHttp(_creds, http=httplib2.Http())
+    return _thread_state.http
+
+def _token_bucket(rate, capacity):
+    """
+    Shared send scheduler state: up to `rate` tokens/second, at most `capacity` banked.
+    The current rate adapts (AIMD): halved on every rate-limit response, then raised by
+    2% of the maximum per successful send until it is back at `rate`.
+    """
+    return {
+        "max_rate": rate, "rate": rate, "capacity": capacity, "tokens": float(capacity),
+        "updated": time.monotonic(), "paused_until": 0.0, "rate_limited": 0,
+        "lock": threading.Lock(),
+    }
+
+def _take_token(bucket):
+    """Block until the bucket has a token (and no rate-limit pause is active), then take it."""
+    while True:
+        with bucket["lock"]:
+            now = time.monotonic()
+            bucket["tokens"] = min(
+                bucket["capacity"], bucket["tokens"] + (now - bucket["updated"]) * bucket["rate"]
+            )
+            bucket["updated"] = now
+            if now >= bucket["paused_until"] and bucket["tokens"] >= 1:
+                bucket["tokens"] -= 1
+                return
+            wait = max(bucket["paused_until"] - now, (1 - bucket["tokens"]) / bucket["rate"])
+        time.sleep(wait)
+
+def _bucket_rate_limited(bucket):
+    """
+    Hold back every worker after a rate-limit response, not just the one that saw it:
+    pause for an exponentially growing delay (per consecutive hit) and halve the rate.
+    """
+    with bucket["lock"]:
+        # Sends already in flight when the first 429 arrived belong to the same episode.
+        if time.monotonic() < bucket["paused_until"]:
+            return
+        bucket["rate_limited"] += 1
+        delay = min(GMAIL_SEND_MAX_BACKOFF, 2 ** (bucket["rate_limited"] - 1)) + random.uniform(0, 1)
+        bucket["paused_until"] = max(bucket["paused_until"], time.monotonic() + delay)
+        bucket["rate"] = max(bucket["max_rate"] / 16, bucket["rate"] / 2)
+        bucket["tokens"] = 0.0
+
+def _bucket_succeeded(bucket):
+    with bucket["lock"]:
+        bucket["rate_limited"] = 0
+        bucket["rate"] = min(bucket["max_rate"], bucket["rate"] + bucket["max_rate"] / 50)
+
+def _is_retryable(error):
+    """429, transient 5xx, and 403 rateLimitExceeded / userRateLimitExceeded are worth retrying."""
+    return error.resp.status >= 500 or _is_rate_limited(error)
+
+def _is_rate_limited(error):
+    """429, or 403 rateLimitExceeded / userRateLimitExceeded: the request was not carried out."""
+    status = error.resp.status
+    if status == 429:
+        return True
+    if status == 403:
+        details = error.error_details if isinstance(error.error_details, list) else []
+        reasons = {d.get("reason") for d in details if isinstance(d, dict)}
+        return bool(reasons & {"rateLimitExceeded", "userRateLimitExceeded"}) or "rate limit" in str(error).lower()
+    return False
+
+def _send_with_backoff(raw_message, bucket):
+    """
+    Send one message through the scheduler. Returns (message id, attempts used).
+    Only rate-limit rejections are retried: after a 5xx the message may already have been
+    delivered, and sending it again would deliver it twice.
+    """
+    for attempt in range(1, GMAIL_SEND_MAX_RETRIES + 2):
+        _take_token(bucket)
+        request = get_gmail_service().users().messages().send(userId="me", body=raw_message)
+        try:
+            message_id = request.execute(http=_thread_http())['id']
+        except HttpError as e:
+            if attempt > GMAIL_SEND_MAX_RETRIES or not _is_rate_limited(e):
+                raise
+            _bucket_rate_limited(bucket)
+            continue
+        _bucket_succeeded(bucket)
+        return message_id, attempt
 
 @mcp.tool()
 def send_email(to_email: str, subject: str, body: str) -> str:
@@ -57,26 +749,88 @@ def send_email(to_email: str, subject: str, body: str) -> str:
     try:
         service = get_gmail_service()
         
-        message = EmailMessage()
-        message.set_content(body)
-        message['To'] = to_email
-        message['Subject'] = subject
-        
-        encoded_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
-        create_message = {'raw': encoded_message}
+        create_message = _build_raw_message(to_email, subject, body)
         
         send_message = service.users().messages().send(userId="me", body=create_message).execute()
+        _mark_store_stale()
         return f"Successfully sent email to {to_email}. Message Id: {send_message['id']}"
     except Exception as e:
         return f"Failed to send email: {str(e)}"
 
 @mcp.tool()
-def read_recent_emails(limit: int = 5, query: str = "") -> str:
+def send_emails_bulk(
+    recipients: str,
+    subject_template: str = "",
+    body_template: str = "",
+    max_concurrency: int = 4,
+) -> str:
+    """
+    Send many emails in one call through a rate-limited concurrent pipeline.
+    `recipients` is a JSON array of objects with a "to" address plus any fields used by the
+    templates, e.g. '[{"to": "ann@example.com", "name": "Ann"}]'. Templates use {field}
+    placeholders, e.g. subject_template='Hi {name}'. An object may carry its own "subject"
+    and "body" instead. Sends are paced to Gmail's per-user quota and retried with
+    exponential backoff on rate-limit errors (not on 5xx, which may already have delivered
+    the message); a status line is returned per recipient.
+    """
+    try:
+        entries = json.loads(recipients)
+        if not isinstance(entries, list) or not all(isinstance(e, dict) and e.get("to") for e in entries):
+            return 'Error: recipients must be a JSON array of objects with a "to" field, e.g. \'[{"to": "a@example.com"}]\''
+        
+        get_gmail_service()  # fail fast on missing credentials, before spawning workers
+        bucket = _token_bucket(GMAIL_SEND_RATE, GMAIL_SEND_BURST)
+        
+        def _send_one(entry):
+            try:
+                subject = entry.get("subject") or subject_template.format_map(entry)
+                body = entry.get("body") or body_template.format_map(entry)
+            except KeyError as e:
+                return False, f"  FAILED {entry['to']}: template field {e} missing"
+            except (IndexError, ValueError) as e:
+                return False, f"  FAILED {entry['to']}: invalid template ({e})"
+            try:
+                message_id, attempts = _send_with_backoff(_build_raw_message(entry["to"], subject, body), bucket)
+                retries = f" after {attempts - 1} retr{'y' if attempts == 2 else 'ies'}" if attempts > 1 else ""
+                return True, f"  sent   {entry['to']}: Message Id {message_id}{retries}"
+            except Exception as e:
+                return False, f"  FAILED {entry['to']}: {e}"
+        
+        start = time.monotonic()
+        workers = max(1, min(max_concurrency, GMAIL_SEND_MAX_CONCURRENCY))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_send_one, entries))
+        elapsed = time.monotonic() - start
+        
+        sent = sum(1 for ok, _ in results if ok)
+        if sent:
+            _mark_store_stale()
+        summary = (
+            f"Sent {sent} of {len(entries)} email(s) in {elapsed:.1f}s "
+            f"({sent / elapsed if elapsed else 0:.1f} msg/s); {len(entries) - sent} failed."
+        )
+        return summary + "\n" + "\n".join(line for _, line in results)
+    except json.JSONDecodeError:
+        return "Error: Could not parse recipients. Provide a valid JSON array string."
+    except Exception as e:
+        return f"Failed to send emails: {str(e)}"
+
+@mcp.tool()
+def read_recent_emails(limit: int = 5, query: str = "", include_body: bool = False) -> str:
     """
     Read the most recent emails using Gmail API. 
     Optional 'query' parameter uses standard Gmail search syntax (e.g., 'is:unread', 'from:boss@example.com').
+    By default only headers and Gmail's snippet are fetched; set include_body=True to download
+    and decode the full message bodies for a longer preview.
+    Once sync_mailbox has run, reads are answered from the local message store whenever the
+    query only uses from:, subject:, after:/before:, newer_than:/older_than:, is:/in:
+    operators and plain words; other queries go to Gmail.
     """
     try:
+        stored = _read_from_store(limit, include_body, query)
+        if stored is not None:
+            return stored
+        
         service = get_gmail_service()
         
         results = service.users().messages().list(userId='me', maxResults=limit, q=query).execute()
@@ -85,36 +839,25 @@ def read_recent_emails(limit: int = 5, query: str = "") -> str:
         if not messages:
             return "No emails found."
             
-        parsed_emails = []
-        for message in messages:
-            msg = service.users().messages().get(userId='me', id=message['id'], format='full').execute()
-            
-            payload = msg['payload']
-            headers = payload.get('headers', [])
-            
-            subject = next((h['value'] for h in headers if h['name'] == 'Subject'), "No Subject")
-            sender = next((h['value'] for h in headers if h['name'] == 'From'), "Unknown Sender")
-            date = next((h['value'] for h in headers if h['name'] == 'Date'), "Unknown Date")
-            
-            # Extract body
-            body = "No text body found."
-            
-            if 'parts' in payload:
-                body = _extract_body_text(payload['parts'])
-            elif payload.get('mimeType') == 'text/plain':
-                data = payload.get('body', {}).get('data')
-                if data:
-                    body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-            
-            body_preview = body[:300] + "..." if len(body) > 300 else body
-            parsed_emails.append(f"From: {sender}\nDate: {date}\nSubject: {subject}\nBody preview:\n{body_preview}\n")
+        message_ids = [m['id'] for m in messages]
+        if include_body:
+            fetched, errors = _batch_get_messages(service, message_ids, format='full')
+        else:
+            fetched, errors = _batch_get_messages(
+                service, message_ids, format='metadata',
+                metadataHeaders=LISTING_HEADERS, fields=LISTING_FIELDS,
+            )
+        
+        parsed_emails = [_format_message(msg, include_body) for msg in fetched]
+        if errors:
+            parsed_emails.append(f"({len(errors)} email(s) could not be fetched: {next(iter(errors.values()))})")
             
         return "\n---\n".join(parsed_emails)
     except Exception as e:
         return f"Failed to read emails: {str(e)}"
 
 @mcp.tool()
-def search_emails(query: str, limit: int = 5) -> str:
+def search_emails(query: str, limit: int = 5, include_body: bool = False) -> str:
     """
     Search emails using standard Gmail search query syntax.
     Examples:
@@ -122,14 +865,16 @@ def search_emails(query: str, limit: int = 5) -> str:
     - 'subject:meeting'
     - 'is:unread in:inbox'
     - 'after:2026/01/01'
+    Set include_body=True to fetch full message bodies instead of snippets.
     """
-    return read_recent_emails(limit=limit, query=query)
+    return read_recent_emails(limit=limit, query=query, include_body=include_body)
 
 @mcp.tool()
 def mark_email_seen(query: str) -> str:
     """
     Mark emails matching a specific Gmail search query as read.
     Make sure to include 'is:unread' in your query.
+    All result pages are processed, in batchModify chunks of up to 1,000 emails.
     Example query: 'from:boss@example.com is:unread'
     """
     try:
@@ -139,24 +884,50 @@ def mark_email_seen(query: str) -> str:
         if "is:unread" not in query.lower():
             query += " is:unread"
             
-        results = service.users().messages().list(userId='me', q=query).execute()
-        messages = results.get('messages', [])
+        message_ids = _list_message_ids(service, query)
         
-        if not messages:
+        if not message_ids:
             return f"No unread emails found matching query: {query}"
             
-        count = 0
-        for message in messages:
-            service.users().messages().modify(
-                userId='me', 
-                id=message['id'], 
-                body={'removeLabelIds': ['UNREAD']}
-            ).execute()
-            count += 1
+        chunk_count = (len(message_ids) + GMAIL_MODIFY_CHUNK - 1) // GMAIL_MODIFY_CHUNK
+        marked = []
+        failed = 0
+        progress = []
+        for chunk_number, start in enumerate(range(0, len(message_ids), GMAIL_MODIFY_CHUNK), 1):
+            chunk = message_ids[start:start + GMAIL_MODIFY_CHUNK]
+            try:
+                service.users().messages().batchModify(
+                    userId='me',
+                    body={'ids': chunk, 'removeLabelIds': ['UNREAD']}
+                ).execute()
+                marked += chunk
+                progress.append(f"  Chunk {chunk_number}/{chunk_count}: marked {len(chunk)} email(s) as read.")
+            except Exception as e:
+                failed += len(chunk)
+                progress.append(f"  Chunk {chunk_number}/{chunk_count}: failed for {len(chunk)} email(s): {e}")
             
-        return f"Successfully marked {count} email(s) as read."
+        if marked:
+            _mark_store_stale(marked)
+        summary = f"Successfully marked {len(marked)} email(s) as read."
+        if failed:
+            summary = f"Marked {len(marked)} of {len(message_ids)} email(s) as read; {failed} failed."
+        return summary + "\n" + "\n".join(progress)
     except Exception as e:
         return f"Failed to mark emails as seen: {str(e)}"
 
+@mcp.tool()
+def sync_mailbox(full: bool = False) -> str:
+    """
+    Sync the local message store with Gmail.
+    The first run (or full=True) stores the newest emails; later runs only fetch changes
+    since the last sync via the Gmail history API.
+    """
+    try:
+        return _sync_store(full=full)
+    except Exception as e:
+        return f"Failed to sync mailbox: {str(e)}"
+
 if __name__ == "__main__":
+    if GMAIL_SYNC_INTERVAL > 0:
+        threading.Thread(target=_background_sync_loop, args=(GMAIL_SYNC_INTERVAL,), daemon=True).start()
     mcp.run(transport="stdio")
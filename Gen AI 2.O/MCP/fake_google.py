@@ -0,0 +1,51 @@
+"""
+Shared pieces of the fake Google API servers used by bench_email.py,
+calendar/bench_calendar.py and sheets/bench_sheets.py.
+"""
+
+import json
+import re
+from email.parser import BytesParser
+from urllib.parse import parse_qs, urlparse
+
+import httplib2
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+
+
+def answer_batch(content_type, payload, route, boundary="batch_fake_google"):
+    """
+    Split a multipart/mixed batch body, route each inner request and build the reply.
+    route(method, path, query, headers, body) answers one call with (status, JSON body or None).
+    Returns (boundary, reply body).
+    """
+    envelope = BytesParser().parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + payload
+    )
+    out = []
+    for part in envelope.get_payload():
+        # An inner request is a request line and headers, then a blank line and the body.
+        head, *rest = re.split(r"\r?\n\r?\n", part.get_payload(), maxsplit=1)
+        inner_body = rest[0] if rest else ""
+        request_line, *header_lines = head.splitlines()
+        method, target, _ = request_line.strip().split(" ", 2)
+        headers = dict(line.split(": ", 1) for line in header_lines if ": " in line)
+        url = urlparse(target)
+        status, body = route(method, url.path, parse_qs(url.query), headers, inner_body.encode())
+        content_id = part["Content-ID"].strip("<>")
+        out.append(
+            f"--{boundary}\r\nContent-Type: application/http\r\n"
+            f"Content-ID: <response-{content_id}>\r\n\r\n"
+            f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n\r\n"
+            f"{'' if body is None else json.dumps(body)}\r\n"
+        )
+    out.append(f"--{boundary}--\r\n")
+    return boundary, "".join(out).encode()
+
+
+def fake_service(api, version, port):
+    """Build a client for `api` bound to a fake server on 127.0.0.1:port, bypassing OAuth."""
+    discovery = json.loads(discovery_cache.get_static_doc(api, version))
+    # Both REST calls and new_batch_http_request() derive their URLs from rootUrl.
+    discovery["rootUrl"] = f"http://127.0.0.1:{port}/"
+    return build_from_document(discovery, http=httplib2.Http())
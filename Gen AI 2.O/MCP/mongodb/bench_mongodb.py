@@ -0,0 +1,682 @@
+"""
+Benchmarks for mongodb_mcp.py without a real MongoDB deployment.
+
+The benchmarks talk to a minimal fake mongod on 127.0.0.1 that speaks just
+enough of the wire protocol (hello, ping, count via aggregate, _id-ordered
+find/getMore, endSessions) and sleeps `--rtt` ms per message to simulate the
+network round-trip to a cluster. TLS and SCRAM authentication are not
+simulated, so against Atlas the per-client cost (and the gap) is larger.
+
+Usage:
+    python bench_mongodb.py pool [--rtt 20] [--calls 50]
+    python bench_mongodb.py query [--rtt 20] [--docs 50000] [--page 1000]
+    python bench_mongodb.py insert [--rtt 20] [--docs 10000] [--batch-sizes 10 100 1000 5000]
+    python bench_mongodb.py bulk [--rtt 20] [--docs 5000]
+    python bench_mongodb.py count [--rtt 20] [--docs 5000000] [--scan-rate 2000000] [--calls 50]
+    python bench_mongodb.py aggregate [--rtt 20] [--docs 50000]
+"""
+
+import argparse
+import bisect
+import gc
+import json
+import multiprocessing
+import os
+import socketserver
+import struct
+import threading
+import time
+import tracemalloc
+
+import bson
+from bson import json_util
+from bson.raw_bson import RawBSONDocument
+from pymongo import MongoClient
+
+import mongodb_mcp
+
+DATABASE = "bench"
+OP_REPLY, OP_QUERY, OP_MSG = 1, 2004, 2013
+
+
+def _hello(connection_id):
+    return {
+        "ok": 1.0,
+        "helloOk": True,
+        "isWritablePrimary": True,
+        "ismaster": True,
+        "maxBsonObjectSize": 16 * 1024 * 1024,
+        "maxMessageSizeBytes": 48_000_000,
+        "maxWriteBatchSize": 100_000,
+        "localTime": bson.datetime.datetime.now(bson.datetime.timezone.utc),
+        "logicalSessionTimeoutMinutes": 30,
+        "connectionId": connection_id,
+        "minWireVersion": 0,
+        "maxWireVersion": 21,
+    }
+
+
+def _fake_find(command, collections, cursors, lock):
+    """
+    find over an _id-sorted collection. Only the filters query_collection sends for
+    _id-ordered paging are understood: {} and an _id range, optionally inside $and.
+    """
+    ids, raw_docs = collections[command["find"]]
+    if any(field != "_id" for field in command.get("sort", {})):
+        return {"ok": 0.0, "errmsg": "fake mongod sorts on _id only", "code": 2}
+    descending = command.get("sort", {}).get("_id", 1) == -1
+    clauses = command.get("filter", {}).get("$and", [command.get("filter", {})])
+    lo, hi = 0, len(ids)
+    for clause in clauses:
+        for op, value in clause.get("_id", {}).items():
+            if op == "$gt":
+                lo = max(lo, bisect.bisect_right(ids, value))
+            elif op == "$lt":
+                hi = min(hi, bisect.bisect_left(ids, value))
+    order = range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+    limit = command.get("limit", 0) or len(order)
+    state = {
+        "ns": f"{DATABASE}.{command['find']}",
+        "docs": raw_docs,
+        "order": order[:limit],
+        "pos": 0,
+        "projection": command.get("projection"),
+    }
+    batch = _next_batch(state, command.get("batchSize", 101))
+    cursor_id = 0
+    if state["pos"] < len(state["order"]):
+        with lock:
+            cursor_id = len(cursors) + 1
+            cursors[cursor_id] = state
+    return {"cursor": {"firstBatch": batch, "id": cursor_id, "ns": state["ns"]}, "ok": 1.0}
+
+
+def _fake_match(docs, query, multi):
+    """Documents of an _id -> doc dict matching a top-level equality filter."""
+    if list(query) == ["_id"] and not isinstance(query["_id"], dict):
+        doc = docs.get(query["_id"])
+        return [doc] if doc is not None else []
+    found = []
+    for doc in docs.values():
+        if all(doc.get(field) == value for field, value in query.items()):
+            found.append(doc)
+            if not multi:
+                break
+    return found
+
+
+def _fake_apply(doc, update):
+    """Apply $set/$inc/$push/$unset, or replace the document keeping its _id."""
+    if not any(key.startswith("$") for key in update):
+        _id = doc["_id"]
+        doc.clear()
+        doc.update(update, _id=_id)
+        return
+    for op, fields in update.items():
+        for field, value in fields.items():
+            if op == "$set":
+                doc[field] = value
+            elif op == "$inc":
+                doc[field] = doc.get(field, 0) + value
+            elif op == "$push":
+                doc[field] = doc.get(field, []) + [value]
+            elif op == "$unset":
+                doc.pop(field, None)
+
+
+def _next_batch(state, batch_size, max_bytes=16 * 1024 * 1024):
+    batch, size = [], 0
+    projection = state["projection"]
+    while state["pos"] < len(state["order"]) and (not batch_size or len(batch) < batch_size) and size < max_bytes:
+        raw = state["docs"][state["order"][state["pos"]]]
+        if projection:
+            doc = bson.decode(raw)
+            if any(projection.values()):
+                raw = bson.encode({k: v for k, v in doc.items() if projection.get(k, k == "_id")})
+            else:
+                raw = bson.encode({k: v for k, v in doc.items() if projection.get(k, 1)})
+        batch.append(RawBSONDocument(raw))
+        size += len(raw)
+        state["pos"] += 1
+    return batch
+
+
+def start_fake_mongod(rtt_ms, counts, collections=None, scan_rate=None):
+    """
+    Start the fake mongod in a daemon thread. Returns (server, stats).
+    `counts` maps collection names to the document count that count_documents (an aggregate,
+    whatever the filter) and estimated_document_count (the count command) report. With
+    scan_rate, the aggregate takes count / scan_rate seconds, like a collection scan.
+    `collections` maps collection names to documents with integer _ids, served by find/getMore
+    (and by aggregate, which streams them back ignoring the pipeline stages).
+    insert, update and delete work on a separate in-memory copy with a unique _id index;
+    their filters support top-level equality only.
+    stats counts TCP connections, handshakes (hello), other commands and inserted documents.
+    """
+    stats = {"connections": 0, "handshakes": 0, "commands": 0, "inserted": 0}
+    lock = threading.Lock()
+    stored = {}
+    for name, docs in (collections or {}).items():
+        docs = sorted(docs, key=lambda doc: doc["_id"])
+        stored[name] = ([doc["_id"] for doc in docs], [bson.encode(doc) for doc in docs])
+    cursors = {}
+    written = {name: {doc["_id"]: doc for doc in docs} for name, docs in (collections or {}).items()}
+
+    def _insert(command):
+        ids = written.setdefault(command["insert"], {})
+        errors = []
+        with lock:
+            for index, doc in enumerate(command["documents"]):
+                if doc["_id"] in ids:
+                    errors.append({
+                        "index": index,
+                        "code": 11000,
+                        "errmsg": f"E11000 duplicate key error collection: {DATABASE}.{command['insert']} "
+                                  f"index: _id_ dup key: {{ _id: {doc['_id']!r} }}",
+                        "keyValue": {"_id": doc["_id"]},
+                    })
+                    if command.get("ordered", True):
+                        break
+                    continue
+                ids[doc["_id"]] = doc
+            inserted = (errors[0]["index"] if errors and command.get("ordered", True)
+                        else len(command["documents"]) - len(errors))
+            stats["inserted"] += inserted
+        reply = {"n": inserted, "ok": 1.0}
+        if errors:
+            reply["writeErrors"] = errors
+        return reply
+
+    def _update(command):
+        docs = written.setdefault(command["update"], {})
+        matched = modified = 0
+        upserted = []
+        with lock:
+            for index, statement in enumerate(command["updates"]):
+                targets = _fake_match(docs, statement["q"], statement.get("multi", False))
+                for doc in targets:
+                    before = dict(doc)
+                    _fake_apply(doc, statement["u"])
+                    modified += doc != before
+                matched += len(targets)
+                if not targets and statement.get("upsert"):
+                    doc = {k: v for k, v in statement["q"].items() if not k.startswith("$")}
+                    doc.setdefault("_id", bson.ObjectId())
+                    _fake_apply(doc, statement["u"])
+                    docs[doc["_id"]] = doc
+                    upserted.append({"index": index, "_id": doc["_id"]})
+        reply = {"n": matched + len(upserted), "nModified": modified, "ok": 1.0}
+        if upserted:
+            reply["upserted"] = upserted
+        return reply
+
+    def _delete(command):
+        docs = written.setdefault(command["delete"], {})
+        removed = 0
+        with lock:
+            for statement in command["deletes"]:
+                for doc in _fake_match(docs, statement["q"], statement.get("limit", 0) == 0):
+                    del docs[doc["_id"]]
+                    removed += 1
+        return {"n": removed, "ok": 1.0}
+
+    def _answer(command, connection_id):
+        name = next(iter(command))
+        if name.lower() in ("hello", "ismaster"):
+            with lock:
+                stats["handshakes"] += 1
+            return _hello(connection_id)
+        with lock:
+            stats["commands"] += 1
+        if name == "count":
+            return {"n": counts.get(command["count"], 0), "ok": 1.0}
+        if name == "aggregate" and command["aggregate"] in stored:
+            # Pipelines over a stored collection stream its documents unchanged (stages are ignored)
+            find = {"find": command["aggregate"], "batchSize": command["cursor"].get("batchSize", 101)}
+            return _fake_find(find, stored, cursors, lock)
+        if name == "aggregate":
+            collection = command["aggregate"]
+            if scan_rate:
+                time.sleep(counts.get(collection, 0) / scan_rate)
+            batch = [{"_id": 1, "n": counts[collection]}] if counts.get(collection) else []
+            return {"cursor": {"firstBatch": batch, "id": 0, "ns": f"{DATABASE}.{collection}"}, "ok": 1.0}
+        if name == "insert":
+            return _insert(command)
+        if name == "update":
+            return _update(command)
+        if name == "delete":
+            return _delete(command)
+        if name == "find":
+            return _fake_find(command, stored, cursors, lock)
+        if name == "getMore":
+            state = cursors[command["getMore"]]
+            batch = _next_batch(state, command.get("batchSize", 0))
+            cursor_id = command["getMore"] if state["pos"] < len(state["order"]) else 0
+            if not cursor_id:
+                cursors.pop(command["getMore"], None)
+            return {"cursor": {"nextBatch": batch, "id": cursor_id, "ns": state["ns"]}, "ok": 1.0}
+        if name == "killCursors":
+            for cursor_id in command.get("cursors", []):
+                cursors.pop(cursor_id, None)
+            return {"cursorsKilled": command.get("cursors", []), "ok": 1.0}
+        if name in ("ping", "endSessions"):
+            return {"ok": 1.0}
+        return {"ok": 0.0, "errmsg": f"no such command: '{name}'", "code": 59}
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            with lock:
+                stats["connections"] += 1
+                connection_id = stats["connections"]
+            sock = self.request
+            while True:
+                header = _recv_exact(sock, 16)
+                if not header:
+                    return
+                length, request_id, _, opcode = struct.unpack("<iiii", header)
+                body = _recv_exact(sock, length - 16)
+                time.sleep(rtt_ms / 1000)
+                if opcode == OP_MSG:
+                    command = _decode_op_msg(body)
+                    payload = struct.pack("<I", 0) + b"\x00" + bson.encode(_answer(command, connection_id))
+                    opcode_out = OP_MSG
+                elif opcode == OP_QUERY:
+                    # flags, fullCollectionName cstring, numberToSkip, numberToReturn, query
+                    start = body.index(b"\x00", 4) + 1 + 8
+                    command = bson.decode(body[start:start + struct.unpack("<i", body[start:start + 4])[0]])
+                    reply = bson.encode(_answer(command, connection_id))
+                    payload = struct.pack("<iqii", 0, 0, 0, 1) + reply
+                    opcode_out = OP_REPLY
+                else:
+                    return
+                sock.sendall(struct.pack("<iiii", 16 + len(payload), request_id, request_id, opcode_out) + payload)
+
+    class Server(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def _decode_op_msg(body):
+    """
+    flagBits, a kind-0 section holding the command document, then optional kind-1
+    sections (e.g. the "documents" of an insert) that are merged into the command.
+    """
+    end = 5 + struct.unpack("<i", body[5:9])[0]
+    command = bson.decode(body[5:end])
+    while end < len(body) and body[end] == 1:
+        size = struct.unpack("<i", body[end + 1:end + 5])[0]
+        section_end = end + 1 + size
+        name_end = body.index(b"\x00", end + 5)
+        command[body[end + 5:name_end].decode()] = bson.decode_all(body[name_end + 1:section_end])
+        end = section_end
+    return command
+
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        try:
+            chunk = sock.recv(size - len(data))
+        except OSError:
+            return b""
+        if not chunk:
+            return b""
+        data += chunk
+    return data
+
+
+def _install(server):
+    os.environ["MONGODB_URI"] = f"mongodb://127.0.0.1:{server.server_address[1]}/?directConnection=true"
+    os.environ["MONGODB_DATABASE"] = DATABASE
+    mongodb_mcp.close_mongo_client()
+
+
+def _client_per_call():
+    """The old get_mongo_client(): a fresh MongoClient per tool call, never closed."""
+    return MongoClient(os.environ["MONGODB_URI"])[DATABASE]
+
+
+def bench_pool(args):
+    """count_documents latency with a client per call (before) vs. the shared pooled client."""
+    server, stats = start_fake_mongod(args.rtt, {"orders": 12345})
+    _install(server)
+    print(f"count_documents x {args.calls} (rtt={args.rtt} ms per message)")
+
+    def _run(label):
+        before = dict(stats)
+        threads_before = threading.active_count()
+        latencies = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            result = mongodb_mcp.count_documents("orders", exact=True, fresh=True)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert "12345" in result, result
+        latencies.sort()
+        delta = {key: stats[key] - before[key] for key in stats}
+        print(
+            f"  {label:<24} mean {sum(latencies) / len(latencies):7.1f} ms  "
+            f"p50 {latencies[len(latencies) // 2]:7.1f} ms  "
+            f"connections {delta['connections']:4}  handshakes {delta['handshakes']:4}  "
+            f"threads {threading.active_count() - threads_before:+d}"
+        )
+
+    original = mongodb_mcp.get_mongo_client
+    mongodb_mcp.get_mongo_client = _client_per_call
+    try:
+        _run("client per call (before)")
+    finally:
+        mongodb_mcp.get_mongo_client = original
+    # Let the abandoned clients' monitor threads notice and exit before measuring
+    gc.collect()
+    time.sleep(1)
+    _run("shared pooled client")
+    print(mongodb_mcp.connection_health())
+    mongodb_mcp.close_mongo_client()
+    server.shutdown()
+
+
+def synthetic_orders(count):
+    """Order-like documents with integer _ids, a nested object and an array, ~400 bytes of BSON each."""
+    cities = ["Berlin", "Delhi", "Lagos", "Lima", "Osaka", "Perth", "Quito", "Tunis"]
+    return [
+        {
+            "_id": i,
+            "city": cities[i % len(cities)],
+            "amount": round((i * 7919) % 100_000 / 100, 2),
+            "status": "shipped" if i % 5 else "pending",
+            "customer": {"id": i % 9973, "name": f"customer-{i % 9973}", "tier": i % 3},
+            "items": [{"sku": f"SKU-{(i + k) % 500}", "qty": 1 + k} for k in range(3)],
+        }
+        for i in range(count)
+    ]
+
+
+def _serve_orders(rtt_ms, docs, ready):
+    server, _ = start_fake_mongod(rtt_ms, {}, {"orders": synthetic_orders(docs)})
+    ready.put(server.server_address[1])
+    threading.Event().wait()
+
+
+def _query_all_at_once(limit):
+    """The old query_collection: the whole result list, then one indented dump."""
+    docs = list(mongodb_mcp.get_mongo_client()["orders"].find({}).limit(limit))
+    return f"Found {len(docs)} document(s):\n{json_util.dumps(docs, indent=2)}"
+
+
+def _check_sparse_sort_paging():
+    """Regression check: page tokens must not skip documents whose sort key is null,
+    missing or of another type. Needs mongomock, since the fake mongod only sorts by _id."""
+    try:
+        import mongomock
+    except ImportError:
+        print("  sparse sort-key paging: skipped (pip install mongomock)")
+        return
+    db = mongomock.MongoClient()[DATABASE]
+    db.items.insert_many(
+        [{"_id": i, "p": i % 4} if i % 3 else {"_id": i} for i in range(8)]
+        + [{"_id": 8, "p": None}, {"_id": 9, "p": "text"}, {"_id": 10, "p": 2.5}]
+    )
+    get_client = mongodb_mcp.get_mongo_client
+    mongodb_mcp.get_mongo_client = lambda: db
+    try:
+        for sort in ({"p": 1}, {"p": -1}, {"p": 1, "_id": -1}):
+            expected = [doc["_id"] for doc in db.items.find().sort(mongodb_mcp._sort_spec(sort))]
+            seen, token = [], ""
+            while True:
+                text = mongodb_mcp.query_collection(
+                    "items", limit=2, sort_json=json.dumps(sort), page_token=token, output_format="jsonl",
+                )
+                lines = text.split("\n")
+                seen += [json.loads(line)["_id"] for line in lines[1:-1]]
+                if not lines[-1].startswith("next_page_token: "):
+                    break
+                token = lines[-1].split(": ", 1)[1]
+            status = "ok" if seen == expected else f"FAILED: got {seen}, expected {expected}"
+            print(f"  sparse sort-key paging, sort={json.dumps(sort)}: {status}")
+    finally:
+        mongodb_mcp.get_mongo_client = get_client
+
+
+def bench_query(args):
+    """One huge query_collection call (before) vs. walking the collection with page tokens."""
+    args.docs = args.docs or 50_000
+    # The fake server runs in its own process so tracemalloc only sees the client's allocations.
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve_orders, args=(args.rtt, args.docs, ready), daemon=True)
+    server.start()
+    port = ready.get()
+    os.environ["MONGODB_URI"] = f"mongodb://127.0.0.1:{port}/?directConnection=true"
+    os.environ["MONGODB_DATABASE"] = DATABASE
+    mongodb_mcp.close_mongo_client()
+    print(f"query_collection over {args.docs} documents (rtt={args.rtt} ms)")
+
+    def _walk(output_format, projection=""):
+        token, pages, total, biggest = "", 0, 0, 0
+        while True:
+            text = mongodb_mcp.query_collection(
+                "orders", limit=args.page, page_token=token,
+                projection_json=projection, output_format=output_format,
+            )
+            pages += 1
+            total += len(text)
+            biggest = max(biggest, len(text))
+            tail = text.rsplit("\n", 1)[-1]
+            if not tail.startswith("next_page_token: "):
+                return f"{pages:4} pages", total, biggest
+            token = tail.split(": ", 1)[1]
+
+    def _once():
+        text = _query_all_at_once(args.docs)
+        return "  1 call ", len(text), len(text)
+
+    print(f"  {'mode':<30} {'':>9} {'seconds':>8} {'peak MB':>8} {'output MB':>10} {'KB/call':>8}")
+    for label, call in (
+        (f"limit={args.docs} (before)", _once),
+        (f"pages of {args.page}, json", lambda: _walk("json")),
+        (f"pages of {args.page}, jsonl", lambda: _walk("jsonl")),
+        ("  ... + 3-field projection", lambda: _walk("jsonl", '{"city": 1, "amount": 1, "status": 1}')),
+    ):
+        start = time.perf_counter()
+        call()
+        seconds = time.perf_counter() - start
+        tracemalloc.start()
+        calls, total, biggest = call()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {label:<30} {calls:>9} {seconds:>8.2f} {peak / 2**20:>8.1f} "
+              f"{total / 2**20:>10.1f} {biggest / 1024:>8.0f}")
+    mongodb_mcp.close_mongo_client()
+    server.terminate()
+    _check_sparse_sort_paging()
+
+
+def bench_insert(args):
+    """Loading documents: one insert_document call each (before) vs. insert_documents batch sizes."""
+    args.docs = args.docs or 10_000
+    server, stats = start_fake_mongod(args.rtt, {})
+    _install(server)
+    docs = synthetic_orders(args.docs)
+    for doc in docs:
+        del doc["_id"]
+    per_doc = docs[:min(len(docs), 200)]
+    print(f"loading {args.docs} orders (rtt={args.rtt} ms per message)")
+    print(f"  {'mode':<34} {'round-trips':>11} {'seconds':>8} {'docs/s':>9}")
+
+    before = stats["commands"]
+    start = time.perf_counter()
+    for doc in per_doc:
+        mongodb_mcp.insert_document("orders_single", json_util.dumps(doc))
+    seconds = time.perf_counter() - start
+    print(f"  {f'insert_document x {len(per_doc)} (before)':<34} {stats['commands'] - before:>11} "
+          f"{seconds:>8.2f} {len(per_doc) / seconds:>9,.0f}")
+
+    payload = "\n".join(json_util.dumps(doc) for doc in docs)
+    for batch_size in args.batch_sizes:
+        before = stats["commands"]
+        start = time.perf_counter()
+        result = mongodb_mcp.insert_documents(f"orders_{batch_size}", payload, batch_size=batch_size)
+        seconds = time.perf_counter() - start
+        assert result.startswith(f"Inserted {len(docs)} of {len(docs)}"), result.splitlines()[0]
+        print(f"  {f'insert_documents, batch_size={batch_size}':<34} {stats['commands'] - before:>11} "
+              f"{seconds:>8.2f} {len(docs) / seconds:>9,.0f}")
+
+    # Re-sending a slice with explicit _ids: duplicates are reported, the rest still go in.
+    keyed = [dict(doc, _id=i) for i, doc in enumerate(docs[:1000])]
+    mongodb_mcp.insert_documents("orders_keyed", json_util.dumps(keyed[:600]))
+    result = mongodb_mcp.insert_documents("orders_keyed", json_util.dumps(keyed), batch_size=250)
+    print("re-inserting 1000 keyed documents, 600 already present:")
+    print("\n".join(result.splitlines()[:8]))
+    server.shutdown()
+
+
+def bench_bulk(args):
+    """Reconciling records: one update/delete tool call per record (before) vs. bulk_write."""
+    args.docs = args.docs or 5_000
+    server, stats = start_fake_mongod(args.rtt, {}, {"inventory": synthetic_orders(args.docs)})
+    _install(server)
+    # 80% quantity changes, 10% new records (upserts), 10% removals
+    operations = []
+    for i in range(args.docs):
+        if i % 10 == 8:
+            operations.append({"updateOne": {"filter": {"_id": args.docs + i}, "update": {"$set": {"status": "new"}},
+                                             "upsert": True}})
+        elif i % 10 == 9:
+            operations.append({"deleteOne": {"filter": {"_id": i}}})
+        else:
+            operations.append({"updateOne": {"filter": {"_id": i}, "update": {"$set": {"status": "recounted"}}}})
+    per_call = operations[:min(len(operations), 200)]
+    print(f"reconciling {len(operations)} records (rtt={args.rtt} ms per message)")
+    print(f"  {'mode':<42} {'round-trips':>11} {'seconds':>8} {'ops/s':>9}")
+
+    before = stats["commands"]
+    start = time.perf_counter()
+    for op in per_call:
+        (kind, spec), = op.items()
+        if kind == "deleteOne":
+            mongodb_mcp.delete_documents("inventory", json.dumps(spec["filter"]))
+        else:
+            # update_documents has no upsert, so new records would need a second call in practice
+            mongodb_mcp.update_documents("inventory", json.dumps(spec["filter"]), json.dumps(spec["update"]["$set"]))
+    seconds = time.perf_counter() - start
+    print(f"  {f'one tool call per record x {len(per_call)} (before)':<42} {stats['commands'] - before:>11} "
+          f"{seconds:>8.2f} {len(per_call) / seconds:>9,.0f}")
+
+    results = []
+    for batch_size in (100, 1000):
+        before = stats["commands"]
+        start = time.perf_counter()
+        results.append(mongodb_mcp.bulk_write("inventory", json.dumps(operations), batch_size=batch_size))
+        seconds = time.perf_counter() - start
+        print(f"  {f'bulk_write, batch_size={batch_size}':<42} {stats['commands'] - before:>11} "
+              f"{seconds:>8.2f} {len(operations) / seconds:>9,.0f}")
+    print("first bulk_write: " + results[0].splitlines()[1].strip())
+    print("second (replayed): " + results[1].splitlines()[1].strip())
+    server.shutdown()
+
+
+def bench_count(args):
+    """count_documents on a big collection: always an exact scan (before) vs. estimate + memo cache."""
+    docs = args.docs or 5_000_000
+    server, stats = start_fake_mongod(args.rtt, {"events": docs}, scan_rate=args.scan_rate)
+    _install(server)
+    coll = mongodb_mcp.get_mongo_client()["events"]
+    print(f"count on a {docs:,}-document collection (rtt={args.rtt} ms, scan {args.scan_rate:,.0f} docs/s), "
+          f"{args.calls} calls each")
+
+    def _run(label, call):
+        before = stats["commands"]
+        timings = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            result = call()
+            timings.append((time.perf_counter() - start) * 1000)
+        repeat = sum(timings[1:]) / max(len(timings) - 1, 1)
+        print(f"  {label:<36} first {timings[0]:7.1f} ms, then {repeat:7.1f} ms/call, "
+              f"{stats['commands'] - before:3} server commands")
+        return result
+
+    _run("{} via count_documents (before)", lambda: coll.count_documents({}))
+    print("    " + _run("{} estimated + cached", lambda: mongodb_mcp.count_documents("events")))
+    print("    " + _run("{} exact=True, cached", lambda: mongodb_mcp.count_documents("events", exact=True)))
+    _run('{"type": "click"} (before)', lambda: coll.count_documents({"type": "click"}))
+    print("    " + _run('{"type": "click"} cached', lambda: mongodb_mcp.count_documents("events", '{"type": "click"}')))
+    server.shutdown()
+
+
+def bench_aggregate(args):
+    """A pipeline over every document: list() + one indented dump (before) vs. capped, streamed pages."""
+    args.docs = args.docs or 50_000
+    # The fake server runs in its own process so tracemalloc only sees the client's allocations.
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve_orders, args=(args.rtt, args.docs, ready), daemon=True)
+    server.start()
+    port = ready.get()
+    os.environ["MONGODB_URI"] = f"mongodb://127.0.0.1:{port}/?directConnection=true"
+    os.environ["MONGODB_DATABASE"] = DATABASE
+    mongodb_mcp.close_mongo_client()
+    pipeline = '[{"$match": {}}]'
+    print(f"aggregate streaming {args.docs} results (rtt={args.rtt} ms, "
+          f"pages of <= {mongodb_mcp.MONGODB_AGG_MAX_RESULTS} results / {mongodb_mcp.MONGODB_AGG_MAX_BYTES:,} bytes)")
+
+    def _once():
+        results = list(mongodb_mcp.get_mongo_client()["orders"].aggregate(json.loads(pipeline)))
+        text = f"Aggregation returned {len(results)} result(s):\n{json_util.dumps(results, indent=2)}"
+        return "  1 call ", len(text), len(text)
+
+    def _pages(output_format):
+        text = mongodb_mcp.aggregate("orders", pipeline, output_format=output_format)
+        calls, total, biggest = 1, len(text), len(text)
+        while text.rsplit("\n", 1)[-1].startswith("cursor_handle: "):
+            handle = text.rsplit("\n", 1)[-1].split()[1]
+            text = mongodb_mcp.aggregate_more(handle, output_format=output_format)
+            calls += 1
+            total += len(text)
+            biggest = max(biggest, len(text))
+        return f"{calls:4} calls", total, biggest
+
+    print(f"  {'mode':<24} {'':>9} {'seconds':>8} {'peak MB':>8} {'output MB':>10} {'KB/call':>8}")
+    for label, call in (
+        ("list + dump (before)", _once),
+        ("streamed pages, json", lambda: _pages("json")),
+        ("streamed pages, jsonl", lambda: _pages("jsonl")),
+    ):
+        start = time.perf_counter()
+        call()
+        seconds = time.perf_counter() - start
+        tracemalloc.start()
+        calls, total, biggest = call()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {label:<24} {calls:>9} {seconds:>8.2f} {peak / 2**20:>8.1f} "
+              f"{total / 2**20:>10.1f} {biggest / 1024:>8.0f}")
+    mongodb_mcp.close_mongo_client()
+    server.terminate()
+
+
+BENCHMARKS = {
+    "pool": bench_pool,
+    "query": bench_query,
+    "insert": bench_insert,
+    "bulk": bench_bulk,
+    "count": bench_count,
+    "aggregate": bench_aggregate,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--rtt", type=float, default=20.0, help="simulated round-trip time in ms")
+    parser.add_argument("--calls", type=int, default=50, help="tool calls per measurement")
+    parser.add_argument("--docs", type=int, help="documents in the synthetic collection (query: 50000, insert: 10000, bulk: 5000, count: 5000000, aggregate: 50000)")
+    parser.add_argument("--page", type=int, default=1000, help="page size when walking the collection")
+    parser.add_argument("--scan-rate", type=float, default=2_000_000,
+                        help="documents per second the fake server scans for an exact count")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 100, 1000, 5000],
+                        help="insert_documents batch sizes to compare")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
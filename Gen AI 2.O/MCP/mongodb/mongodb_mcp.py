@@ -1,14 +1,75 @@
 """MongoDB MCP Server — functional style with FastMCP."""
 
+import atexit
+import base64
+import datetime
+import hashlib
+import io
 import json
 import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
 
-from bson import json_util
+from bson import Binary, Decimal128, Int64, ObjectId, json_util
 from mcp.server.fastmcp import FastMCP
-from pymongo import MongoClient
+from pymongo import DeleteMany, DeleteOne, InsertOne, MongoClient, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, CursorNotFound, ExecutionTimeout
 
 mcp = FastMCP("MongoDB")
 
+# Client options are only passed when their variable is set: keyword arguments win
+# over the URI, so unset ones keep whatever MONGODB_URI (or PyMongo's default) says.
+MONGODB_CLIENT_OPTIONS = {
+    option: int(os.environ[env])
+    for option, env in {
+        "maxPoolSize": "MONGODB_MAX_POOL_SIZE",
+        "minPoolSize": "MONGODB_MIN_POOL_SIZE",
+        "maxIdleTimeMS": "MONGODB_MAX_IDLE_TIME_MS",
+        "connectTimeoutMS": "MONGODB_CONNECT_TIMEOUT_MS",
+        "serverSelectionTimeoutMS": "MONGODB_SERVER_SELECTION_TIMEOUT_MS",
+        "socketTimeoutMS": "MONGODB_SOCKET_TIMEOUT_MS",
+    }.items()
+    if os.environ.get(env)
+}
+MONGODB_READ_PREFERENCE = os.environ.get("MONGODB_READ_PREFERENCE", "")
+
+# One MongoClient for the whole process: it owns the connection pool and the
+# server monitor threads, so every tool call reuses warm, authenticated sockets.
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+_client_stats = {"created": 0, "checkouts": 0, "created_at": 0.0}
+
+
+def _client_options() -> dict:
+    options = {"appname": "mongodb-mcp", **MONGODB_CLIENT_OPTIONS}
+    if MONGODB_READ_PREFERENCE:
+        options["readPreference"] = MONGODB_READ_PREFERENCE
+    return options
+
+
+def _get_client() -> MongoClient:
+    """Return the shared client, creating it on first use (or if MONGODB_URI changed)."""
+    global _client, _client_key
+    uri = os.environ.get("MONGODB_URI")
+    if not uri:
+        raise ValueError(
+            "MONGODB_URI and MONGODB_DATABASE environment variables are required."
+        )
+    with _client_lock:
+        if _client is None or _client_key != uri:
+            if _client is not None:
+                _client.close()
+            _client = MongoClient(uri, **_client_options())
+            _client_key = uri
+            _client_stats["created"] += 1
+            _client_stats["created_at"] = time.time()
+        _client_stats["checkouts"] += 1
+        return _client
+
 
 def get_mongo_client():
     uri = os.environ.get("MONGODB_URI")
@@ -17,8 +78,311 @@ def get_mongo_client():
         raise ValueError(
             "MONGODB_URI and MONGODB_DATABASE environment variables are required."
         )
-    client = MongoClient(uri)
-    return client[db_name]
+    return _get_client()[db_name]
+
+
+def close_mongo_client():
+    """Close the shared client (pool sockets and monitor threads). The next call reconnects."""
+    global _client, _client_key
+    with _cursor_lock:
+        _open_cursors.clear()
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _client_key = None
+
+
+atexit.register(close_mongo_client)
+
+
+MONGODB_QUERY_MAX_LIMIT = int(os.environ.get("MONGODB_QUERY_MAX_LIMIT", "1000"))
+MONGODB_INSERT_BATCH_SIZE = int(os.environ.get("MONGODB_INSERT_BATCH_SIZE", "1000"))
+MONGODB_BULK_BATCH_SIZE = int(os.environ.get("MONGODB_BULK_BATCH_SIZE", "1000"))
+WRITE_ERRORS_SHOWN = 20
+
+# COLLSCAN guard: "off", "warn" (prefix the result with a warning) or "refuse"
+MONGODB_COLLSCAN_GUARD = os.environ.get("MONGODB_COLLSCAN_GUARD", "off").lower()
+MONGODB_COLLSCAN_THRESHOLD = int(os.environ.get("MONGODB_COLLSCAN_THRESHOLD", "100000"))
+PLAN_CACHE_TTL = 300
+MONGODB_COUNT_CACHE_TTL = float(os.environ.get("MONGODB_COUNT_CACHE_TTL", "30"))
+COUNT_CACHE_SIZE = 256
+MONGODB_AGG_MAX_RESULTS = int(os.environ.get("MONGODB_AGG_MAX_RESULTS", "1000"))
+MONGODB_AGG_MAX_BYTES = int(os.environ.get("MONGODB_AGG_MAX_BYTES", "1000000"))
+MONGODB_CURSOR_TTL = float(os.environ.get("MONGODB_CURSOR_TTL", "300"))
+MAX_OPEN_CURSORS = 32
+PLAN_CACHE_SIZE = 256
+SHAPE_HISTORY_SIZE = 500
+
+# (database, collection, shape) -> (expires_at, scans_collection, estimated_docs)
+_plan_cache = OrderedDict()
+# (database, collection, shape) -> {"equality", "sort", "range", "count"}, least recently seen first
+_filter_shapes = OrderedDict()
+_shape_lock = threading.Lock()
+# (database, collection, canonical filter, exact) -> (stored_at, count), least recently used first
+_count_cache = OrderedDict()
+_count_lock = threading.Lock()
+# cursor handle -> {"cursor", "collection", "pending", "returned", "expires_at"}, oldest first
+_open_cursors = OrderedDict()
+_cursor_lock = threading.Lock()
+
+
+def _sort_spec(sort: dict) -> list:
+    """Turn a {"field": 1 | -1} object into a sort list that ends with _id, for a total order."""
+    spec = []
+    for field, direction in sort.items():
+        if direction not in (1, -1):
+            raise ValueError(f"Sort direction for '{field}' must be 1 or -1.")
+        spec.append((field, direction))
+    if not any(field == "_id" for field, _ in spec):
+        spec.append(("_id", spec[-1][1] if spec else 1))
+    return spec
+
+
+def _query_fingerprint(collection: str, query_filter: dict, sort: list) -> str:
+    raw = json_util.dumps([collection, query_filter, sort], sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def _encode_page_token(fingerprint: str, last_values: list) -> str:
+    raw = json_util.dumps({"q": fingerprint, "after": last_values})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_page_token(token: str, fingerprint: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json_util.loads(raw)
+    except Exception:
+        raise ValueError("page_token is not valid.")
+    if payload.get("q") != fingerprint:
+        raise ValueError("page_token belongs to a different query (collection, filter or sort changed).")
+    return payload["after"]
+
+
+# $type aliases in BSON sort order, after null/missing. $gt/$lt only match values of
+# the same type, so resuming after a value also has to match the types sorting past it.
+# Arrays sort by their smallest/largest element and are left to the plain comparison, as
+# are internal timestamps and regexes, which are not expected as sort values.
+_SORT_TYPE_ORDER = ["number", "string", "object", "binData", "objectId", "bool", "date"]
+
+
+def _sort_type(value):
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float, Int64, Decimal128)):
+        return "number"
+    for alias, kinds in (("string", str), ("object", dict), ("binData", (bytes, Binary)),
+                         ("objectId", ObjectId), ("date", datetime.datetime)):
+        if isinstance(value, kinds):
+            return alias
+    return None
+
+
+def _after_conditions(field: str, direction: int, value) -> list:
+    """Conditions on one sort key matching every value strictly after `value`."""
+    if value is None:
+        # Null and missing sort first: everything non-null follows ascending, nothing descending
+        return [{field: {"$ne": None}}] if direction == 1 else []
+    conditions = [{field: {"$gt" if direction == 1 else "$lt": value}}]
+    alias = _sort_type(value)
+    if field == "_id" or alias is None:
+        return conditions
+    rank = _SORT_TYPE_ORDER.index(alias)
+    others = _SORT_TYPE_ORDER[rank + 1:] if direction == 1 else _SORT_TYPE_ORDER[:rank]
+    conditions += [{field: {"$type": other}} for other in others]
+    if direction == -1:
+        conditions.append({field: None})
+    return conditions
+
+
+def _keyset_filter(sort: list, after: list) -> dict:
+    """
+    Documents strictly after `after` in `sort` order:
+    (k1 > v1) or (k1 == v1 and k2 > v2) or ... with $lt for descending keys, where
+    "k > v" also covers null/missing and other BSON types sorting past v. The _id
+    tie-breaker is assumed to hold one type.
+    """
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        prefix = {sort[j][0]: after[j] for j in range(i)}
+        conditions = _after_conditions(field, direction, after[i])
+        if len(conditions) == 1:
+            branches.append(dict(prefix, **conditions[0]))
+        elif conditions:
+            branches.append(dict(prefix, **{"$or": conditions}))
+    if not branches:
+        return {"_id": {"$in": []}}
+    return branches[0] if len(branches) == 1 else {"$or": branches}
+
+
+def _fetch_projection(projection, sort_fields: list):
+    """
+    The projection to send, plus the fields to strip from each document afterwards.
+    Sort fields (and _id) are always fetched because the page token is built from them.
+    """
+    if not projection:
+        return projection, []
+    projection = dict(projection)
+    hidden = []
+    including = any(value not in (0, False) for field, value in projection.items() if field != "_id")
+    for field in sort_fields:
+        if field == "_id":
+            if projection.get("_id", 1) in (0, False):
+                projection.pop("_id")
+                hidden.append(field)
+        elif including and not any(field == key or field.startswith(key + ".") for key in projection):
+            projection[field] = 1
+            hidden.append(field)
+        elif not including and projection.get(field, 1) in (0, False):
+            projection.pop(field)
+            hidden.append(field)
+    return projection, hidden
+
+
+def _get_path(doc: dict, path: str):
+    for key in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(key)
+    return doc
+
+
+def _pop_path(doc: dict, path: str):
+    *parents, leaf = path.split(".")
+    for key in parents:
+        doc = doc.get(key) if isinstance(doc, dict) else None
+    if isinstance(doc, dict):
+        doc.pop(leaf, None)
+
+
+def _filter_fields(query_filter: dict, equality: list, ranges: list):
+    """Split the fields of a filter into equality and range/other predicates, flattening $and."""
+    for field, value in query_filter.items():
+        if field == "$and":
+            for clause in value:
+                _filter_fields(clause, equality, ranges)
+        elif field.startswith("$"):
+            continue  # $or, $expr, $text, ...: no single compound index serves them
+        elif isinstance(value, dict) and value and all(key.startswith("$") for key in value):
+            if set(value) <= {"$eq", "$in"}:
+                equality.append(field)
+            else:
+                ranges.append(field)
+        else:
+            equality.append(field)
+
+
+def _query_shape(query_filter: dict, sort=None) -> dict:
+    equality, ranges = [], []
+    _filter_fields(query_filter, equality, ranges)
+    sort_fields = [[field, direction] for field, direction in (sort or []) if field != "_id"]
+    sorted_names = {field for field, _ in sort_fields}
+    return {
+        "equality": list(dict.fromkeys(equality)),
+        "sort": sort_fields,
+        "range": [field for field in dict.fromkeys(ranges) if field not in equality and field not in sorted_names],
+    }
+
+
+def _observe_query(coll, query_filter: dict, sort=None):
+    """Remember the shape of a filter (fields and operators, not values) for suggest_indexes."""
+    shape = _query_shape(query_filter, sort)
+    if not (shape["equality"] or shape["sort"] or shape["range"]) or shape["equality"] == ["_id"]:
+        return
+    key = (coll.database.name, coll.name, json.dumps(shape))
+    with _shape_lock:
+        entry = _filter_shapes.pop(key, None) or dict(shape, count=0)
+        entry["count"] += 1
+        _filter_shapes[key] = entry
+        while len(_filter_shapes) > SHAPE_HISTORY_SIZE:
+            _filter_shapes.popitem(last=False)
+
+
+def _plan_stages(node, found=None) -> list:
+    """Every stage of an explain plan tree, root first (classic, SBE queryPlan and sharded layouts)."""
+    if found is None:
+        found = []
+    if isinstance(node, list):
+        for item in node:
+            _plan_stages(item, found)
+    elif isinstance(node, dict):
+        if "stage" in node:
+            found.append(node)
+        for key in ("queryPlan", "inputStage", "inputStages", "shards", "winningPlan"):
+            if key in node:
+                _plan_stages(node[key], found)
+    return found
+
+
+def _explain_sections(explain: dict):
+    """(queryPlanner, executionStats) from a find or aggregate explain; aggregate may nest them in $cursor."""
+    if "queryPlanner" in explain:
+        return explain["queryPlanner"], explain.get("executionStats", {})
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            return stage["$cursor"].get("queryPlanner", {}), stage["$cursor"].get("executionStats", {})
+    for shard in explain.get("shards", {}).values():
+        return _explain_sections(shard)
+    return {}, {}
+
+
+def _explain(
+    coll, query_filter: dict, sort=None, verbosity: str = "queryPlanner", max_time_ms: int = 0, limit: int = 0
+) -> dict:
+    command = {"find": coll.name, "filter": query_filter}
+    if sort:
+        command["sort"] = dict(sort)
+    if limit:
+        command["limit"] = limit
+    if max_time_ms:
+        command["maxTimeMS"] = max_time_ms
+    return coll.database.command("explain", command, verbosity=verbosity)
+
+
+def _scan_guard(coll, query_filter: dict, sort=None, limit: int = 0) -> str:
+    """
+    Record the filter shape for suggest_indexes. With MONGODB_COLLSCAN_GUARD on, also check
+    (via a queryPlanner-only explain, cached per filter shape) whether the query would scan
+    a collection above the size threshold. A plan cut short by a LIMIT stage (before any
+    blocking SORT) does not count as a scan. Returns a warning to prepend, or raises
+    ValueError in refuse mode.
+    """
+    _observe_query(coll, query_filter, sort)
+    if MONGODB_COLLSCAN_GUARD not in ("warn", "refuse"):
+        return ""
+    # No filter, natural or _id order: the server stops after `limit` documents.
+    if limit and not query_filter and all(field == "_id" for field, _ in sort or []):
+        return ""
+    shape = json.dumps(_query_shape(query_filter, sort))
+    key = (coll.database.name, coll.name, shape, bool(limit))
+    now = time.monotonic()
+    with _shape_lock:
+        cached = _plan_cache.get(key)
+    if cached and cached[0] > now:
+        _, scans, estimated = cached
+    else:
+        estimated = coll.estimated_document_count()
+        scans = False
+        if estimated >= MONGODB_COLLSCAN_THRESHOLD:
+            planner, _ = _explain_sections(_explain(coll, query_filter, sort, limit=limit))
+            stages = [stage["stage"] for stage in _plan_stages(planner.get("winningPlan", {}))]
+            bounded = next((stage for stage in stages if stage in ("LIMIT", "SORT")), None) == "LIMIT"
+            scans = "COLLSCAN" in stages and not bounded
+        with _shape_lock:
+            _plan_cache[key] = (now + PLAN_CACHE_TTL, scans, estimated)
+            _plan_cache.move_to_end(key)
+            while len(_plan_cache) > PLAN_CACHE_SIZE:
+                _plan_cache.popitem(last=False)
+    if not scans:
+        return ""
+    message = (
+        f"this query does a collection scan (COLLSCAN) over ~{estimated:,} documents in '{coll.name}'. "
+        "Add an index for it (see suggest_indexes) or narrow the filter on an indexed field."
+    )
+    if MONGODB_COLLSCAN_GUARD == "refuse":
+        raise ValueError(f"Refused: {message}")
+    return f"Warning: {message}\n"
 
 
 @mcp.tool()
@@ -36,24 +400,81 @@ def list_collections() -> str:
 
 @mcp.tool()
 def query_collection(
-    collection: str, filter_json: str = "{}", limit: int = 10
+    collection: str,
+    filter_json: str = "{}",
+    limit: int = 10,
+    projection_json: str = "",
+    sort_json: str = "",
+    page_token: str = "",
+    output_format: str = "json",
 ) -> str:
-    """Query documents from a collection.
+    """Query documents from a collection, one page at a time.
 
     Args:
         collection: Name of the MongoDB collection.
         filter_json: JSON string filter, e.g. '{"status": "active"}'.
-        limit: Maximum number of documents to return (default 10).
+        limit: Maximum number of documents to return (default 10, at most MONGODB_QUERY_MAX_LIMIT).
+        projection_json: Optional JSON projection, e.g. '{"name": 1, "email": 1}' or '{"payload": 0}'.
+        sort_json: Optional JSON sort in priority order, e.g. '{"created_at": -1}'. _id is always
+                   added as the final tie-breaker.
+        page_token: The next_page_token from the previous page of the same query, to continue after it.
+        output_format: 'json' (indented, the default) or 'jsonl' (one compact document per line).
     """
     try:
-        db = get_mongo_client()
+        if output_format not in ("json", "jsonl"):
+            return "Error: output_format must be 'json' or 'jsonl'."
         query_filter = json.loads(filter_json)
-        docs = list(db[collection].find(query_filter).limit(limit))
-        if not docs:
-            return "No documents found matching the filter."
-        return f"Found {len(docs)} document(s):\n{json_util.dumps(docs, indent=2)}"
+        projection = json.loads(projection_json) if projection_json else None
+        sort = _sort_spec(json.loads(sort_json) if sort_json else {})
+        limit = max(1, min(limit, MONGODB_QUERY_MAX_LIMIT))
+        fingerprint = _query_fingerprint(collection, query_filter, sort)
+        if page_token:
+            after = _decode_page_token(page_token, fingerprint)
+            query_filter = {"$and": [query_filter, _keyset_filter(sort, after)]}
+        fetch_projection, hidden = _fetch_projection(projection, [field for field, _ in sort])
+
+        db = get_mongo_client()
+        warning = _scan_guard(db[collection], json.loads(filter_json), sort, limit + 1)
+        cursor = (
+            db[collection]
+            .find(query_filter, fetch_projection)
+            .sort(sort)
+            .limit(limit + 1)
+            .batch_size(limit + 1)
+        )
+        out = io.StringIO()
+        count = 0
+        last = None
+        has_more = False
+        for doc in cursor:
+            if count == limit:
+                has_more = True
+                break
+            last = [_get_path(doc, field) for field, _ in sort]
+            for field in hidden:
+                _pop_path(doc, field)
+            if output_format == "jsonl":
+                out.write(json_util.dumps(doc))
+                out.write("\n")
+            else:
+                out.write(",\n" if count else "[\n")
+                out.write(json_util.dumps(doc, indent=2))
+            count += 1
+        cursor.close()
+        if not count:
+            return f"{warning}No documents found matching the filter."
+        if output_format == "json":
+            out.write("\n]\n")
+        text = f"{warning}Found {count} document(s):\n{out.getvalue()}"
+        if has_more:
+            text += f"next_page_token: {_encode_page_token(fingerprint, last)}"
+        else:
+            text += "(last page)"
+        return text
     except json.JSONDecodeError as e:
-        return f"Invalid filter JSON: {e}"
+        return f"Invalid JSON: {e}"
+    except ValueError as e:
+        return f"Error: {e}"
     except Exception as e:
         return f"Error querying collection: {e}"
 
@@ -70,6 +491,7 @@ def insert_document(collection: str, document: str) -> str:
         db = get_mongo_client()
         doc = json.loads(document)
         result = db[collection].insert_one(doc)
+        _forget_counts(db[collection])
         return f"Document inserted successfully. ID: {result.inserted_id}"
     except json.JSONDecodeError as e:
         return f"Invalid document JSON: {e}"
@@ -77,6 +499,88 @@ def insert_document(collection: str, document: str) -> str:
         return f"Error inserting document: {e}"
 
 
+def _parse_documents(documents: str) -> list:
+    """A JSON array of objects, or NDJSON (one object per line). Extended JSON ($oid, $date) is accepted."""
+    text = documents.strip()
+    if text.startswith("["):
+        docs = json_util.loads(text)
+    else:
+        docs = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                docs.append(json_util.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {number}: {e}")
+    for i, doc in enumerate(docs):
+        if not isinstance(doc, dict):
+            raise ValueError(f"Document #{i} is not a JSON object.")
+    return docs
+
+
+@mcp.tool()
+def insert_documents(collection: str, documents: str, batch_size: int = 0) -> str:
+    """Insert many documents with unordered insert_many batches.
+
+    Args:
+        collection: Name of the MongoDB collection.
+        documents: JSON array of documents, or NDJSON (one JSON document per line).
+        batch_size: Documents per insert_many call (default MONGODB_INSERT_BATCH_SIZE, 1000).
+    """
+    try:
+        docs = _parse_documents(documents)
+        if not docs:
+            return "No documents to insert."
+        batch_size = max(1, batch_size or MONGODB_INSERT_BATCH_SIZE)
+        coll = get_mongo_client()[collection]
+        inserted = 0
+        batch_lines = []
+        duplicates = []
+        failures = []
+        started = time.perf_counter()
+        for first in range(0, len(docs), batch_size):
+            batch = docs[first:first + batch_size]
+            batch_start = time.perf_counter()
+            try:
+                # Unordered: the server keeps going past a failed document (e.g. a duplicate _id)
+                count = len(coll.insert_many(batch, ordered=False).inserted_ids)
+            except BulkWriteError as e:
+                count = e.details.get("nInserted", 0)
+                for error in e.details.get("writeErrors", []):
+                    index = first + error["index"]
+                    if error.get("code") == 11000:
+                        key = error.get("keyValue") or {"_id": docs[index].get("_id")}
+                        duplicates.append(f"#{index} {json_util.dumps(key)}")
+                    else:
+                        failures.append(f"#{index} {error.get('errmsg', error)}")
+            inserted += count
+            batch_lines.append(
+                f"  batch {len(batch_lines) + 1}: #{first}-#{first + len(batch) - 1}, "
+                f"inserted {count}/{len(batch)} in {(time.perf_counter() - batch_start) * 1000:.1f} ms"
+            )
+        elapsed = time.perf_counter() - started
+        _forget_counts(coll)
+        lines = [
+            f"Inserted {inserted} of {len(docs)} document(s) in {len(batch_lines)} batch(es), "
+            f"{elapsed:.2f}s ({inserted / elapsed if elapsed else 0:,.0f} docs/s)."
+        ]
+        lines += batch_lines
+        for title, errors in (("Duplicate keys", duplicates), ("Other failures", failures)):
+            if errors:
+                lines.append(f"{title} ({len(errors)}):")
+                lines += [f"  {error}" for error in errors[:WRITE_ERRORS_SHOWN]]
+                if len(errors) > WRITE_ERRORS_SHOWN:
+                    lines.append(f"  ... and {len(errors) - WRITE_ERRORS_SHOWN} more")
+        return "\n".join(lines)
+    except json.JSONDecodeError as e:
+        return f"Invalid documents JSON: {e}"
+    except ValueError as e:
+        return f"Error: {e}"
+    except Exception as e:
+        return f"Error inserting documents: {e}"
+
+
 @mcp.tool()
 def update_documents(collection: str, filter_json: str, update_json: str) -> str:
     """Update documents matching a filter by setting fields.
@@ -92,6 +596,7 @@ def update_documents(collection: str, filter_json: str, update_json: str) -> str
         query_filter = json.loads(filter_json)
         update_fields = json.loads(update_json)
         result = db[collection].update_many(query_filter, {"$set": update_fields})
+        _forget_counts(db[collection])
         return (
             f"Matched {result.matched_count} document(s), "
             f"modified {result.modified_count} document(s)."
@@ -114,6 +619,7 @@ def delete_documents(collection: str, filter_json: str) -> str:
         db = get_mongo_client()
         query_filter = json.loads(filter_json)
         result = db[collection].delete_many(query_filter)
+        _forget_counts(db[collection])
         return f"Deleted {result.deleted_count} document(s)."
     except json.JSONDecodeError as e:
         return f"Invalid filter JSON: {e}"
@@ -121,48 +627,590 @@ def delete_documents(collection: str, filter_json: str) -> str:
         return f"Error deleting documents: {e}"
 
 
+def _write_model(spec: dict):
+    """One operation in MongoDB shell bulkWrite form, e.g. {"updateOne": {"filter": ..., "update": ...}}."""
+    if not isinstance(spec, dict) or len(spec) != 1:
+        raise ValueError("must be an object with exactly one operation key, e.g. {\"updateOne\": {...}}")
+    kind, args = next(iter(spec.items()))
+    if not isinstance(args, dict):
+        raise ValueError(f"{kind} arguments must be an object")
+    if kind == "insertOne":
+        return InsertOne(args["document"])
+    if kind in ("deleteOne", "deleteMany"):
+        return (DeleteOne if kind == "deleteOne" else DeleteMany)(args["filter"])
+    if kind in ("updateOne", "updateMany"):
+        update = args["update"]
+        # An operator document ($set, $inc, $push, ...) or an aggregation-pipeline update
+        if not isinstance(update, list) and not (update and all(key.startswith("$") for key in update)):
+            raise ValueError(f"{kind} update must use operators such as $set or $inc, or be a pipeline")
+        model = UpdateOne if kind == "updateOne" else UpdateMany
+        return model(args["filter"], update, upsert=bool(args.get("upsert", False)),
+                     array_filters=args.get("arrayFilters"))
+    if kind == "replaceOne":
+        replacement = args["replacement"]
+        if any(key.startswith("$") for key in replacement):
+            raise ValueError("replaceOne replacement must not contain update operators")
+        return ReplaceOne(args["filter"], replacement, upsert=bool(args.get("upsert", False)))
+    raise ValueError(
+        f"unknown operation '{kind}' (use insertOne, updateOne, updateMany, replaceOne, deleteOne or deleteMany)"
+    )
+
+
+@mcp.tool()
+def bulk_write(collection: str, operations: str, ordered: bool = False, batch_size: int = 0) -> str:
+    """Run many insert/update/upsert/replace/delete operations as batched bulk_write calls.
+
+    Args:
+        collection: Name of the MongoDB collection.
+        operations: JSON array (or NDJSON) of operations in MongoDB bulkWrite form, e.g.
+                    '[{"updateOne": {"filter": {"sku": "A1"}, "update": {"$inc": {"qty": 5}}, "upsert": true}},
+                      {"replaceOne": {"filter": {"_id": 7}, "replacement": {"sku": "B2", "qty": 0}}},
+                      {"deleteOne": {"filter": {"sku": "OLD"}}}]'.
+                    Also accepted: insertOne {"document"}, updateMany, deleteMany.
+        ordered: Stop at the first failed operation (default False: run all, report failures).
+        batch_size: Operations per bulk_write call (default MONGODB_BULK_BATCH_SIZE, 1000).
+    """
+    try:
+        specs = _parse_documents(operations)
+        if not specs:
+            return "No operations to run."
+        models = []
+        for i, spec in enumerate(specs):
+            try:
+                models.append(_write_model(spec))
+            except KeyError as e:
+                return f"Operation #{i}: missing field {e}."
+            except (ValueError, TypeError) as e:
+                return f"Operation #{i}: {e}."
+        batch_size = max(1, batch_size or MONGODB_BULK_BATCH_SIZE)
+        coll = get_mongo_client()[collection]
+        totals = {"inserted": 0, "matched": 0, "modified": 0, "upserted": 0, "deleted": 0}
+        upserted_ids = []
+        errors = []
+        batches = 0
+        stopped_at = None
+        started = time.perf_counter()
+        for first in range(0, len(models), batch_size):
+            batches += 1
+            try:
+                result = coll.bulk_write(models[first:first + batch_size], ordered=ordered)
+                counts = result.bulk_api_result
+            except BulkWriteError as e:
+                counts = e.details
+                for error in counts.get("writeErrors", []):
+                    errors.append(f"#{first + error['index']} {error.get('errmsg', error)}")
+            totals["inserted"] += counts.get("nInserted", 0)
+            totals["matched"] += counts.get("nMatched", 0)
+            totals["modified"] += counts.get("nModified", 0)
+            totals["upserted"] += counts.get("nUpserted", 0)
+            totals["deleted"] += counts.get("nRemoved", 0)
+            upserted_ids += [(first + item["index"], item["_id"]) for item in counts.get("upserted", [])]
+            if ordered and errors:
+                stopped_at = first + counts["writeErrors"][0]["index"]
+                break
+        elapsed = time.perf_counter() - started
+        _forget_counts(coll)
+        lines = [
+            f"Processed {len(models) if stopped_at is None else stopped_at + 1} of {len(models)} operation(s) "
+            f"in {batches} batch(es), {elapsed:.2f}s, {len(errors)} failed.",
+            "  " + ", ".join(f"{name}: {count}" for name, count in totals.items()),
+        ]
+        if upserted_ids:
+            lines.append(f"Upserted ids ({len(upserted_ids)}):")
+            lines += [f"  #{index} {json_util.dumps(_id)}" for index, _id in upserted_ids[:WRITE_ERRORS_SHOWN]]
+            if len(upserted_ids) > WRITE_ERRORS_SHOWN:
+                lines.append(f"  ... and {len(upserted_ids) - WRITE_ERRORS_SHOWN} more")
+        if errors:
+            lines.append(f"Failed operations ({len(errors)}):")
+            lines += [f"  {error}" for error in errors[:WRITE_ERRORS_SHOWN]]
+            if len(errors) > WRITE_ERRORS_SHOWN:
+                lines.append(f"  ... and {len(errors) - WRITE_ERRORS_SHOWN} more")
+        if stopped_at is not None:
+            lines.append(f"Stopped at operation #{stopped_at} (ordered=True); later operations were not run.")
+        return "\n".join(lines)
+    except json.JSONDecodeError as e:
+        return f"Invalid operations JSON: {e}"
+    except ValueError as e:
+        return f"Error: {e}"
+    except Exception as e:
+        return f"Error running bulk write: {e}"
+
+
+def _forget_counts(coll):
+    """Drop memoized counts of a collection after this server writes to it."""
+    with _count_lock:
+        for key in [key for key in _count_cache if key[:2] == (coll.database.name, coll.name)]:
+            del _count_cache[key]
+
+
 @mcp.tool()
-def count_documents(collection: str, filter_json: str = "{}") -> str:
+def count_documents(collection: str, filter_json: str = "{}", exact: bool = False, fresh: bool = False) -> str:
     """Count documents in a collection matching an optional filter.
 
+    With the default empty filter the count comes from collection metadata
+    (estimated_document_count), which is instant but can drift slightly after unclean
+    shutdowns or on sharded clusters with orphaned documents; set exact=True to scan.
+    Counts are memoized for MONGODB_COUNT_CACHE_TTL seconds; set fresh=True to bypass.
+
     Args:
         collection: Name of the MongoDB collection.
         filter_json: JSON string filter, e.g. '{"active": true}'. Defaults to all documents.
+        exact: Count the empty filter with count_documents instead of the metadata estimate.
+        fresh: Ignore any memoized count and ask the server.
     """
     try:
         db = get_mongo_client()
+        coll = db[collection]
         query_filter = json.loads(filter_json)
-        count = db[collection].count_documents(query_filter)
-        return f"Count: {count} document(s) match the filter."
+        estimated = not query_filter and not exact
+        key = (db.name, collection, json_util.dumps(query_filter, sort_keys=True), not estimated)
+        now = time.monotonic()
+        with _count_lock:
+            cached = _count_cache.get(key)
+            if cached and (fresh or now - cached[0] > MONGODB_COUNT_CACHE_TTL):
+                del _count_cache[key]
+                cached = None
+            if cached:
+                _count_cache.move_to_end(key)
+        warning = ""
+        if cached:
+            stored_at, count = cached
+            source = f"cached {now - stored_at:.0f}s ago"
+        else:
+            if estimated:
+                count = coll.estimated_document_count()
+            else:
+                warning = _scan_guard(coll, query_filter)
+                count = coll.count_documents(query_filter)
+            source = "fresh"
+            with _count_lock:
+                _count_cache[key] = (now, count)
+                while len(_count_cache) > COUNT_CACHE_SIZE:
+                    _count_cache.popitem(last=False)
+        if estimated:
+            return (
+                f"Count: {count} document(s) in the collection "
+                f"(estimated from collection metadata, {source}; pass exact=True for an exact count)."
+            )
+        return f"{warning}Count: {count} document(s) match the filter (exact, {source})."
     except json.JSONDecodeError as e:
         return f"Invalid filter JSON: {e}"
+    except ValueError as e:
+        return f"Error: {e}"
     except Exception as e:
         return f"Error counting documents: {e}"
 
 
+def _leading_match(pipeline: list):
+    """The filter and sort the server can push down to an index: a leading $match, then $sort."""
+    query_filter, sort = {}, None
+    stages = iter(pipeline)
+    stage = next(stages, {})
+    if "$match" in stage:
+        query_filter = stage["$match"]
+        stage = next(stages, {})
+    if "$sort" in stage:
+        sort = list(stage["$sort"].items())
+    return query_filter, sort
+
+
+def _pipeline_guard(coll, pipeline: list) -> str:
+    """
+    _scan_guard for the part of a pipeline pushed down to the query layer: a leading
+    $match/$sort and a $limit right after them. Pipelines that start with anything else
+    ($sample, $limit, $lookup, ...) are not planned as a find, so they are not checked.
+    """
+    stages = [stage if isinstance(stage, dict) else {} for stage in pipeline] + [{}]
+    pushed = 0
+    for name in ("$match", "$sort"):
+        if name in stages[pushed]:
+            pushed += 1
+    if not pushed:
+        return ""
+    limit = stages[pushed].get("$limit", 0)
+    return _scan_guard(coll, *_leading_match(pipeline), limit if isinstance(limit, int) else 0)
+
+
+def _drain(entry: dict, max_results: int, max_bytes: int, output_format: str):
+    """
+    Serialize results from an open cursor until max_results documents or max_bytes of output.
+    A document that would cross max_bytes is kept in entry["pending"] for the next call
+    (unless it is the first one, so every call makes progress). Returns (text, count, exhausted).
+    """
+    out = io.StringIO()
+    count = 0
+    size = 0
+    cursor = entry["cursor"]
+    while count < max_results:
+        doc = entry.pop("pending", None)
+        if doc is None:
+            doc = next(cursor, None)
+            if doc is None:
+                return out.getvalue(), count, True
+        text = json_util.dumps(doc) if output_format == "jsonl" else json_util.dumps(doc, indent=2)
+        if count and size + len(text) + 2 > max_bytes:
+            entry["pending"] = doc
+            break
+        if output_format == "jsonl":
+            out.write(text)
+            out.write("\n")
+        else:
+            out.write(",\n" if count else "[\n")
+            out.write(text)
+        size += len(text) + 2
+        count += 1
+    if "pending" not in entry:
+        # Peek, so a handle is only returned when another page really exists
+        doc = next(cursor, None)
+        if doc is None:
+            return out.getvalue(), count, True
+        entry["pending"] = doc
+    return out.getvalue(), count, False
+
+
+def _expire_cursors():
+    now = time.monotonic()
+    with _cursor_lock:
+        stale = [handle for handle, entry in _open_cursors.items() if entry["expires_at"] < now]
+        while len(_open_cursors) - len(stale) >= MAX_OPEN_CURSORS:
+            oldest = next(handle for handle in _open_cursors if handle not in stale)
+            stale.append(oldest)
+        entries = [_open_cursors.pop(handle) for handle in stale]
+    for entry in entries:
+        entry["cursor"].close()
+
+
+def _page_response(entry: dict, max_results: int, max_bytes: int, output_format: str, warning: str = "") -> str:
+    """Drain one page from the cursor and either park it under a handle or close it."""
+    text, count, exhausted = _drain(entry, max_results, max_bytes, output_format)
+    entry["returned"] += count
+    if count and output_format == "json":
+        text += "\n]\n"
+    if exhausted:
+        entry["cursor"].close()
+        if not entry["returned"]:
+            return f"{warning}Aggregation returned no results."
+        footer = f"(end of results, {entry['returned']} in total)"
+    else:
+        handle = entry.get("handle") or secrets.token_hex(8)
+        entry["handle"] = handle
+        entry["expires_at"] = time.monotonic() + MONGODB_CURSOR_TTL
+        _expire_cursors()
+        with _cursor_lock:
+            _open_cursors[handle] = entry
+        limit = "max_results" if count >= max_results else "max_bytes"
+        footer = (f"cursor_handle: {handle} (stopped at {limit}; call aggregate_more to continue, "
+                  f"{entry['returned']} returned so far)")
+    return f"{warning}Aggregation returned {count} result(s):\n{text}{footer}"
+
+
 @mcp.tool()
-def aggregate(collection: str, pipeline_json: str) -> str:
-    """Run an aggregation pipeline on a collection.
+def aggregate(
+    collection: str,
+    pipeline_json: str,
+    allow_disk_use: Optional[bool] = None,
+    batch_size: int = 0,
+    max_time_ms: int = 0,
+    max_results: int = 0,
+    max_bytes: int = 0,
+    output_format: str = "json",
+) -> str:
+    """Run an aggregation pipeline on a collection and stream back the first page of results.
+
+    Results are read from the server cursor one at a time and serialized until max_results
+    documents or max_bytes of output. If more remain, the response ends with a cursor_handle:
+    pass it to aggregate_more for the next page.
 
     Args:
         collection: Name of the MongoDB collection.
         pipeline_json: JSON array string representing the pipeline stages,
                        e.g. '[{"$match": {"status": "active"}}, {"$group": {"_id": "$city", "total": {"$sum": 1}}}]'.
+        allow_disk_use: Let $group/$sort stages spill to temporary files instead of failing at the
+                        server's 100 MB memory limit. Unset keeps the server default
+                        (allowDiskUseByDefault, on since MongoDB 6.0).
+        batch_size: Documents per server round-trip (default: one page, max_results + 1).
+        max_time_ms: Server-side time limit for the whole aggregation (0 = none).
+        max_results: Documents per page (default MONGODB_AGG_MAX_RESULTS, 1000).
+        max_bytes: Approximate output size per page (default MONGODB_AGG_MAX_BYTES, 1 MB).
+        output_format: 'json' (indented, the default) or 'jsonl' (one compact result per line).
     """
     try:
+        if output_format not in ("json", "jsonl"):
+            return "Error: output_format must be 'json' or 'jsonl'."
         db = get_mongo_client()
         pipeline = json.loads(pipeline_json)
         if not isinstance(pipeline, list):
             return "Pipeline must be a JSON array of stages."
-        results = list(db[collection].aggregate(pipeline))
-        if not results:
-            return "Aggregation returned no results."
-        return f"Aggregation returned {len(results)} result(s):\n{json_util.dumps(results, indent=2)}"
+        warning = _pipeline_guard(db[collection], pipeline)
+        max_results = max(1, max_results or MONGODB_AGG_MAX_RESULTS)
+        max_bytes = max(1, max_bytes or MONGODB_AGG_MAX_BYTES)
+        options = {"batchSize": batch_size or min(max_results + 1, 10_000)}
+        if allow_disk_use is not None:
+            options["allowDiskUse"] = allow_disk_use
+        if max_time_ms:
+            options["maxTimeMS"] = max_time_ms
+        cursor = db[collection].aggregate(pipeline, **options)
+        entry = {"cursor": cursor, "collection": collection, "returned": 0}
+        return _page_response(entry, max_results, max_bytes, output_format, warning)
     except json.JSONDecodeError as e:
         return f"Invalid pipeline JSON: {e}"
+    except ExecutionTimeout:
+        return f"Error: aggregation exceeded max_time_ms={max_time_ms}."
+    except ValueError as e:
+        return f"Error: {e}"
     except Exception as e:
         return f"Error running aggregation: {e}"
 
 
+@mcp.tool()
+def aggregate_more(
+    cursor_handle: str,
+    max_results: int = 0,
+    max_bytes: int = 0,
+    output_format: str = "json",
+    close: bool = False,
+) -> str:
+    """Fetch the next page of an aggregation started with aggregate.
+
+    Args:
+        cursor_handle: The cursor_handle from the previous aggregate/aggregate_more response.
+        max_results: Documents per page (default MONGODB_AGG_MAX_RESULTS, 1000).
+        max_bytes: Approximate output size per page (default MONGODB_AGG_MAX_BYTES, 1 MB).
+        output_format: 'json' (indented, the default) or 'jsonl'.
+        close: Discard the rest of the results and release the server cursor.
+    """
+    _expire_cursors()
+    with _cursor_lock:
+        # Taken out while in use, so two calls cannot read the same cursor at once
+        entry = _open_cursors.pop(cursor_handle, None)
+    if entry is None:
+        return (f"Unknown or expired cursor_handle '{cursor_handle}'. Handles expire after "
+                f"{MONGODB_CURSOR_TTL:g}s idle or once all results are read; run aggregate again.")
+    if close:
+        entry["cursor"].close()
+        return f"Closed cursor {cursor_handle} after {entry['returned']} result(s)."
+    try:
+        if output_format not in ("json", "jsonl"):
+            with _cursor_lock:
+                _open_cursors[cursor_handle] = entry
+            return "Error: output_format must be 'json' or 'jsonl'."
+        max_results = max(1, max_results or MONGODB_AGG_MAX_RESULTS)
+        max_bytes = max(1, max_bytes or MONGODB_AGG_MAX_BYTES)
+        return _page_response(entry, max_results, max_bytes, output_format)
+    except CursorNotFound:
+        return "Error: the server discarded this cursor (idle too long); run aggregate again."
+    except ExecutionTimeout:
+        return "Error: aggregation exceeded its max_time_ms."
+    except Exception as e:
+        entry["cursor"].close()
+        return f"Error fetching aggregation results: {e}"
+
+
+def _describe_plan(planner: dict):
+    """(stage chain like "FETCH <- IXSCAN", [(index name, key pattern)]) of the winning plan."""
+    stages = _plan_stages(planner.get("winningPlan", {}))
+    chain = " <- ".join(stage["stage"] for stage in stages) or "n/a"
+    indexes = []
+    for stage in stages:
+        if stage.get("indexName") and (stage["indexName"], stage.get("keyPattern")) not in indexes:
+            indexes.append((stage["indexName"], stage.get("keyPattern")))
+    return chain, indexes
+
+
+@mcp.tool()
+def explain_query(
+    collection: str,
+    filter_json: str = "{}",
+    sort_json: str = "",
+    pipeline_json: str = "",
+    execute: bool = False,
+    max_time_ms: int = 10000,
+) -> str:
+    """Show how MongoDB runs a query: winning plan, index usage, and documents examined vs. returned.
+
+    Args:
+        collection: Name of the MongoDB collection.
+        filter_json: JSON string filter of the find/count to explain, e.g. '{"status": "active"}'.
+        sort_json: Optional JSON sort, e.g. '{"created_at": -1}'.
+        pipeline_json: Explain this aggregation pipeline instead of a find.
+        execute: Also run the plan to collect executionStats. This executes the whole query, so it
+                 goes through the MONGODB_COLLSCAN_GUARD check first. The default only plans it
+                 (queryPlanner), which is instant even on huge collections.
+        max_time_ms: Server-side time limit for an executed explain (0 = none).
+    """
+    try:
+        db = get_mongo_client()
+        coll = db[collection]
+        verbosity = "executionStats" if execute else "queryPlanner"
+        warning = ""
+        if pipeline_json:
+            pipeline = json.loads(pipeline_json)
+            if not isinstance(pipeline, list):
+                return "Pipeline must be a JSON array of stages."
+            if execute:
+                warning = _pipeline_guard(coll, pipeline)
+            else:
+                _observe_query(coll, *_leading_match(pipeline))
+            command = {"aggregate": collection, "pipeline": pipeline, "cursor": {}}
+            if execute and max_time_ms:
+                command["maxTimeMS"] = max_time_ms
+            explain = db.command("explain", command, verbosity=verbosity)
+            kind = "aggregate"
+        else:
+            query_filter = json.loads(filter_json)
+            sort = list(json.loads(sort_json).items()) if sort_json else None
+            if execute:
+                warning = _scan_guard(coll, query_filter, sort)
+            else:
+                _observe_query(coll, query_filter, sort)
+            explain = _explain(coll, query_filter, sort, verbosity, max_time_ms if execute else 0)
+            kind = "find"
+        planner, stats = _explain_sections(explain)
+        chain, indexes = _describe_plan(planner)
+        lines = [f"{warning}Explain {kind} on '{collection}' ({verbosity}):", f"Winning plan: {chain}"]
+        if kind == "aggregate" and explain.get("stages"):
+            lines.append("Pipeline: " + " -> ".join(next(iter(stage)) for stage in explain["stages"]))
+        if indexes:
+            lines += [f"Index used: {name} {json_util.dumps(pattern)}" for name, pattern in indexes]
+        elif "COLLSCAN" in chain:
+            lines.append("Index used: none (COLLSCAN reads every document). See suggest_indexes.")
+        rejected = len(planner.get("rejectedPlans", []))
+        if rejected:
+            lines.append(f"Rejected plans: {rejected}")
+        if stats:
+            returned = stats.get("nReturned", 0)
+            docs = stats.get("totalDocsExamined", 0)
+            keys = stats.get("totalKeysExamined", 0)
+            lines.append(
+                f"Returned {returned:,} | docs examined {docs:,} | keys examined {keys:,} | "
+                f"{stats.get('executionTimeMillis', 0)} ms"
+            )
+            if docs > 10 * max(returned, 1):
+                lines.append(
+                    f"Warning: {docs / max(returned, 1):,.0f} documents examined per document returned; "
+                    "the filter is not served selectively by an index."
+                )
+        return "\n".join(lines)
+    except ExecutionTimeout:
+        return f"Error: executing the query exceeded max_time_ms={max_time_ms}. Use execute=False to only plan it."
+    except json.JSONDecodeError as e:
+        return f"Invalid JSON: {e}"
+    except ValueError as e:
+        return f"Error: {e}"
+    except Exception as e:
+        return f"Error explaining query: {e}"
+
+
+def _covers(index_keys: list, keys: list, equality: int = 0) -> bool:
+    """
+    Whether an index on index_keys can serve keys: the same fields as a prefix, with the
+    directions after the first `equality` (equality-matched) fields all equal or all reversed.
+    """
+    if len(index_keys) < len(keys) or [field for field, _ in index_keys[:len(keys)]] != [f for f, _ in keys]:
+        return False
+    signs = {index_keys[i][1] == keys[i][1] for i in range(equality, len(keys))}
+    return len(signs) <= 1
+
+
+@mcp.tool()
+def suggest_indexes(collection: str = "", min_queries: int = 1) -> str:
+    """Recommend compound indexes from the filter and sort shapes of recent queries.
+
+    Shapes are recorded by query_collection, count_documents, aggregate (leading $match/$sort)
+    and explain_query since the server started. Keys follow the equality, sort, range rule.
+
+    Args:
+        collection: Only suggest for this collection (default: all observed collections).
+        min_queries: Ignore shapes seen fewer times than this (default 1).
+    """
+    try:
+        db = get_mongo_client()
+        with _shape_lock:
+            shapes = [
+                (name, entry) for (db_name, name, _), entry in _filter_shapes.items()
+                if db_name == db.name and (not collection or name == collection) and entry["count"] >= min_queries
+            ]
+        if not shapes:
+            return "No query shapes observed yet. Run some queries first, then ask again."
+        by_collection = {}
+        for name, entry in shapes:
+            keys = (
+                [(field, 1) for field in sorted(entry["equality"])]
+                + [(field, direction) for field, direction in entry["sort"]]
+                + [(field, 1) for field in entry["range"]]
+            )
+            suggestions = by_collection.setdefault(name, {})
+            keys = tuple(dict.fromkeys(keys))
+            count, _ = suggestions.get(keys, (0, 0))
+            suggestions[keys] = (count + entry["count"], len(entry["equality"]))
+
+        lines = [f"Index suggestions from {sum(entry['count'] for _, entry in shapes)} observed queries "
+                 "(equality fields, then sort, then range):"]
+        for name, suggestions in sorted(by_collection.items()):
+            # A longer index also serves every query on its prefix, so fold prefixes into it.
+            kept = []
+            for keys, (count, equality) in sorted(suggestions.items(), key=lambda item: -len(item[0])):
+                wider = next((other for other in kept if _covers(other["keys"], list(keys), equality)), None)
+                if wider:
+                    wider["count"] += count
+                else:
+                    kept.append({"keys": list(keys), "count": count, "equality": equality})
+            existing = {
+                index: info["key"] for index, info in db[name].index_information().items()
+            }
+            lines.append(f"{name}:")
+            for suggestion in sorted(kept, key=lambda item: -item["count"]):
+                pattern = json.dumps(dict(suggestion["keys"]))
+                queries = f"{suggestion['count']} {'query' if suggestion['count'] == 1 else 'queries'}"
+                covered_by = next((index for index, keys in existing.items()
+                                   if _covers([tuple(key) for key in keys], suggestion["keys"], suggestion["equality"])),
+                                  None)
+                if covered_by:
+                    lines.append(f"  already covered by {covered_by}: {pattern} ({queries})")
+                else:
+                    lines.append(f"  db.{name}.createIndex({pattern})  # {queries}")
+        return "\n".join(lines)
+    except Exception as e:
+        return f"Error suggesting indexes: {e}"
+
+
+@mcp.tool()
+def connection_health() -> str:
+    """Ping the server and report the shared client's topology, round-trip times and pool settings."""
+    try:
+        db = get_mongo_client()
+        client = db.client
+        start = time.perf_counter()
+        db.command("ping")
+        ping_ms = (time.perf_counter() - start) * 1000
+        topology = client.topology_description
+        lines = [
+            f"Connection OK — ping {ping_ms:.1f} ms, topology {topology.topology_type_name}",
+        ]
+        for address, server in sorted(topology.server_descriptions().items()):
+            rtt = server.round_trip_time
+            rtt_text = f"{rtt * 1000:.1f} ms" if rtt is not None else "n/a"
+            error = f", error: {server.error}" if server.error else ""
+            lines.append(
+                f"  • {address[0]}:{address[1]} — {server.server_type_name}, rtt {rtt_text}{error}"
+            )
+        pool = client.options.pool_options
+        with _client_lock:
+            stats = dict(_client_stats)
+        lines.append(
+            f"Pool: max {pool.max_pool_size}, min {pool.min_pool_size}, "
+            f"connect timeout {pool.connect_timeout:g}s, "
+            f"server selection timeout {client.options.server_selection_timeout:g}s, "
+            f"read preference {client.read_preference.mongos_mode}"
+        )
+        lines.append(
+            f"Client: created {stats['created']} time(s), reused for {stats['checkouts']} call(s), "
+            f"up {time.time() - stats['created_at']:.0f}s"
+        )
+        return "\n".join(lines)
+    except Exception as e:
+        return f"Connection unhealthy: {e}"
+
+
 if __name__ == "__main__":
     mcp.run(transport="stdio")
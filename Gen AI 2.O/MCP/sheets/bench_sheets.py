@@ -0,0 +1,477 @@
+"""
+Benchmarks for sheets_mcp.py against a local fake Google Sheets endpoint.
+
+No Google account or token.json is needed: a threaded HTTP server on 127.0.0.1
+answers the Sheets REST and batch endpoints and sleeps `--rtt` ms per request to
+simulate the network round-trip to sheets.googleapis.com.
+
+Usage:
+    python bench_sheets.py ranges [--rtt 40] [--ranges 20]
+    python bench_sheets.py large [--rtt 40] [--rows 100000] [--cols 30]
+    python bench_sheets.py append [--rtt 40] [--events 300] [--write-quota 60]
+    python bench_sheets.py metadata [--rtt 40] [--tabs 40] [--iterations 50]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import deque
+from urllib.parse import parse_qs, unquote, urlparse
+
+import sheets_mcp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fake_google  # noqa: E402  (shared with bench_email.py, one directory up)
+
+SPREADSHEET_ID = "bench-spreadsheet"
+
+
+def synthetic_sheet(rows, cols):
+    """A header row plus `rows` data rows of `cols` columns (mixed numbers and text)."""
+    header = [f"col{c}" for c in range(cols)]
+    data = [
+        [str(r * cols + c) if c % 3 else f"item-{r}-{c}" for c in range(cols)]
+        for r in range(rows)
+    ]
+    return [header] + data
+
+
+def _a1(sheet, first_row, first_col, last_row, last_col):
+    start = sheets_mcp._column_letters(first_col) + str(first_row)
+    end = sheets_mcp._column_letters(last_col) + str(last_row)
+    return f"{sheet}!{start}:{end}"
+
+
+def start_fake_sheets(rtt_ms, tabs, write_quota=None, rules_per_tab=0):
+    """
+    Start the fake Sheets server in a daemon thread. Returns (server, stats).
+    `tabs` maps tab names to 2D row lists of one spreadsheet, SPREADSHEET_ID. values.get,
+    batchGet, update, batchUpdate, append and the /batch endpoint are supported.
+    With write_quota, write calls beyond that many per minute answer 429 (RESOURCE_EXHAUSTED).
+    spreadsheets.get honours fields="sheets.properties"; without a mask each tab also carries
+    rules_per_tab conditional-format rules and merges, like a heavily formatted workbook.
+    """
+    stats = {"requests": 0, "bytes_out": 0, "calls": 0, "writes": 0, "rate_limited": 0}
+    stats_lock = threading.Lock()
+    recent_writes = deque()
+    data_lock = threading.Lock()
+    order = list(tabs)
+
+    def _resolve(range_name):
+        """(tab name, first_row, first_col, last_row, last_col) with open ends clamped to the data."""
+        sheet, first_row, first_col, last_row, last_col = sheets_mcp._parse_a1(range_name)
+        if "!" not in range_name and ":" not in range_name and range_name in tabs:
+            sheet, first_row, first_col, last_row, last_col = range_name, 1, 1, None, None
+        sheet = sheet or order[0]
+        if sheet not in tabs:
+            raise KeyError(f"Unable to parse range: {range_name}")
+        rows = tabs[sheet]
+        last_row = last_row or max(len(rows), first_row)
+        last_col = last_col or max((len(r) for r in rows), default=first_col)
+        return sheet, first_row, first_col, last_row, last_col
+
+    def _spreadsheet(fields):
+        sheets = []
+        for index, (title, rows) in enumerate(tabs.items()):
+            sheet = {"properties": {
+                "sheetId": 1000 + index, "title": title, "index": index, "sheetType": "GRID",
+                "gridProperties": {"rowCount": max(len(rows), 1000),
+                                   "columnCount": max(max((len(r) for r in rows), default=0), 26)},
+            }}
+            if not (fields or "").startswith("sheets.properties"):
+                sheet["conditionalFormats"] = [
+                    {"ranges": [{"sheetId": 1000 + index, "startRowIndex": i, "endRowIndex": i + 1,
+                                 "startColumnIndex": 0, "endColumnIndex": 26}],
+                     "booleanRule": {"condition": {"type": "NUMBER_GREATER", "values": [{"userEnteredValue": str(i)}]},
+                                     "format": {"backgroundColor": {"red": 1, "green": 0.8, "blue": 0.8}}}}
+                    for i in range(rules_per_tab)
+                ]
+                sheet["merges"] = [{"sheetId": 1000 + index, "startRowIndex": i, "endRowIndex": i + 1,
+                                    "startColumnIndex": 0, "endColumnIndex": 2} for i in range(rules_per_tab)]
+            sheets.append(sheet)
+        if (fields or "").startswith("sheets.properties"):
+            return {"sheets": sheets}
+        return {"spreadsheetId": SPREADSHEET_ID, "properties": {"title": "Bench", "locale": "en_US"},
+                "sheets": sheets, "spreadsheetUrl": f"https://docs.google.com/spreadsheets/d/{SPREADSHEET_ID}"}
+
+    def _get(range_name):
+        sheet, first_row, first_col, last_row, last_col = _resolve(range_name)
+        values = [row[first_col - 1:last_col] for row in tabs[sheet][first_row - 1:last_row]]
+        while values and not any(values[-1]):
+            values.pop()
+        result = {"range": _a1(sheet, first_row, first_col, last_row, last_col), "majorDimension": "ROWS"}
+        if values:
+            result["values"] = values
+        return result
+
+    def _write(sheet, first_row, first_col, values):
+        rows = tabs[sheet]
+        for r, new_row in enumerate(values):
+            while len(rows) < first_row + r:
+                rows.append([])
+            row = rows[first_row + r - 1]
+            row.extend([""] * (first_col - 1 + len(new_row) - len(row)))
+            row[first_col - 1:first_col - 1 + len(new_row)] = [str(v) for v in new_row]
+        width = max((len(row) for row in values), default=0)
+        return {
+            "updatedRange": _a1(sheet, first_row, first_col, first_row + len(values) - 1, first_col + width - 1),
+            "updatedRows": len(values),
+            "updatedColumns": width,
+            "updatedCells": sum(len(row) for row in values),
+        }
+
+    def _update(range_name, values):
+        sheet, first_row, first_col, _, _ = _resolve(range_name)
+        return _write(sheet, first_row, first_col, values)
+
+    def _append(range_name, values):
+        sheet, _, first_col, _, _ = _resolve(range_name)
+        rows = tabs[sheet]
+        last = len(rows)
+        while last and not any(rows[last - 1]):
+            last -= 1
+        return {"updates": _write(sheet, last + 1, first_col, values)}
+
+    def _route(method, path, query, body=b""):
+        """Answer one Sheets REST call. Returns (status, json-serializable body)."""
+        match = re.fullmatch(r"/v4/spreadsheets/([^/:]+)(?:/values(?:/([^:]+))?(?::(\w+))?|:(\w+))?", path)
+        if not match or unquote(match.group(1)) != SPREADSHEET_ID:
+            return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+        range_name = unquote(match.group(2) or "")
+        action = match.group(3)
+        with stats_lock:
+            stats["calls"] += 1
+            if method != "GET":
+                now = time.monotonic()
+                while recent_writes and now - recent_writes[0] > 60:
+                    recent_writes.popleft()
+                if write_quota is not None and len(recent_writes) >= write_quota:
+                    stats["rate_limited"] += 1
+                    return 429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED",
+                                           "message": "Quota exceeded for 'Write requests per minute per user'."}}
+                recent_writes.append(now)
+                stats["writes"] += 1
+        try:
+            with data_lock:
+                if method == "GET" and "/values" not in path and not match.group(4):
+                    return 200, _spreadsheet(query.get("fields", [""])[0])
+                if method == "GET" and range_name and not action:
+                    return 200, _get(range_name)
+                if method == "GET" and action == "batchGet":
+                    return 200, {"spreadsheetId": SPREADSHEET_ID,
+                                 "valueRanges": [_get(r) for r in query.get("ranges", [])]}
+                if method == "PUT" and range_name:
+                    return 200, _update(range_name, json.loads(body)["values"])
+                if method == "POST" and action == "append":
+                    return 200, _append(range_name, json.loads(body)["values"])
+                if method == "POST" and action == "batchUpdate":
+                    data = json.loads(body)["data"]
+                    for entry in data:
+                        _resolve(entry["range"])  # all-or-nothing, like the real API
+                    responses = [_update(e["range"], e["values"]) for e in data]
+                    return 200, {"spreadsheetId": SPREADSHEET_ID, "responses": responses,
+                                 "totalUpdatedCells": sum(r["updatedCells"] for r in responses)}
+        except KeyError as e:
+            return 400, {"error": {"code": 400, "message": e.args[0], "status": "INVALID_ARGUMENT"}}
+        return 404, {"error": {"code": 404, "message": "Not found"}}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, content, content_type="application/json"):
+            with stats_lock:
+                stats["requests"] += 1
+                stats["bytes_out"] += len(content)
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def _handle(self, method):
+            time.sleep(rtt_ms / 1000)
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = self.rfile.read(length) if length else b""
+            url = urlparse(self.path)
+            if url.path == "/batch":
+                boundary, content = fake_google.answer_batch(
+                    self.headers["Content-Type"], payload,
+                    lambda method, path, query, headers, body: _route(method, path, query, body),
+                    "batch_fake_sheets",
+                )
+                self._send(200, content, f'multipart/mixed; boundary="{boundary}"')
+                return
+            status, body = _route(method, url.path, parse_qs(url.query), payload)
+            self._send(status, json.dumps(body).encode())
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PUT(self):
+            self._handle("PUT")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def fake_service(server):
+    """Build a Sheets client bound to the fake server, bypassing OAuth."""
+    return fake_google.fake_service("sheets", "v4", server.server_address[1])
+
+
+def _install(server):
+    service = fake_service(server)
+    sheets_mcp.get_sheets_service = lambda: service
+    sheets_mcp._read_cache.clear()
+    sheets_mcp._metadata_cache.clear()
+    return service
+
+
+def bench_ranges(args):
+    """A dashboard touching N ranges: one read_sheet/write_to_sheet per range vs. read_ranges/write_ranges."""
+    tabs = {f"Tab{t}": synthetic_sheet(200, 12) for t in range(4)}
+    server, stats = start_fake_sheets(args.rtt, tabs)
+    _install(server)
+    ranges = [f"Tab{i % 4}!{sheets_mcp._column_letters(i % 10 + 1)}{i * 5 + 1}:"
+              f"{sheets_mcp._column_letters(i % 10 + 3)}{i * 5 + 5}" for i in range(args.ranges)]
+    updates = {r: [["1", "2", "3"]] * 5 for r in ranges}
+
+    print(f"{len(ranges)} ranges (rtt={args.rtt} ms)")
+    before = stats["requests"]
+    start = time.perf_counter()
+    for range_name in ranges:
+        sheets_mcp.read_sheet(SPREADSHEET_ID, range_name, fresh=True)
+    single_ms = (time.perf_counter() - start) * 1000
+    single_reqs = stats["requests"] - before
+
+    before = stats["requests"]
+    start = time.perf_counter()
+    result = json.loads(sheets_mcp.read_ranges(SPREADSHEET_ID, json.dumps(ranges), fresh=True))
+    batch_ms = (time.perf_counter() - start) * 1000
+    assert all("values" in r for r in result["ranges"])
+    print(f"  read:  per range {single_ms:8.1f} ms ({single_reqs} requests)   "
+          f"read_ranges {batch_ms:7.1f} ms ({stats['requests'] - before} request)")
+
+    before = stats["requests"]
+    start = time.perf_counter()
+    for range_name, values in updates.items():
+        sheets_mcp.write_to_sheet(SPREADSHEET_ID, range_name, json.dumps(values))
+    single_ms = (time.perf_counter() - start) * 1000
+    single_reqs = stats["requests"] - before
+
+    before = stats["requests"]
+    start = time.perf_counter()
+    result = json.loads(sheets_mcp.write_ranges(SPREADSHEET_ID, json.dumps(updates)))
+    batch_ms = (time.perf_counter() - start) * 1000
+    assert all("updatedCells" in r for r in result["ranges"])
+    print(f"  write: per range {single_ms:8.1f} ms ({single_reqs} requests)   "
+          f"write_ranges {batch_ms:6.1f} ms ({stats['requests'] - before} request)")
+
+    bad = ranges[:3] + ["Missing!A1:B2"]
+    before = stats["requests"]
+    result = json.loads(sheets_mcp.read_ranges(SPREADSHEET_ID, json.dumps(bad), fresh=True))
+    errors = [r["range"] for r in result["ranges"] if "error" in r]
+    print(f"  one invalid range among {len(bad)}: errors for {errors}, "
+          f"{stats['requests'] - before} requests (batchGet, then each range on its own in one batch request)")
+    server.shutdown()
+
+
+def _nested_max_table(rows):
+    """The previous read_sheet renderer: a per-column max() over every row, then str() again per cell."""
+    col_widths = []
+    for col_idx in range(max(len(row) for row in rows)):
+        width = max(
+            (len(str(row[col_idx])) if col_idx < len(row) else 0)
+            for row in rows
+        )
+        col_widths.append(max(width, 3))
+
+    lines = []
+    for i, row in enumerate(rows):
+        padded = [
+            str(row[j]).ljust(col_widths[j]) if j < len(row) else " " * col_widths[j]
+            for j in range(len(col_widths))
+        ]
+        lines.append("| " + " | ".join(padded) + " |")
+        if i == 0:
+            lines.append("| " + " | ".join("-" * w for w in col_widths) + " |")
+    return "\n".join(lines)
+
+
+def _serve_large(rtt_ms, rows, cols, ready):
+    server, _ = start_fake_sheets(rtt_ms, {"Data": synthetic_sheet(rows, cols)})
+    ready.put(server.server_address[1])
+    threading.Event().wait()
+
+
+def bench_large(args):
+    """read_sheet on a rows x cols tab: whole-range table vs. streamed CSV/JSONL/column stats."""
+    rows = synthetic_sheet(args.rows, args.cols)
+    start = time.perf_counter()
+    _nested_max_table(rows)
+    nested_s = time.perf_counter() - start
+    start = time.perf_counter()
+    sheets_mcp._format_table(rows)
+    single_s = time.perf_counter() - start
+    print(f"render {args.rows}x{args.cols} table: nested max() {nested_s:6.2f} s, single pass {single_s:6.2f} s")
+    del rows
+
+    # The fake server runs in its own process so tracemalloc only sees the client's allocations.
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve_large, args=(args.rtt, args.rows, args.cols, ready), daemon=True)
+    server.start()
+    port = ready.get()
+    service = fake_google.fake_service("sheets", "v4", port)
+    sheets_mcp.get_sheets_service = lambda: service
+
+    print(f"read_sheet('Data'), {args.rows} rows x {args.cols} cols (rtt={args.rtt} ms, "
+          f"windows of {sheets_mcp.SHEETS_READ_CHUNK_ROWS} rows)")
+    print(f"{'mode':>14} {'seconds':>8} {'peak MB':>8} {'output MB':>10}")
+    modes = [
+        ("table", {"fresh": True}),
+        ("csv", {"output_format": "csv"}),
+        ("jsonl", {"output_format": "jsonl"}),
+        ("column_stats", {"column_stats": True}),
+        ("page of 100", {"skip_rows": 50_000, "max_rows": 100}),
+    ]
+    for label, kwargs in modes:
+        start = time.perf_counter()
+        output = sheets_mcp.read_sheet(SPREADSHEET_ID, "Data", **kwargs)
+        seconds = time.perf_counter() - start
+        del output
+        tracemalloc.start()
+        output = sheets_mcp.read_sheet(SPREADSHEET_ID, "Data", **kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        sheets_mcp._read_cache.clear()
+        print(f"{label:>14} {seconds:>8.2f} {peak / 2**20:>8.0f} {len(output) / 2**20:>10.1f}")
+    server.terminate()
+
+
+_SHUTDOWN_CHILD = """
+import json, sys
+import httplib2
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+import sheets_mcp
+discovery = json.loads(discovery_cache.get_static_doc("sheets", "v4"))
+discovery["rootUrl"] = sys.argv[1]
+service = build_from_document(discovery, http=httplib2.Http())
+sheets_mcp.get_sheets_service = lambda: service
+for i in range(int(sys.argv[2])):
+    sheets_mcp.append_to_sheet(sys.argv[3], "Log!A:C", json.dumps([[i, "shutdown", "pending"]]), buffered=True)
+"""
+
+
+def bench_append(args):
+    """One append per logged event vs. the coalescing buffer, under a per-minute write quota."""
+    events = [[[i, f"event-{i}", time.strftime("%H:%M:%S")]] for i in range(args.events)]
+    print(f"{args.events} logged events (rtt={args.rtt} ms, fake quota {args.write_quota} writes/min, "
+          f"buffer {sheets_mcp.SHEETS_APPEND_MAX_ROWS} rows / {sheets_mcp.SHEETS_APPEND_MAX_DELAY:g} s)")
+
+    server, stats = start_fake_sheets(args.rtt, {"Log": [["id", "event", "time"]]}, write_quota=args.write_quota)
+    _install(server)
+    start = time.perf_counter()
+    failed = sum(
+        sheets_mcp.append_to_sheet(SPREADSHEET_ID, "Log!A:C", json.dumps(rows)).startswith("Error")
+        for rows in events
+    )
+    elapsed = time.perf_counter() - start
+    print(f"  per event: {args.events / elapsed:8.1f} events/s, {stats['writes']} accepted append calls, "
+          f"{failed} events lost to 429")
+    server.shutdown()
+
+    server, stats = start_fake_sheets(args.rtt, {"Log": [["id", "event", "time"]]}, write_quota=args.write_quota)
+    _install(server)
+    start = time.perf_counter()
+    for rows in events:
+        sheets_mcp.append_to_sheet(SPREADSHEET_ID, "Log!A:C", json.dumps(rows), buffered=True)
+    queued = time.perf_counter() - start
+    sheets_mcp.flush_appends()
+    elapsed = time.perf_counter() - start
+    delivered = len(json.loads(sheets_mcp.read_ranges(SPREADSHEET_ID, '["Log!A2:C"]'))["ranges"][0]["values"])
+    print(f"  buffered:  {args.events / elapsed:8.1f} events/s ({queued * 1e6 / args.events:.0f} us per queued "
+          f"event), {stats['writes']} append calls, {delivered} rows delivered")
+    server.shutdown()
+
+    server, stats = start_fake_sheets(args.rtt, {"Log": [["id", "event", "time"]]})
+    root = f"http://127.0.0.1:{server.server_address[1]}/"
+    subprocess.run([sys.executable, "-c", _SHUTDOWN_CHILD, root, "25", SPREADSHEET_ID], check=True,
+                   cwd=sheets_mcp.DIR_PATH)
+    print(f"  shutdown:  25 buffered rows in an exiting process -> {stats['writes']} append call(s) at exit")
+    server.shutdown()
+
+
+def bench_metadata(args):
+    """list_sheets on a heavily formatted workbook: full spreadsheets.get vs. the masked, cached fetch."""
+    tabs = {f"Tab {t:02d}": synthetic_sheet(20, 8) for t in range(args.tabs)}
+    server, stats = start_fake_sheets(args.rtt, tabs, rules_per_tab=300)
+    service = _install(server)
+    print(f"list_sheets, {args.tabs} tabs x 300 conditional formats (rtt={args.rtt} ms, {args.iterations} calls)")
+
+    def _run(call):
+        before_bytes = stats["bytes_out"]
+        before = stats["requests"]
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            call()
+        ms = (time.perf_counter() - start) * 1000 / args.iterations
+        kb = (stats["bytes_out"] - before_bytes) / 1024 / args.iterations
+        return ms, kb, stats["requests"] - before
+
+    full = _run(lambda: service.spreadsheets().get(spreadsheetId=SPREADSHEET_ID).execute())
+
+    def _uncached():
+        sheets_mcp._metadata_cache.clear()
+        sheets_mcp.list_sheets(SPREADSHEET_ID)
+
+    masked = _run(_uncached)
+    cached = _run(lambda: sheets_mcp.list_sheets(SPREADSHEET_ID))
+    for label, (ms, kb, reqs) in (("full get (before)", full), ("fields mask", masked), ("mask + cache", cached)):
+        print(f"  {label:<18} {ms:8.1f} ms/call {kb:9.1f} KB/call {reqs:5} requests")
+
+    bad = json.dumps(["Tab 01!A1:C5", "Tab 02!A1:C5", "Tab 99!A1:C5"])
+    before = stats["requests"]
+    result = json.loads(sheets_mcp.read_ranges(SPREADSHEET_ID, bad, fresh=True))
+    print(f"  read_ranges with an unknown tab: {stats['requests'] - before} requests "
+          f"(batchGet, then each range on its own in one batch request), error: {result['ranges'][2]['error']}")
+    server.shutdown()
+
+
+BENCHMARKS = {
+    "ranges": bench_ranges,
+    "large": bench_large,
+    "append": bench_append,
+    "metadata": bench_metadata,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--rtt", type=float, default=40.0, help="simulated round-trip time in ms")
+    parser.add_argument("--ranges", type=int, default=20, help="ranges touched by the dashboard")
+    parser.add_argument("--events", type=int, default=300, help="logged events for the append benchmark")
+    parser.add_argument("--write-quota", type=int, default=60, help="fake server write requests per minute")
+    parser.add_argument("--tabs", type=int, default=40, help="tabs in the metadata benchmark workbook")
+    parser.add_argument("--iterations", type=int, default=50, help="repetitions for the metadata benchmark")
+    parser.add_argument("--rows", type=int, default=100_000, help="rows in the large synthetic tab")
+    parser.add_argument("--cols", type=int, default=30, help="columns in the large synthetic tab")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
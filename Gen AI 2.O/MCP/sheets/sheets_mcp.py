@@ -1,11 +1,19 @@
 import os
+import re
+import atexit
+import io
+import csv
 import json
+import threading
+import time
+from collections import OrderedDict
 
 from mcp.server.fastmcp import FastMCP
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 DIR_PATH = os.path.dirname(os.path.abspath(__file__))
@@ -35,40 +43,569 @@ def get_sheets_service():
     return build("sheets", "v4", credentials=creds)
 
 
-@mcp.tool()
-def read_sheet(spreadsheet_id: str, range_name: str = "Sheet1") -> str:
-    """Read data from a Google Sheets spreadsheet range (e.g. "Sheet1!A1:D10"). Returns a formatted table."""
-    try:
-        service = get_sheets_service()
-        result = (
-            service.spreadsheets()
-            .values()
-            .get(spreadsheetId=spreadsheet_id, range=range_name)
-            .execute()
-        )
+SHEETS_CACHE_SIZE = int(os.environ.get("SHEETS_CACHE_SIZE", "128"))
+SHEETS_CACHE_TTL = float(os.environ.get("SHEETS_CACHE_TTL", "30"))
+
+# (spreadsheet_id, normalized range) -> (expires_at, parsed range, rows), least recently used first
+_read_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+_A1_CELL = re.compile(r"^([A-Za-z]{0,3})(\d*)$")
+
+
+def _column_number(letters: str) -> int:
+    number = 0
+    for ch in letters.upper():
+        number = number * 26 + ord(ch) - 64
+    return number
+
+
+def _column_letters(number: int) -> str:
+    letters = ""
+    while number:
+        number, rem = divmod(number - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _parse_a1(range_name: str):
+    """
+    Parse an A1 range into (sheet, first_row, first_col, last_row, last_col), 1-based and
+    inclusive, with None for unbounded ends. sheet is "" when the range names no tab
+    (the API then uses the first sheet); a bare tab name covers the whole sheet. A bare
+    token such as "A1" or "Tab1" may be either, so it is treated as any cell of any tab.
+    """
+    range_name = range_name.strip()
+    sheet, sep, cells = range_name.rpartition("!")
+    if not sep:
+        sheet, cells = "", range_name
+        if ":" not in cells and _A1_CELL.match(cells):
+            return "", 1, 1, None, None
+        if not all(_A1_CELL.match(part) for part in cells.split(":")) or cells.count(":") > 1:
+            sheet, cells = range_name, ""
+    if len(sheet) > 1 and sheet[0] == sheet[-1] == "'":
+        sheet = sheet[1:-1].replace("''", "'")
+    if not cells:
+        return sheet, 1, 1, None, None
+    start, _, end = cells.partition(":")
+    first_col, first_row = _A1_CELL.match(start).groups()
+    last_col, last_row = _A1_CELL.match(end or start).groups()
+    if not end and not first_row:
+        last_row = ""
+    return (
+        sheet,
+        int(first_row) if first_row else 1,
+        _column_number(first_col) if first_col else 1,
+        int(last_row) if last_row else None,
+        _column_number(last_col) if last_col else None,
+    )
+
+
+def _normalize_range(range_name: str) -> str:
+    """Canonical A1 text for cache keys: 'sheet1!A1:D10' and "'Sheet1'!a1:d10" share an entry."""
+    if "!" not in range_name and ":" not in range_name:
+        return range_name.strip().lower()
+    sheet, first_row, first_col, last_row, last_col = _parse_a1(range_name)
+    start = _column_letters(first_col) + str(first_row)
+    end = (_column_letters(last_col) if last_col else "") + (str(last_row) if last_row else "")
+    return f"{sheet.lower()}!{start}:{end}"
+
+
+def _ranges_overlap(a, b) -> bool:
+    """Whether two parsed ranges can share a cell. An unnamed sheet may be any tab."""
+    if a[0] and b[0] and a[0].lower() != b[0].lower():
+        return False
+    inf = float("inf")
+    rows = a[1] <= (b[3] or inf) and b[1] <= (a[3] or inf)
+    cols = a[2] <= (b[4] or inf) and b[2] <= (a[4] or inf)
+    return rows and cols
+
+
+def _cache_get(spreadsheet_id: str, range_name: str):
+    key = (spreadsheet_id, _normalize_range(range_name))
+    with _cache_lock:
+        entry = _read_cache.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del _read_cache[key]
+                _cache_stats["evictions"] += 1
+            _cache_stats["misses"] += 1
+            return None
+        _read_cache.move_to_end(key)
+        _cache_stats["hits"] += 1
+        return entry[2]
+
+
+def _cache_put(spreadsheet_id: str, range_name: str, rows: list):
+    key = (spreadsheet_id, _normalize_range(range_name))
+    with _cache_lock:
+        _read_cache[key] = (time.monotonic() + SHEETS_CACHE_TTL, _parse_a1(range_name), rows)
+        _read_cache.move_to_end(key)
+        while len(_read_cache) > SHEETS_CACHE_SIZE:
+            _read_cache.popitem(last=False)
+            _cache_stats["evictions"] += 1
+
+
+def _invalidate(spreadsheet_id: str, range_name: str = "", whole_columns: bool = False) -> int:
+    """
+    Drop cached reads of spreadsheet_id overlapping range_name (all of them when empty).
+    whole_columns widens the range to every row, for appends whose target rows are unknown.
+    """
+    target = None
+    if range_name:
+        target = _parse_a1(range_name)
+        if whole_columns:
+            target = (target[0], 1, target[2], None, target[4])
+    with _cache_lock:
+        stale = [
+            key for key, entry in _read_cache.items()
+            if key[0] == spreadsheet_id and (target is None or _ranges_overlap(entry[1], target))
+        ]
+        for key in stale:
+            del _read_cache[key]
+        _cache_stats["invalidations"] += len(stale)
+    return len(stale)
+
+
+SHEETS_READ_CHUNK_ROWS = int(os.environ.get("SHEETS_READ_CHUNK_ROWS", "5000"))
+STATS_DISTINCT_CAP = 1000
+MAX_SHEET_COLUMN = "ZZZ"
+
+
+def _format_table(rows: list) -> str:
+    """
+    Padded markdown table. Rows are padded to the widest row once, so the width pass and the
+    render pass index cells directly instead of bounds-checking and str()-ing every cell twice.
+    """
+    width = max(map(len, rows))
+    blank = [""] * width
+    if all(type(cell) is str for row in rows for cell in row):
+        cells = [row if len(row) == width else row + blank[len(row):] for row in rows]
+    else:
+        cells = [[str(cell) for cell in row] + blank[len(row):] for row in rows]
+    widths = [max(3, max(len(row[j]) for row in cells)) for j in range(width)]
+
+    lines = ["| " + " | ".join(map(str.ljust, row, widths)) + " |" for row in cells]
+    lines.insert(1, "| " + " | ".join("-" * w for w in widths) + " |")
+    return "\n".join(lines)
+
+
+def _iter_row_windows(values_api, spreadsheet_id: str, range_name: str, skip_rows: int = 0,
+                      max_rows: int = 0, chunk_rows: int = 0):
+    """
+    Yield the rows of range_name in windows of chunk_rows, one values.get per window, starting
+    skip_rows into the range and stopping after max_rows (0 = no limit) or at the end of the data:
+    the first window that comes back empty, or the tab's cached rowCount for open-ended ranges.
+    A run of chunk_rows blank rows therefore ends the read. Only one window is held at a time.
+    values_api is service.spreadsheets().values(); building it copies the discovery schema, so
+    callers create it once and reuse it.
+    """
+    chunk_rows = chunk_rows or SHEETS_READ_CHUNK_ROWS
+    sheet, first_row, first_col, last_row, last_col = _parse_a1(range_name)
+    prefix = "'" + sheet.replace("'", "''") + "'!" if sheet else ""
+    if "!" not in range_name and ":" not in range_name:
+        # A bare tab name (or single cell); read it as a whole tab.
+        name = range_name.strip()
+        if len(name) > 1 and name[0] == name[-1] == "'":
+            name = name[1:-1].replace("''", "'")
+        prefix, first_row, first_col, last_row, last_col = "'" + name.replace("'", "''") + "'!", 1, 1, None, None
+        sheet = name
+    grid_rows = _tab_row_count(spreadsheet_id, sheet) if last_row is None else 0
+    row = first_row + skip_rows
+    remaining = max_rows or None
+    while last_row is None or row <= last_row:
+        count = chunk_rows if remaining is None else min(chunk_rows, remaining)
+        end_row = row + count - 1 if last_row is None else min(row + count - 1, last_row)
+        if first_col == 1 and last_col is None:
+            window = f"{prefix}{row}:{end_row}"
+        else:
+            end_col = _column_letters(last_col) if last_col else MAX_SHEET_COLUMN
+            window = f"{prefix}{_column_letters(first_col)}{row}:{end_col}{end_row}"
+        result = values_api.get(spreadsheetId=spreadsheet_id, range=window).execute()
         rows = result.get("values", [])
-        if not rows:
-            return "No data found in the specified range."
+        if rows:
+            yield rows
+        if remaining is not None:
+            remaining -= len(rows)
+            if remaining <= 0:
+                return
+        # values.get drops trailing empty rows, so a short window may just end in a blank row:
+        # keep going past it, and stop at an empty window or the tab's last row. Walking the
+        # rest of a large, sparse grid one empty window at a time would cost a round-trip each.
+        if not rows or (grid_rows and end_row >= grid_rows):
+            return
+        row = end_row + 1
+
+
+def _column_stats(windows, header: bool = True) -> list:
+    """
+    Per-column stats over streamed row windows without keeping the rows:
+    non-empty and numeric counts, numeric min/max/mean, and distinct values (capped).
+    """
+    names = []
+    stats = []
+    first = header
+    for rows in windows:
+        for row in rows:
+            if first:
+                names = [str(cell) for cell in row]
+                first = False
+                continue
+            if len(row) > len(stats):
+                stats.extend(
+                    {"non_empty": 0, "numeric": 0, "sum": 0.0, "min": None, "max": None, "distinct": set()}
+                    for _ in range(len(row) - len(stats))
+                )
+            for cell, col in zip(row, stats):
+                if cell == "":
+                    continue
+                col["non_empty"] += 1
+                if len(col["distinct"]) < STATS_DISTINCT_CAP:
+                    col["distinct"].add(cell)
+                try:
+                    number = float(cell)
+                except (TypeError, ValueError):
+                    continue
+                col["numeric"] += 1
+                col["sum"] += number
+                if col["min"] is None or number < col["min"]:
+                    col["min"] = number
+                if col["max"] is None or number > col["max"]:
+                    col["max"] = number
+
+    summary = []
+    for j, col in enumerate(stats):
+        distinct = len(col["distinct"])
+        summary.append({
+            "column": names[j] if j < len(names) else _column_letters(j + 1),
+            "non_empty": col["non_empty"],
+            "numeric": col["numeric"],
+            "min": col["min"],
+            "max": col["max"],
+            "mean": col["sum"] / col["numeric"] if col["numeric"] else None,
+            "distinct": distinct if distinct < STATS_DISTINCT_CAP else f"{STATS_DISTINCT_CAP}+",
+        })
+    return summary
+
+
+def _error_text(error) -> str:
+    if isinstance(error, HttpError):
+        return f"{error.resp.status} {error.reason}"
+    return str(error)
+
+
+def _parse_range_list(ranges: str) -> list:
+    """A JSON array of A1 ranges, or a comma-separated list."""
+    ranges = ranges.strip()
+    if ranges.startswith("["):
+        parsed = json.loads(ranges)
+        if not isinstance(parsed, list) or not all(isinstance(r, str) for r in parsed):
+            raise ValueError("ranges must be a JSON array of A1 range strings")
+        return [r.strip() for r in parsed if r.strip()]
+    return [r.strip() for r in ranges.split(",") if r.strip()]
+
+
+def _run_individually(service, make_request, keys: list) -> dict:
+    """
+    Send make_request(key) for every key in one HTTP batch request, so that one bad range only
+    fails itself. Used after an all-or-nothing batchGet/batchUpdate is rejected.
+    Returns {key: response or exception}.
+    """
+    outcomes = {}
+
+    def _collect(request_id, response, exception):
+        outcomes[keys[int(request_id)]] = exception if exception is not None else response
+
+    batch = service.new_batch_http_request(callback=_collect)
+    for i, key in enumerate(keys):
+        batch.add(make_request(key), request_id=str(i))
+    batch.execute()
+    return outcomes
+
+
+SHEETS_METADATA_TTL = float(os.environ.get("SHEETS_METADATA_TTL", "300"))
+
+# spreadsheet_id -> (fetched_at, [sheet properties in tab order], {named range name.lower(): A1})
+_metadata_cache = {}
+_metadata_lock = threading.Lock()
+
+
+def _grid_range_a1(grid: dict, titles: dict) -> str:
+    """A1 notation for a GridRange (0-based, end-exclusive, open ends omitted)."""
+    title = _quote_sheet(titles.get(grid.get("sheetId", 0), ""))
+    if not any(key in grid for key in ("startRowIndex", "endRowIndex", "startColumnIndex", "endColumnIndex")):
+        return title
+    start = _column_letters(grid.get("startColumnIndex", 0) + 1) + str(grid.get("startRowIndex", 0) + 1)
+    end_col = _column_letters(grid["endColumnIndex"]) if "endColumnIndex" in grid else MAX_SHEET_COLUMN
+    end_row = str(grid["endRowIndex"]) if "endRowIndex" in grid else ""
+    return f"{title}!{start}:{end_col}{end_row}"
 
-        col_widths = []
-        for col_idx in range(max(len(row) for row in rows)):
-            width = max(
-                (len(str(row[col_idx])) if col_idx < len(row) else 0)
-                for row in rows
-            )
-            col_widths.append(max(width, 3))
 
-        lines = []
-        for i, row in enumerate(rows):
-            padded = [
-                str(row[j]).ljust(col_widths[j]) if j < len(row) else " " * col_widths[j]
-                for j in range(len(col_widths))
+def _load_metadata(spreadsheet_id: str, refresh: bool = False) -> tuple:
+    with _metadata_lock:
+        entry = _metadata_cache.get(spreadsheet_id)
+    if entry and not refresh and time.monotonic() - entry[0] < SHEETS_METADATA_TTL:
+        return entry
+    service = get_sheets_service()
+    metadata = (
+        service.spreadsheets()
+        .get(spreadsheetId=spreadsheet_id, fields="sheets.properties,namedRanges(name,range)")
+        .execute()
+    )
+    tabs = sorted((s.get("properties", {}) for s in metadata.get("sheets", [])), key=lambda p: p.get("index", 0))
+    titles = {tab.get("sheetId", 0): tab.get("title", "") for tab in tabs}
+    named = {
+        named_range.get("name", "").lower(): _grid_range_a1(named_range.get("range", {}), titles)
+        for named_range in metadata.get("namedRanges", [])
+    }
+    entry = (time.monotonic(), tabs, named)
+    with _metadata_lock:
+        _metadata_cache[spreadsheet_id] = entry
+    return entry
+
+
+def _sheet_properties(spreadsheet_id: str, refresh: bool = False) -> list:
+    """Tab properties (title, sheetId, index, gridProperties), fetched with a fields mask and cached."""
+    return _load_metadata(spreadsheet_id, refresh)[1]
+
+
+def _tab_row_count(spreadsheet_id: str, title: str) -> int:
+    """Cached gridProperties.rowCount of a tab ("" = the first tab), or 0 when unknown."""
+    tabs = _sheet_properties(spreadsheet_id)
+    for tab in tabs:
+        if tab.get("title") == title or (not title and tab is tabs[0]):
+            return tab.get("gridProperties", {}).get("rowCount", 0)
+    return 0
+
+
+def _quote_sheet(title: str) -> str:
+    return "'" + title.replace("'", "''") + "'"
+
+
+def _resolve_range(spreadsheet_id: str, range_name: str) -> str:
+    """
+    Qualify range_name with the exact title of its tab using the cached metadata: a bare tab
+    name, a named range, a range without a tab (the first tab) and a differently-cased tab name
+    all resolve locally. Anything else (e.g. a tab added since the metadata was cached) is
+    passed through unchanged for the API to resolve or reject.
+    """
+    range_name = range_name.strip()
+    sheet, sep, cells = range_name.rpartition("!")
+    if len(sheet) > 1 and sheet[0] == sheet[-1] == "'":
+        sheet = sheet[1:-1].replace("''", "'")
+    bare = range_name[1:-1].replace("''", "'") if range_name[:1] == range_name[-1:] == "'" else range_name
+    _, tabs, named = _load_metadata(spreadsheet_id)
+    titles = {tab.get("title", "").lower(): tab.get("title", "") for tab in tabs}
+    if sep:
+        if sheet.lower() in titles:
+            return f"{_quote_sheet(titles[sheet.lower()])}!{cells}"
+    elif bare.lower() in titles:
+        return _quote_sheet(titles[bare.lower()])
+    elif bare.lower() in named:
+        return named[bare.lower()]
+    elif tabs and all(_A1_CELL.match(part) for part in range_name.split(":")) and range_name.count(":") <= 1:
+        return f"{_quote_sheet(tabs[0].get('title', ''))}!{range_name}"
+    return range_name
+
+
+SHEETS_APPEND_MAX_ROWS = int(os.environ.get("SHEETS_APPEND_MAX_ROWS", "500"))
+SHEETS_APPEND_MAX_DELAY = float(os.environ.get("SHEETS_APPEND_MAX_DELAY", "2"))
+
+# (spreadsheet_id, normalized range) -> {"range_name", "rows", "since"}
+_append_buffers = {}
+_append_lock = threading.Lock()
+_flush_lock = threading.Lock()  # one append call at a time keeps rows in arrival order
+_append_stats = {"queued_rows": 0, "flushes": 0, "flushed_rows": 0, "dropped_rows": 0}
+_flusher = None
+
+
+def _append_rows(spreadsheet_id: str, range_name: str, rows: list) -> int:
+    """One values.append call; evicts the cached reads it touches. Returns the rows appended."""
+    service = get_sheets_service()
+    result = (
+        service.spreadsheets()
+        .values()
+        .append(
+            spreadsheetId=spreadsheet_id,
+            range=range_name,
+            valueInputOption="USER_ENTERED",
+            insertDataOption="INSERT_ROWS",
+            body={"values": rows},
+        )
+        .execute()
+    )
+    updates = result.get("updates", {})
+    # The API reports exactly where the rows landed; without that, evict the whole columns.
+    if updates.get("updatedRange"):
+        _invalidate(spreadsheet_id, updates["updatedRange"])
+    else:
+        _invalidate(spreadsheet_id, range_name, whole_columns=True)
+    return updates.get("updatedRows", 0)
+
+
+def _flush_appends(spreadsheet_id: str = "", max_age: float = 0.0) -> list:
+    """
+    Send buffered rows as one append call per (spreadsheet, range), optionally only for one
+    spreadsheet or for buffers older than max_age seconds. After a 429/5xx or network error the
+    rows stay queued ahead of newer rows; rows the API rejects (other 4xx) are dropped.
+    Returns [(spreadsheet_id, range_name, rows sent, error or None)].
+    """
+    report = []
+    with _flush_lock:
+        now = time.monotonic()
+        with _append_lock:
+            due = [
+                (key, _append_buffers.pop(key)) for key, buf in list(_append_buffers.items())
+                if (not spreadsheet_id or key[0] == spreadsheet_id) and now - buf["since"] >= max_age
             ]
-            lines.append("| " + " | ".join(padded) + " |")
-            if i == 0:
-                lines.append("| " + " | ".join("-" * w for w in col_widths) + " |")
+        for key, buf in due:
+            try:
+                sent = _append_rows(key[0], buf["range_name"], buf["rows"])
+                with _append_lock:
+                    _append_stats["flushes"] += 1
+                    _append_stats["flushed_rows"] += len(buf["rows"])
+                report.append((key[0], buf["range_name"], sent, None))
+            except Exception as e:
+                if isinstance(e, HttpError) and e.resp.status < 500 and e.resp.status != 429:
+                    # A rejected range or value will never succeed; drop the rows and say so.
+                    with _append_lock:
+                        _append_stats["dropped_rows"] += len(buf["rows"])
+                    report.append((key[0], buf["range_name"], 0, f"{_error_text(e)}; {len(buf['rows'])} rows dropped"))
+                    continue
+                with _append_lock:
+                    newer = _append_buffers.pop(key, None)
+                    if newer:
+                        buf["rows"].extend(newer["rows"])
+                    buf["since"] = time.monotonic()  # retried after another SHEETS_APPEND_MAX_DELAY
+                    _append_buffers[key] = buf
+                report.append((key[0], buf["range_name"], 0, f"{_error_text(e)}; rows kept for retry"))
+    return report
+
 
-        return f"Found {len(rows)} rows:\n\n" + "\n".join(lines)
+def _flush_if_pending(spreadsheet_id: str):
+    """Reads and direct writes see (and stay ordered after) rows still waiting in the buffer."""
+    if any(key[0] == spreadsheet_id for key in list(_append_buffers)):
+        _flush_appends(spreadsheet_id)
+
+
+def _flusher_loop():
+    while True:
+        time.sleep(min(SHEETS_APPEND_MAX_DELAY, 1.0))
+        _flush_appends(max_age=SHEETS_APPEND_MAX_DELAY)
+
+
+def _buffer_rows(spreadsheet_id: str, range_name: str, rows: list) -> int:
+    """Queue rows for a coalesced append. Returns the rows now pending for that range."""
+    global _flusher
+    key = (spreadsheet_id, _normalize_range(range_name))
+    with _append_lock:
+        buf = _append_buffers.setdefault(
+            key, {"range_name": range_name, "rows": [], "since": time.monotonic()}
+        )
+        buf["rows"].extend(rows)
+        _append_stats["queued_rows"] += len(rows)
+        pending = len(buf["rows"])
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flusher_loop, daemon=True)
+            _flusher.start()
+    if pending >= SHEETS_APPEND_MAX_ROWS:
+        _flush_appends(spreadsheet_id)
+    return pending
+
+
+def _flush_at_exit():
+    if _append_buffers:
+        _flush_appends()
+
+
+atexit.register(_flush_at_exit)
+
+
+@mcp.tool()
+def read_sheet(
+    spreadsheet_id: str,
+    range_name: str = "Sheet1",
+    fresh: bool = False,
+    output_format: str = "table",
+    skip_rows: int = 0,
+    max_rows: int = 0,
+    column_stats: bool = False,
+) -> str:
+    """
+    Read data from a Google Sheets spreadsheet range (e.g. "Sheet1!A1:D10"). Returns a formatted table.
+    Results are cached for SHEETS_CACHE_TTL seconds; set fresh=True to bypass the cache.
+    For large sheets: output_format 'csv' or 'jsonl' (objects keyed by the header row) streams rows
+    in windows of SHEETS_READ_CHUNK_ROWS; skip_rows/max_rows read one page of rows after the
+    header; column_stats=True returns per-column counts, min/max/mean and distinct values instead.
+    """
+    try:
+        _flush_if_pending(spreadsheet_id)
+        range_name = _resolve_range(spreadsheet_id, range_name)
+        streaming = column_stats or output_format != "table" or skip_rows or max_rows
+        if not streaming:
+            rows = None if fresh else _cache_get(spreadsheet_id, range_name)
+            if rows is None:
+                service = get_sheets_service()
+                result = (
+                    service.spreadsheets()
+                    .values()
+                    .get(spreadsheetId=spreadsheet_id, range=range_name)
+                    .execute()
+                )
+                rows = result.get("values", [])
+                _cache_put(spreadsheet_id, range_name, rows)
+            if not rows:
+                return "No data found in the specified range."
+            return f"Found {len(rows)} rows:\n\n" + _format_table(rows)
+
+        values_api = get_sheets_service().spreadsheets().values()
+        if column_stats:
+            summary = _column_stats(_iter_row_windows(values_api, spreadsheet_id, range_name))
+            if not summary:
+                return "No data found in the specified range."
+            if output_format == "jsonl":
+                return "\n".join(json.dumps(col) for col in summary)
+            table = [["column", "non_empty", "numeric", "min", "max", "mean", "distinct"]]
+            for col in summary:
+                table.append([
+                    col["column"], col["non_empty"], col["numeric"],
+                    "" if col["min"] is None else f"{col['min']:g}",
+                    "" if col["max"] is None else f"{col['max']:g}",
+                    "" if col["mean"] is None else f"{col['mean']:.4g}",
+                    col["distinct"],
+                ])
+            return f"Column stats for {range_name}:\n\n" + _format_table(table)
+
+        # Paging counts data rows, so the header row is read separately and always kept.
+        header_rows = next(_iter_row_windows(values_api, spreadsheet_id, range_name, max_rows=1), [])
+        if not header_rows:
+            return "No data found in the specified range."
+        header = header_rows[0]
+        windows = _iter_row_windows(values_api, spreadsheet_id, range_name, skip_rows=1 + skip_rows, max_rows=max_rows)
+
+        if output_format == "table":
+            rows = [header] + [row for window in windows for row in window]
+            return f"Found {len(rows) - 1} data rows:\n\n" + _format_table(rows)
+
+        out = io.StringIO()
+        count = 0
+        if output_format == "csv":
+            writer = csv.writer(out, lineterminator="\n")
+            writer.writerow(header)
+            for window in windows:
+                writer.writerows(window)
+                count += len(window)
+        elif output_format == "jsonl":
+            keys = [str(name) for name in header]
+            for window in windows:
+                for row in window:
+                    out.write(json.dumps(dict(zip(keys, row)), ensure_ascii=False))
+                    out.write("\n")
+                count += len(window)
+        else:
+            return "Error: output_format must be 'table', 'csv' or 'jsonl'."
+        return f"{count} data rows ({output_format}):\n" + out.getvalue()
     except Exception as e:
         return f"Error reading sheet: {e}"
 
@@ -81,6 +618,8 @@ def write_to_sheet(spreadsheet_id: str, range_name: str, values: str) -> str:
         if not isinstance(data, list) or not all(isinstance(row, list) for row in data):
             return "Error: values must be a JSON 2D array, e.g. '[[\"a\",\"b\"],[\"c\",\"d\"]]'"
 
+        _flush_if_pending(spreadsheet_id)
+        range_name = _resolve_range(spreadsheet_id, range_name)
         service = get_sheets_service()
         body = {"values": data}
         result = (
@@ -94,6 +633,9 @@ def write_to_sheet(spreadsheet_id: str, range_name: str, values: str) -> str:
             )
             .execute()
         )
+        _invalidate(spreadsheet_id, range_name)
+        if result.get("updatedRange"):
+            _invalidate(spreadsheet_id, result["updatedRange"])
         updated = result.get("updatedCells", 0)
         return f"Successfully wrote {updated} cells to {range_name}."
     except json.JSONDecodeError:
@@ -103,29 +645,25 @@ def write_to_sheet(spreadsheet_id: str, range_name: str, values: str) -> str:
 
 
 @mcp.tool()
-def append_to_sheet(spreadsheet_id: str, range_name: str, values: str) -> str:
-    """Append rows to the end of existing data in a sheet. `values` is a JSON string of a 2D array, e.g. '[["John","30"]]'."""
+def append_to_sheet(spreadsheet_id: str, range_name: str, values: str, buffered: bool = False) -> str:
+    """
+    Append rows to the end of existing data in a sheet. `values` is a JSON string of a 2D array, e.g. '[["John","30"]]'.
+    With buffered=True the rows are queued and coalesced with other buffered appends to the same range,
+    then sent as one append once SHEETS_APPEND_MAX_ROWS rows or SHEETS_APPEND_MAX_DELAY seconds are reached
+    (or on flush_appends / server shutdown).
+    """
     try:
         data = json.loads(values)
         if not isinstance(data, list) or not all(isinstance(row, list) for row in data):
             return "Error: values must be a JSON 2D array, e.g. '[[\"a\",\"b\"],[\"c\",\"d\"]]'"
 
-        service = get_sheets_service()
-        body = {"values": data}
-        result = (
-            service.spreadsheets()
-            .values()
-            .append(
-                spreadsheetId=spreadsheet_id,
-                range=range_name,
-                valueInputOption="USER_ENTERED",
-                insertDataOption="INSERT_ROWS",
-                body=body,
-            )
-            .execute()
-        )
-        updates = result.get("updates", {})
-        updated_rows = updates.get("updatedRows", 0)
+        range_name = _resolve_range(spreadsheet_id, range_name)
+        if buffered:
+            pending = _buffer_rows(spreadsheet_id, range_name, data)
+            return f"Queued {len(data)} rows for {range_name} ({pending} pending)."
+
+        _flush_if_pending(spreadsheet_id)
+        updated_rows = _append_rows(spreadsheet_id, range_name, data)
         return f"Successfully appended {updated_rows} rows to {range_name}."
     except json.JSONDecodeError:
         return "Error: Could not parse values. Provide a valid JSON 2D array string."
@@ -133,6 +671,28 @@ def append_to_sheet(spreadsheet_id: str, range_name: str, values: str) -> str:
         return f"Error appending to sheet: {e}"
 
 
+@mcp.tool()
+def flush_appends(spreadsheet_id: str = "") -> str:
+    """Send all buffered append_to_sheet rows now (optionally only for one spreadsheet) and report per range."""
+    try:
+        report = _flush_appends(spreadsheet_id)
+        if not report:
+            return "No buffered rows to flush."
+        lines = [
+            f"  {range_name}: " + (f"FAILED ({error})" if error else f"appended {sent} rows")
+            for _, range_name, sent, error in report
+        ]
+        with _append_lock:
+            stats = dict(_append_stats)
+        return (
+            f"Flushed {len(report)} range(s). Totals: {stats['queued_rows']} rows queued, "
+            f"{stats['flushed_rows']} sent in {stats['flushes']} append call(s), {stats['dropped_rows']} dropped.\n"
+            + "\n".join(lines)
+        )
+    except Exception as e:
+        return f"Error flushing appends: {e}"
+
+
 @mcp.tool()
 def create_spreadsheet(title: str) -> str:
     """Create a new Google Sheets spreadsheet. Returns the spreadsheet ID and URL."""
@@ -148,26 +708,205 @@ def create_spreadsheet(title: str) -> str:
 
 
 @mcp.tool()
-def list_sheets(spreadsheet_id: str) -> str:
-    """List all sheet tabs in a Google Sheets spreadsheet with their names and IDs."""
+def list_sheets(spreadsheet_id: str, refresh: bool = False) -> str:
+    """
+    List all sheet tabs in a Google Sheets spreadsheet with their names, IDs and sizes.
+    Only tab properties are fetched, and they are cached for SHEETS_METADATA_TTL seconds
+    (also used to resolve range names); set refresh=True to re-fetch.
+    """
     try:
-        service = get_sheets_service()
-        metadata = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-        sheets = metadata.get("sheets", [])
+        sheets = _sheet_properties(spreadsheet_id, refresh)
         if not sheets:
             return "No sheets found in this spreadsheet."
 
         lines = [f"Found {len(sheets)} sheet(s):\n"]
-        for sheet in sheets:
-            props = sheet.get("properties", {})
+        for props in sheets:
             name = props.get("title", "Untitled")
             sheet_id = props.get("sheetId", "N/A")
             index = props.get("index", "N/A")
-            lines.append(f"  {index}. \"{name}\" (ID: {sheet_id})")
+            grid = props.get("gridProperties", {})
+            size = f", {grid['rowCount']}x{grid['columnCount']}" if "rowCount" in grid and "columnCount" in grid else ""
+            lines.append(f"  {index}. \"{name}\" (ID: {sheet_id}{size})")
         return "\n".join(lines)
     except Exception as e:
         return f"Error listing sheets: {e}"
 
 
+@mcp.tool()
+def read_ranges(spreadsheet_id: str, ranges: str, fresh: bool = False) -> str:
+    """
+    Read several ranges in one round-trip (values.batchGet). `ranges` is a JSON array such as
+    '["Sheet1!A1:D10", "Summary!B2:C5"]' (a comma-separated list also works).
+    Returns JSON: {"ranges": [{"range", "values"} or {"range", "error"}, ...]} in request order.
+    Cached ranges are served locally (see read_sheet); set fresh=True to bypass the cache.
+    """
+    try:
+        _flush_if_pending(spreadsheet_id)
+        requested = _parse_range_list(ranges)
+        if not requested:
+            return "Error: provide at least one range."
+
+        results = {}
+        resolved = {}
+        for range_name in requested:
+            try:
+                resolved[range_name] = _resolve_range(spreadsheet_id, range_name)
+            except ValueError as e:
+                results[range_name] = {"range": range_name, "error": str(e)}
+                continue
+            rows = None if fresh else _cache_get(spreadsheet_id, resolved[range_name])
+            if rows is not None:
+                results[range_name] = {"range": range_name, "values": rows, "cached": True}
+        missing = [r for r in dict.fromkeys(requested) if r not in results]
+
+        if missing:
+            service = get_sheets_service()
+            values_api = service.spreadsheets().values()
+            try:
+                response = values_api.batchGet(
+                    spreadsheetId=spreadsheet_id, ranges=[resolved[r] for r in missing]
+                ).execute()
+                fetched = dict(zip(missing, response.get("valueRanges", [])))
+            except HttpError as e:
+                if e.resp.status != 400 or len(missing) == 1:
+                    raise
+                # batchGet rejects the whole call for one bad range; isolate it.
+                fetched = _run_individually(
+                    service,
+                    lambda r: values_api.get(spreadsheetId=spreadsheet_id, range=resolved[r]),
+                    missing,
+                )
+            for range_name in missing:
+                outcome = fetched.get(range_name)
+                if isinstance(outcome, Exception):
+                    results[range_name] = {"range": range_name, "error": _error_text(outcome)}
+                    continue
+                rows = (outcome or {}).get("values", [])
+                _cache_put(spreadsheet_id, resolved[range_name], rows)
+                results[range_name] = {"range": range_name, "values": rows}
+
+        return json.dumps({"ranges": [results[r] for r in requested]})
+    except HttpError as e:
+        return f"Error reading ranges: {_error_text(e)}"
+    except Exception as e:
+        return f"Error reading ranges: {e}"
+
+
+@mcp.tool()
+def write_ranges(spreadsheet_id: str, data: str) -> str:
+    """
+    Write several ranges in one round-trip (values.batchUpdate). `data` is a JSON object mapping
+    ranges to 2D arrays, e.g. '{"Sheet1!A1:B2": [["a","b"],["c","d"]], "Summary!B2": [["42"]]}',
+    or a JSON array of {"range": ..., "values": ...} objects.
+    Returns JSON: {"ranges": [{"range", "updatedRange", "updatedCells"} or {"range", "error"}, ...]}.
+    """
+    try:
+        parsed = json.loads(data)
+        if isinstance(parsed, dict):
+            entries = [{"range": r, "values": v} for r, v in parsed.items()]
+        elif isinstance(parsed, list) and all(isinstance(e, dict) for e in parsed):
+            entries = [{"range": e.get("range", ""), "values": e.get("values")} for e in parsed]
+        else:
+            return "Error: data must be a JSON object of range -> 2D array, or an array of {range, values}."
+
+        results = []
+        valid = []
+        requested = []
+        for entry in entries:
+            rows = entry["values"]
+            if not entry["range"]:
+                results.append({"range": "", "error": "missing range"})
+            elif not isinstance(rows, list) or not all(isinstance(row, list) for row in rows):
+                results.append({"range": entry["range"], "error": "values must be a 2D array"})
+            else:
+                try:
+                    resolved = _resolve_range(spreadsheet_id, entry["range"])
+                except ValueError as e:
+                    results.append({"range": entry["range"], "error": str(e)})
+                    continue
+                results.append(None)
+                valid.append({"range": resolved, "values": rows})
+                requested.append(entry["range"])
+
+        outcomes = {}
+        if valid:
+            _flush_if_pending(spreadsheet_id)
+            service = get_sheets_service()
+            values_api = service.spreadsheets().values()
+            try:
+                response = values_api.batchUpdate(
+                    spreadsheetId=spreadsheet_id,
+                    body={"valueInputOption": "USER_ENTERED", "data": valid},
+                ).execute()
+                outcomes = dict(zip(range(len(valid)), response.get("responses", [])))
+            except HttpError as e:
+                if e.resp.status != 400 or len(valid) == 1:
+                    raise
+                # batchUpdate is atomic, so one bad range blocks all; write the rest individually.
+                outcomes = _run_individually(
+                    service,
+                    lambda i: values_api.update(
+                        spreadsheetId=spreadsheet_id,
+                        range=valid[i]["range"],
+                        valueInputOption="USER_ENTERED",
+                        body={"values": valid[i]["values"]},
+                    ),
+                    list(range(len(valid))),
+                )
+
+        written = iter(range(len(valid)))
+        for position, result in enumerate(results):
+            if result is not None:
+                continue
+            i = next(written)
+            range_name = requested[i]
+            outcome = outcomes.get(i, {})
+            if isinstance(outcome, Exception):
+                results[position] = {"range": range_name, "error": _error_text(outcome)}
+                continue
+            _invalidate(spreadsheet_id, valid[i]["range"])
+            if outcome.get("updatedRange"):
+                _invalidate(spreadsheet_id, outcome["updatedRange"])
+            results[position] = {
+                "range": range_name,
+                "updatedRange": outcome.get("updatedRange", valid[i]["range"]),
+                "updatedCells": outcome.get("updatedCells", 0),
+            }
+
+        return json.dumps({"ranges": results})
+    except json.JSONDecodeError:
+        return "Error: Could not parse data. Provide a valid JSON object or array."
+    except HttpError as e:
+        return f"Error writing ranges: {_error_text(e)}"
+    except Exception as e:
+        return f"Error writing ranges: {e}"
+
+
+@mcp.tool()
+def sheets_cache_stats() -> str:
+    """Show read cache hit/miss counters, evictions, invalidations and current size."""
+    with _cache_lock:
+        stats = dict(_cache_stats, size=len(_read_cache))
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "n/a"
+    return (
+        f"Read cache: {stats['size']}/{SHEETS_CACHE_SIZE} entries, TTL {SHEETS_CACHE_TTL:g}s\n"
+        f"  hits: {stats['hits']}  misses: {stats['misses']}  hit rate: {hit_rate}\n"
+        f"  evictions: {stats['evictions']}  invalidations: {stats['invalidations']}"
+    )
+
+
+@mcp.tool()
+def invalidate_sheet_cache(spreadsheet_id: str, range_name: str = "") -> str:
+    """Drop cached reads of a spreadsheet, or only those overlapping `range_name` (e.g. "Sheet1!A1:D10")."""
+    try:
+        if range_name:
+            range_name = _resolve_range(spreadsheet_id, range_name)
+        dropped = _invalidate(spreadsheet_id, range_name)
+        return f"Dropped {dropped} cached range(s)."
+    except Exception as e:
+        return f"Error invalidating cache: {e}"
+
+
 if __name__ == "__main__":
     mcp.run(transport="stdio")